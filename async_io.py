@@ -0,0 +1,126 @@
+# Input sources and output sinks for Interpreter.run_async: read_line(), write() and flush()
+# are coroutines, so a program waiting for input or for room to print only waits on the event
+# loop. They're kept apart from inputs.py and sinks.py so that only programs using run_async
+# pay for importing asyncio.
+import asyncio
+
+from inputs import InputProvider
+from sinks import BATCH_LINES, OutputSink
+
+_END = object()
+
+
+# input for Interpreter.run_async: read_line() is awaited
+class AsyncInput(InputProvider):
+    awaitable = True
+    async def read_line(self):
+        return self.end()
+
+
+# lines put on an asyncio.Queue (by the task that talks to the user, say); end_input() (or
+# putting None) marks the end
+class QueueInput(AsyncInput):
+    def __init__(self, queue=None, at_eof=None):
+        super().__init__(at_eof)
+        self.queue = queue if queue is not None else asyncio.Queue()
+        self.ended = False
+
+    def feed(self, line):
+        self.queue.put_nowait(line)
+
+    def end_input(self):
+        self.queue.put_nowait(None)
+
+    async def read_line(self):
+        if self.ended:
+            return self.end()
+        line = await self.queue.get()
+        if line is None:
+            self.ended = True
+            return self.end()
+        self.count += 1
+        return line
+
+
+# lines from an async iterable
+class AsyncIteratorInput(AsyncInput):
+    def __init__(self, lines, at_eof=None):
+        super().__init__(at_eof)
+        self.iterator = aiter(lines)
+
+    async def read_line(self):
+        line = await anext(self.iterator, _END)
+        if line is _END:
+            return self.end()
+        self.count += 1
+        return line
+
+
+# lines from an asyncio.StreamReader (a socket, a subprocess's stdout), without their "\n"
+# or "\r\n"
+class StreamInput(AsyncInput):
+    def __init__(self, reader, at_eof=None, encoding="utf-8"):
+        super().__init__(at_eof)
+        self.reader = reader
+        self.encoding = encoding
+
+    async def read_line(self):
+        line = await self.reader.readline()
+        if not line:
+            return self.end()
+        if line.endswith(b"\n"):
+            line = line[:-2] if line.endswith(b"\r\n") else line[:-1]
+        self.count += 1
+        return line.decode(self.encoding)
+
+
+# output for Interpreter.run_async: write() and flush() are awaited. This one only counts the
+# lines
+class AsyncSink(OutputSink):
+    awaitable = True
+
+    async def write(self, line):
+        self.count += 1
+
+    async def flush(self):
+        pass
+
+    async def close(self):
+        await self.flush()
+
+
+# puts every line on an asyncio.Queue; with a bounded queue, a program that prints faster than
+# the lines are taken off waits for room
+class QueueSink(AsyncSink):
+    def __init__(self, queue=None):
+        super().__init__()
+        self.queue = queue if queue is not None else asyncio.Queue()
+
+    async def write(self, line):
+        self.count += 1
+        await self.queue.put(line)
+
+
+# writes to an asyncio.StreamWriter (a socket, a subprocess's stdin), batch_lines at a time,
+# waiting for the writer to drain after each batch. run_async flushes before every input, so
+# prompts go out before the program waits
+class StreamSink(AsyncSink):
+    def __init__(self, writer, batch_lines=BATCH_LINES, encoding="utf-8"):
+        super().__init__()
+        self.writer = writer
+        self.batch_lines = batch_lines
+        self.encoding = encoding
+        self.pending = []
+
+    async def write(self, line):
+        self.count += 1
+        self.pending.append(line)
+        if len(self.pending) >= self.batch_lines:
+            await self.flush()
+
+    async def flush(self):
+        if self.pending:
+            text = "\n".join(self.pending) + "\n"
+            self.pending = []
+            self.writer.write(text.encode(self.encoding))
+            await self.writer.drain()
@@ -0,0 +1,2 @@
+# Benchmarks for the Brewin interpreter. Run each one from the repo root, e.g.
+#   python -m benchmarks.engines
@@ -0,0 +1,88 @@
+# Memory held by the Element tree of a large generated program, and the time to walk it with
+# get(): the slotted per-node-type classes in element.py vs a copy of the dict-based Element
+# they replaced (every node with its own dict of fields).
+#   python -m benchmarks.ast_memory [--functions N]
+import argparse
+import tracemalloc
+
+from benchmarks.common import best_time, print_table
+from benchmarks.parsing import generate_program
+from brewparse import parse_program
+from element import Element
+
+
+# the Element before per-node-type classes, kept here for comparison
+class DictElement:
+    def __init__(self, elem_type, **kwargs):
+        self.elem_type = elem_type
+        self.dict = {}
+        for key, value in kwargs.items():
+            self.dict[key] = value
+
+    def get(self, key):
+        if key not in self.dict:
+            return None
+        return self.dict[key]
+
+
+# a copy of the tree made of node_type objects
+def copy_tree(node, node_type):
+    if isinstance(node, list):
+        return [copy_tree(item, node_type) for item in node]
+    if isinstance(node, Element):
+        fields = {key: copy_tree(getattr(node, key), node_type) for key in node.field_names}
+        return node_type(node.elem_type, **fields)
+    return node
+
+
+# allocated bytes still held by what build() returns
+def retained_memory(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tree = build()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del tree
+    return size
+
+
+FIELDS = {
+    "program": ("functions",), "func": ("statements",), "=": ("expression",), "if": ("condition", "statements", "else_statements"),
+    "for": ("init", "condition", "update", "statements"), "return": ("expression",), "fcall": ("args",),
+}
+
+
+# visits every node through get(), like the tree-walking interpreter does
+def walk(node):
+    count = 1
+    for key in FIELDS.get(node.elem_type, ("op1", "op2")):
+        value = node.get(key)
+        if isinstance(value, list):
+            for item in value:
+                count += walk(item)
+        elif value is not None and not isinstance(value, (str, int)):
+            count += walk(value)
+    return count
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--functions", type=int, default=2000)
+    args = args.parse_args()
+
+    ast = parse_program(generate_program(args.functions))
+    rows = []
+    for label, node_type in (("dict Element", DictElement), ("slotted nodes", Element)):
+        size = retained_memory(lambda: copy_tree(ast, node_type))
+        tree = copy_tree(ast, node_type)
+        nodes = walk(tree)
+        walk_time = best_time(lambda: walk(tree))
+        rows.append([label, nodes, f"{size / 1024 / 1024:.1f} MiB", f"{size / nodes:.0f} B",
+                     f"{walk_time * 1000:.1f} ms"])
+    print_table(["nodes as", "nodes", "tree size", "per node", "walk with get()"], rows)
+
+
+if __name__ == "__main__":
+    main()
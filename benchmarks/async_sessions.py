@@ -0,0 +1,124 @@
+# Many interactive sessions at once: each one runs a program that asks for a number a few times
+# and prints a running total, and a simulated user answers every prompt after a short think
+# time. With run_async all the sessions are served by one event loop on one thread; the other
+# way gives each session a thread of its own, blocked in get_input() while it waits. Reports
+# the wall time, the threads in use at the peak and the peak memory python allocated (thread
+# stacks aren't part of it).
+#   python -m benchmarks.async_sessions [--sessions N] [--rounds N] [--think MS]
+import argparse
+import asyncio
+import queue
+import threading
+import time
+import tracemalloc
+
+from async_io import QueueInput, QueueSink
+from benchmarks.common import print_table
+from inputs import InputProvider
+from interpreterv2 import Interpreter
+from sinks import OutputSink
+
+PROGRAM = """
+func main() {
+  var i;
+  var total;
+  total = 0;
+  for (i = 0; i < %d; i = i + 1) {
+    total = total + inputi("number? ");
+    print("total ", total);
+  }
+}
+"""
+
+
+# the user at the other end of a session: answers each prompt with the round number
+async def user(rounds, think, feed, lines):
+    for round_number in range(rounds):
+        prompt = await lines.get()
+        assert prompt == "number? ", prompt
+        await asyncio.sleep(think)
+        feed(str(round_number))
+        await lines.get()  # the total
+
+
+async def async_sessions(program, sessions, rounds, think):
+    async def session():
+        inp, out = QueueInput(), QueueSink()
+        run = asyncio.ensure_future(Interpreter(console_output=False, engine="vm").run_async(program, inp, out))
+        await user(rounds, think, inp.feed, out.queue)
+        await run
+
+    await asyncio.gather(*(session() for _ in range(sessions)))
+    return threading.active_count()
+
+
+# the thread-per-session side: a blocking input provider, and a sink that passes the lines to
+# the event loop the users run on
+class BlockingInput(InputProvider):
+    def __init__(self):
+        super().__init__()
+        self.queue = queue.Queue()
+
+    def read_line(self):
+        return self.queue.get()
+
+
+class LoopSink(OutputSink):
+    def __init__(self, loop, lines):
+        super().__init__()
+        self.loop = loop
+        self.lines = lines
+
+    def write(self, line):
+        self.loop.call_soon_threadsafe(self.lines.put_nowait, line)
+
+
+async def thread_sessions(program, sessions, rounds, think):
+    loop = asyncio.get_running_loop()
+    threads = []
+    users = []
+    for _ in range(sessions):
+        inp, lines = BlockingInput(), asyncio.Queue()
+        interpreter = Interpreter(console_output=False, engine="vm", inp=inp, output_sink=LoopSink(loop, lines))
+        thread = threading.Thread(target=interpreter.run, args=(program,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        users.append(user(rounds, think, inp.queue.put, lines))
+    peak_threads = threading.active_count()
+    await asyncio.gather(*users)
+    for thread in threads:
+        thread.join()
+    return peak_threads
+
+
+def measure(serve, program, args):
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        threads = asyncio.run(serve(program, args.sessions, args.rounds, args.think / 1000))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return [f"{elapsed * 1000:.0f} ms", threads, f"{peak / 1024 / 1024:.1f} MiB"]
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--sessions", type=int, default=1000)
+    args.add_argument("--rounds", type=int, default=5)
+    args.add_argument("--think", type=float, default=20.0, help="ms the user takes to answer")
+    args = args.parse_args()
+
+    program = PROGRAM % args.rounds
+    rows = [
+        ["run_async, one event loop"] + measure(async_sessions, program, args),
+        ["run() in a thread per session"] + measure(thread_sessions, program, args),
+    ]
+    print_table(["sessions served by", "time", "threads", "peak memory"], rows)
+    print(f"\n{args.sessions} sessions of {args.rounds} inputs, {args.think:g} ms to answer each "
+          f"({args.rounds * args.think:g} ms per session end to end)")
+
+
+if __name__ == "__main__":
+    main()
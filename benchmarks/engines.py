@@ -0,0 +1,87 @@
+# Compares the execution engines of interpreterv2.Interpreter on loop- and recursion-heavy
+# programs. Every engine produces the same output, which is checked along the way.
+#   python -m benchmarks.engines
+import sys
+
+from benchmarks.common import best_time, print_table
+from interpreterv2 import Interpreter
+
+PROGRAMS = {
+    "counting loop": """
+func main() {
+  var i;
+  var total;
+  total = 0;
+  for (i = 0; i < 100000; i = i + 1) {
+    total = total + i * 2 - 1;
+  }
+  print(total);
+}
+""",
+    "nested loops": """
+func main() {
+  var i;
+  var j;
+  var hits;
+  hits = 0;
+  for (i = 0; i < 300; i = i + 1) {
+    for (j = 0; j < 300; j = j + 1) {
+      if ((i + j) / 7 * 7 == i + j) {
+        hits = hits + 1;
+      }
+    }
+  }
+  print(hits);
+}
+""",
+    "recursive fib": """
+func fib(n) {
+  if (n < 2) {
+    return n;
+  }
+  return fib(n - 1) + fib(n - 2);
+}
+
+func main() {
+  print(fib(20));
+}
+""",
+    "recursive sum": """
+func sum(n, acc) {
+  if (n == 0) {
+    return acc;
+  }
+  return sum(n - 1, acc + n);
+}
+
+func main() {
+  var i;
+  var total;
+  for (i = 0; i < 100; i = i + 1) {
+    total = sum(400, 0);
+  }
+  print(sum(400, 0));
+}
+""",
+}
+
+
+def main():
+    sys.setrecursionlimit(10000)  # recursive sum goes ~400 Brewin frames deep
+    engines = Interpreter.ENGINES
+    rows = []
+    for name, program in PROGRAMS.items():
+        times = []
+        outputs = set()
+        for engine in engines:
+            interpreter = Interpreter(console_output=False, engine=engine)
+            times.append(best_time(lambda: interpreter.run(program)))
+            outputs.add(tuple(interpreter.get_output()))
+        if len(outputs) != 1:
+            raise AssertionError(f"engines disagree on {name}: {outputs}")
+        rows.append([name] + [f"{t * 1000:.1f} ms" for t in times] + [f"{times[0] / times[-1]:.2f}x"])
+    print_table(["program"] + list(engines) + [f"speedup ({engines[-1]})"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Time to import brewparse in a fresh interpreter, building the lexer and parser from the
+# rules (the default) vs loading the frozen tables (BREWIN_FROZEN_TABLES=1). Short-lived
+# worker processes pay this on every spawn, so the frozen import has a budget: the script
+# exits with status 1 when its median goes over it.
+#   python -m benchmarks.imports [--budget MS] [--runs N]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import print_table
+
+# median import time of brewparse with frozen tables (from cached bytecode): about 30 ms here,
+# most of it python's own modules and the inspect module ply imports; the rest is headroom for
+# a noisy machine
+BUDGET_MS = 50
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE = "import time; start = time.perf_counter(); import brewparse; print(time.perf_counter() - start)"
+
+
+def import_times(frozen, runs):
+    env = dict(os.environ)
+    env.pop("BREWIN_FROZEN_TABLES", None)
+    if frozen:
+        env["BREWIN_FROZEN_TABLES"] = "1"
+    times = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", MEASURE], cwd=REPO, env=env, capture_output=True, text=True, check=True)
+        times.append(float(result.stdout) * 1000)
+    return times
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--budget", type=float, default=BUDGET_MS, help="budget for the frozen import, in ms")
+    args.add_argument("--runs", type=int, default=15)
+    args = args.parse_args()
+
+    rows = []
+    medians = {}
+    for mode, frozen in (("rules", False), ("frozen tables", True)):
+        times = import_times(frozen, args.runs)
+        medians[mode] = statistics.median(times)
+        rows.append([mode, f"{min(times):.1f} ms", f"{medians[mode]:.1f} ms", f"{max(times):.1f} ms"])
+    print_table(["import brewparse", "min", "median", "max"], rows)
+    if os.environ.get("PYTHONDONTWRITEBYTECODE"):
+        print("note: PYTHONDONTWRITEBYTECODE is set, so these times include compiling every module from source")
+
+    frozen_median = medians["frozen tables"]
+    if frozen_median > args.budget:
+        print(f"OVER BUDGET: frozen import took {frozen_median:.1f} ms, budget is {args.budget:.0f} ms")
+        return 1
+    print(f"within budget: {frozen_median:.1f} ms of {args.budget:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
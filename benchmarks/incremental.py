@@ -0,0 +1,28 @@
+# Time to parse a program again after editing one of its functions: parse_program on the whole
+# program vs IncrementalParser, which only reparses the edited function.
+#   python -m benchmarks.incremental
+from benchmarks.common import best_time, print_table
+from benchmarks.parsing import generate_program
+from brewparse import parse_program
+from incremental import IncrementalParser
+
+
+def main():
+    rows = []
+    for n_funcs in (10, 100, 1000):
+        program = generate_program(n_funcs)
+        edits = [program.replace("total = 0;", f"total = {i};", 1) for i in range(1, 4)]
+        parser = IncrementalParser()
+        parser.parse(program)
+        full_time = best_time(lambda: parse_program(edits[0]))
+        count = iter(range(10 ** 9))
+        incremental_time = best_time(lambda: parser.parse(edits[next(count) % len(edits)]))
+        rows.append([
+            n_funcs, f"{len(program) // 1024} KiB", f"{full_time * 1000:.1f} ms",
+            f"{incremental_time * 1000:.2f} ms ({full_time / incremental_time:.0f}x)",
+        ])
+    print_table(["functions", "source", "parse_program", "incremental"], rows)
+
+
+if __name__ == "__main__":
+    main()
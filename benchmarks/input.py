@@ -0,0 +1,80 @@
+# A program that sums a large file of numbers with inputi(), fed from a list of the file's
+# lines (read into memory before the run, the way inp worked before) and from each input
+# provider (inputs.py): run time, and the peak memory the run allocates, input included.
+#   python -m benchmarks.input [--lines N] [--engine ENGINE]
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.common import best_time, print_table
+from inputs import IntReader, IteratorInput, LineReader
+from interpreterv2 import Interpreter
+from sinks import DiscardSink
+
+PROGRAM = """
+func main() {
+  var n;
+  var i;
+  var total;
+  n = inputi();
+  total = 0;
+  for (i = 0; i < n; i = i + 1) {
+    total = total + inputi();
+  }
+  print(total);
+}
+"""
+
+
+def run(engine, make_input):
+    inp = make_input()
+    try:
+        Interpreter(console_output=False, inp=inp, engine=engine, output_sink=DiscardSink()).run(PROGRAM)
+    finally:
+        if hasattr(inp, "close"):
+            inp.close()
+
+
+def peak_memory(engine, make_input):
+    tracemalloc.start()
+    try:
+        run(engine, make_input)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def read_lines(path):
+    with open(path) as f:
+        return f.read().split("\n")
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--lines", type=int, default=200000)
+    args.add_argument("--engine", default="vm", choices=Interpreter.ENGINES)
+    args = args.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "numbers.txt")
+        with open(path, "w") as f:
+            f.write(f"{args.lines}\n")
+            f.writelines(f"{i * 7919 % 1000003}\n" for i in range(args.lines))
+        configs = [
+            ("list of lines", lambda: read_lines(path)),
+            ("IteratorInput(open file)", lambda: IteratorInput(open(path))),
+            ("LineReader", lambda: LineReader(path)),
+            ("IntReader", lambda: IntReader(path)),
+        ]
+        rows = []
+        for label, make_input in configs:
+            run_time = best_time(lambda: run(args.engine, make_input))
+            peak = peak_memory(args.engine, make_input)
+            rows.append([label, f"{run_time * 1000:.0f} ms", f"{peak / 1024 / 1024:.1f} MiB"])
+    print_table(["input", "time", "peak memory"], rows)
+    print(f"\n{args.lines} lines, {args.engine} engine")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Memory held by the tree of a large generated program with the names and string literals
+# the parsers intern (one str object per distinct name or literal), against a copy of the same
+# tree with its own str object for every occurrence, the way the trees were before. Also the
+# time the tree walker takes to run a loop-heavy program on each, since its environment
+# lookups compare the names in the tree with the keys of the environment dicts.
+#   python -m benchmarks.interning [--functions N]
+import argparse
+
+from benchmarks.ast_memory import retained_memory
+from benchmarks.common import best_time, print_table
+from benchmarks.engines import PROGRAMS
+from benchmarks.parsing import generate_program
+from brewparse import parse_program
+from element import Element
+from interpreterv2 import Interpreter
+
+
+# a copy of the tree with new str objects: one per occurrence, or one per distinct string when
+# strings is a dict to share them through (a single character stays shared either way: CPython
+# caches those)
+def copy_tree(node, strings):
+    if isinstance(node, list):
+        return [copy_tree(item, strings) for item in node]
+    if isinstance(node, Element):
+        fields = [copy_tree(getattr(node, key), strings) for key in node.field_names]
+        return type(node)(node.elem_type, *fields)
+    if isinstance(node, str):
+        copy = (node + ".")[:-1]
+        return copy if strings is None else strings.setdefault(copy, copy)
+    return node
+
+
+# hands Interpreter.run a given tree instead of parsing
+class FixedTree:
+    def __init__(self, ast):
+        self.ast = ast
+
+    def parse(self, program, parser="yacc", positions=None):
+        return self.ast
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--functions", type=int, default=2000)
+    args = args.parse_args()
+
+    ast = parse_program(generate_program(args.functions))
+    loop = PROGRAMS["counting loop"]
+    loop_ast = parse_program(loop)
+    rows = []
+    sizes = {}
+    for label, intern in (("one per occurrence", False), ("interned", True)):
+        size = sizes[label] = retained_memory(lambda: copy_tree(ast, {} if intern else None))
+        tree = FixedTree(copy_tree(loop_ast, {} if intern else None))
+        run_time = best_time(lambda: Interpreter(console_output=False, parse_cache=tree).run(loop))
+        rows.append([label, f"{size / 1024 / 1024:.1f} MiB", f"{run_time * 1000:.1f} ms"])
+    print_table(["strings", "tree size", "counting loop (tree walker)"], rows)
+    saved = sizes["one per occurrence"] - sizes["interned"]
+    print(f"\nsaved {saved / 1024 / 1024:.1f} MiB ({saved / sizes['one per occurrence'] * 100:.0f}%) "
+          f"on {args.functions} functions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Interpreter.iter_run against run() on a program that prints a lot of lines: the time to the
+# first line, the time to read the first 100 lines and stop, and the time for the whole
+# program (iter_run's cost per line is the hand-over between the two threads).
+#   python -m benchmarks.iter_run [--lines N]
+import argparse
+import itertools
+
+from benchmarks.common import best_time, print_table
+from interpreterv2 import Interpreter
+from sinks import ListSink
+
+PROGRAM = """
+func main() {
+  var i;
+  for (i = 0; i < %d; i = i + 1) {
+    print("line ", i);
+  }
+}
+"""
+
+
+def first_lines(program, count):
+    lines = Interpreter().iter_run(program)
+    taken = list(itertools.islice(lines, count))
+    lines.close()
+    return taken
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--lines", type=int, default=100000)
+    args = args.parse_args()
+
+    program = PROGRAM % args.lines
+    rows = []
+    # run() hands over its lines when the program is done
+    whole = best_time(lambda: Interpreter(output_sink=ListSink()).run(program))
+    rows.append(["run() (ListSink)"] + [f"{whole * 1000:.1f} ms"] * 3)
+    rows.append([
+        "iter_run()",
+        f"{best_time(lambda: first_lines(program, 1)) * 1000:.2f} ms",
+        f"{best_time(lambda: first_lines(program, 100)) * 1000:.2f} ms",
+        f"{best_time(lambda: sum(1 for _ in Interpreter().iter_run(program))) * 1000:.1f} ms",
+    ])
+    print_table(["", "first line", "first 100 lines", f"all {args.lines} lines"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Lexing time on pathological inputs: huge block comments (generated programs carry big
+# /* *OUT* ... */ blocks), unterminated comments, and long or unterminated string literals.
+# Each input is lexed at two sizes, four times apart, with the PLY lexer and with
+# brewlex.tokenize; comment and string scanning is linear, so the times should grow about 4x
+# as well.
+#   python -m benchmarks.lexing [--size KIB]
+import argparse
+
+from benchmarks.common import best_time, print_table
+from brewlex import lexer, reset_lineno, tokenize
+
+OUT_LINE = "*OUT* f0: 10 true\n"
+
+
+def long_comment(size):
+    return "func main() {\n/*\n" + OUT_LINE * (size // len(OUT_LINE)) + "*/\nprint(1);\n}\n"
+
+
+# none of its "/*" is ever closed, so every one of them is lexed as DIVIDE MULTIPLY
+def unterminated_comment(size):
+    line = "x = a /* b;\n"
+    return "func main() {\n" + line * (size // len(line))
+
+
+def long_string(size):
+    return 'func main() {\nprint("' + "s" * size + '");\n}\n'
+
+
+def unterminated_string(size):
+    line = 'print("' + "s" * 1000 + "\n"
+    return "func main() {\n" + line * (size // len(line)) + "}\n"
+
+
+INPUTS = [
+    ("long comment", long_comment),
+    ("unterminated comment", unterminated_comment),
+    ("long string", long_string),
+    ("unterminated strings", unterminated_string),
+]
+
+
+def lex_tokens(program):
+    reset_lineno()
+    lexer.input(program)
+    return list(lexer)
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--size", type=int, default=256, help="smaller input size in KiB")
+    args = args.parse_args()
+
+    rows = []
+    for label, make in INPUTS:
+        for size in (args.size * 1024, args.size * 4096):
+            program = make(size)
+            lex_time = best_time(lambda: lex_tokens(program))
+            tokenize_time = best_time(lambda: tokenize(program))
+            rows.append([
+                label, f"{len(program) // 1024} KiB", f"{lex_time * 1000:.1f} ms",
+                f"{tokenize_time * 1000:.1f} ms",
+            ])
+    print_table(["input", "source", "PLY lexer", "tokenize"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# Naive recursive fib with and without memoize=True, on every engine. The memoized runs
+# must print the same thing; the cache turns the exponential recursion into a linear one.
+#   python -m benchmarks.memo
+import sys
+
+from benchmarks.common import best_time, print_table
+from interpreterv2 import Interpreter
+
+FIB = """
+func fib(n) {
+  if (n < 2) {
+    return n;
+  }
+  return fib(n - 1) + fib(n - 2);
+}
+
+func main() {
+  print(fib(%d));
+}
+"""
+
+
+def main():
+    sys.setrecursionlimit(10000)
+    rows = []
+    for n in (15, 20, 24):
+        program = FIB % n
+        for engine in Interpreter.ENGINES:
+            plain = Interpreter(console_output=False, engine=engine)
+            memoized = Interpreter(console_output=False, engine=engine, memoize=True)
+            plain_time = best_time(lambda: plain.run(program), repeat=1)
+            memo_time = best_time(lambda: memoized.run(program))
+            if plain.get_output()[-1] != memoized.get_output()[-1]:
+                raise AssertionError(f"memoized fib({n}) on {engine}: {memoized.get_output()[-1]} != {plain.get_output()[-1]}")
+            stats = memoized.memo_stats()
+            rows.append([
+                f"fib({n})", engine, f"{plain_time * 1000:.1f} ms", f"{memo_time * 1000:.1f} ms",
+                f"{plain_time / memo_time:.0f}x", stats["hits"], stats["misses"],
+            ])
+    print_table(["program", "engine", "plain", "memoized", "speedup", "hits", "misses"], rows)
+
+
+if __name__ == "__main__":
+    main()
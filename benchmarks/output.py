@@ -0,0 +1,88 @@
+# A print-heavy program with each output sink (sinks.py) against the default output (print()
+# every line, keep every line in output_log): run time, how many writes reach the stream, and
+# the memory the interpreter still holds for the output after the run. Stdout is replaced by a
+# line-buffered file on os.devnull, like a terminal, which flushes on every newline.
+#   python -m benchmarks.output [--lines N]
+import argparse
+import contextlib
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.common import best_time, print_table
+from interpreterv2 import Interpreter
+from sinks import DiscardSink, FileSink, ListSink, RingBufferSink, StdoutSink
+
+PROGRAM = """
+func main() {
+  var i;
+  for (i = 0; i < %d; i = i + 1) {
+    print("line ", i, ": ", i * 7);
+  }
+}
+"""
+
+
+# counts the writes going through to the file
+class CountingStream:
+    def __init__(self, stream):
+        self.stream = stream
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def run(interpreter, program):
+    interpreter.run(program)
+    if interpreter.output_sink is not None:
+        interpreter.output_sink.close()
+
+
+# memory the interpreter holds on to after running program
+def retained_memory(make_interpreter, program):
+    tracemalloc.start()
+    try:
+        interpreter = make_interpreter()
+        before = tracemalloc.get_traced_memory()[0]
+        run(interpreter, program)
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--lines", type=int, default=100000)
+    args = args.parse_args()
+
+    program = PROGRAM % args.lines
+    rows = []
+    with open(os.devnull, "w", buffering=1) as devnull, tempfile.TemporaryDirectory() as directory:
+        stdout = CountingStream(devnull)
+        path = os.path.join(directory, "out.txt")
+        configs = [
+            ("print() + output_log", lambda: Interpreter()),
+            ("StdoutSink", lambda: Interpreter(output_sink=StdoutSink())),
+            ("FileSink", lambda: Interpreter(output_sink=FileSink(path))),
+            ("RingBufferSink(100)", lambda: Interpreter(output_sink=RingBufferSink(100))),
+            ("ListSink", lambda: Interpreter(output_sink=ListSink())),
+            ("DiscardSink", lambda: Interpreter(output_sink=DiscardSink())),
+        ]
+        with contextlib.redirect_stdout(stdout):
+            for label, make_interpreter in configs:
+                run_time = best_time(lambda: run(make_interpreter(), program))
+                stdout.writes = 0
+                run(make_interpreter(), program)
+                writes = stdout.writes
+                held = retained_memory(make_interpreter, program)
+                rows.append([label, f"{run_time * 1000:.1f} ms", writes, f"{held / 1024:.0f} KiB"])
+    print_table(["output", "time", "stdout writes", "held after run"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Time spent turning program text into an Element tree, for generated programs of a few
+# sizes: the yacc parser, the hand-written one (pratt.py) and loading the tree from a warm
+# ParseCache. A second table compares lexing alone: PLY's LexToken per token against the
+# arrays of brewlex.tokenize (time, and peak memory while the tokens are held).
+#   python -m benchmarks.parsing
+import tempfile
+import tracemalloc
+
+from benchmarks.common import best_time, print_table
+from brewlex import lexer, reset_lineno, tokenize
+from brewparse import parse_program
+from parse_cache import ParseCache
+
+FUNC = """
+func f%(i)d(a, b) {
+  var total;
+  total = 0;
+  for (a = 0; a < b; a = a + 1) {
+    if (a / 2 * 2 == a && !(b < 3)) {
+      total = total + a * 2 - -1;
+    } else {
+      total = total - 1;
+    }
+  }
+  print("f%(i)d: ", total, " ", a >= b || false);
+  return f%(i)d_helper(total, "done", nil);
+}
+"""
+
+
+# a syntactically valid program with n_funcs functions exercising most of the grammar
+def generate_program(n_funcs):
+    funcs = [FUNC % {"i": i} for i in range(n_funcs)]
+    return "".join(funcs) + "\nfunc main() {\n  f0(0, 10);\n}\n"
+
+
+def lex_tokens(program):
+    reset_lineno()
+    lexer.input(program)
+    return list(lexer)
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ParseCache(directory)
+        for n_funcs in (10, 100, 1000):
+            program = generate_program(n_funcs)
+            cache.parse(program)  # warm it up
+            parse_time = best_time(lambda: parse_program(program))
+            pratt_time = best_time(lambda: parse_program(program, "pratt"))
+            cached_time = best_time(lambda: cache.parse(program))
+            rows.append([
+                n_funcs, f"{len(program) // 1024} KiB", f"{parse_time * 1000:.1f} ms",
+                f"{pratt_time * 1000:.1f} ms ({parse_time / pratt_time:.1f}x)",
+                f"{cached_time * 1000:.1f} ms ({parse_time / cached_time:.1f}x)",
+            ])
+    print_table(["functions", "source", "yacc", "pratt", "parse cache"], rows)
+    print()
+
+    rows = []
+    for n_funcs in (10, 100, 1000):
+        program = generate_program(n_funcs)
+        lex_time = best_time(lambda: lex_tokens(program))
+        tokenize_time = best_time(lambda: tokenize(program))
+        lex_memory = peak_memory(lambda: lex_tokens(program))
+        tokenize_memory = peak_memory(lambda: tokenize(program))
+        rows.append([
+            n_funcs, len(tokenize(program)),
+            f"{lex_time * 1000:.1f} ms, {lex_memory / 1024:.0f} KiB",
+            f"{tokenize_time * 1000:.1f} ms ({lex_time / tokenize_time:.1f}x), {tokenize_memory / 1024:.0f} KiB",
+        ])
+    print_table(["functions", "tokens", "PLY lexer", "tokenize"], rows)
+
+
+if __name__ == "__main__":
+    main()
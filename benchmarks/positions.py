@@ -0,0 +1,59 @@
+# Cost of the node positions (positions.py): parse time of a large generated program with and
+# without recording them, for each parser, and the size of the table; then the time to find
+# the line of a runtime error raised in the last function of the program, which is the only
+# time the table is needed. Interpreter.run parses without positions, so the first lookup
+# parses the program again to find them; later lookups in the same run only read the table.
+#   python -m benchmarks.positions [--functions N]
+import argparse
+
+from benchmarks.common import best_time, print_table
+from benchmarks.parsing import generate_program
+from brewparse import PARSERS, parse_program
+from interpreterv2 import Interpreter
+from positions import Positions
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--functions", type=int, default=2000)
+    args = args.parse_args()
+
+    program = generate_program(args.functions)
+    rows = []
+    for parser in PARSERS:
+        plain_time = best_time(lambda: parse_program(program, parser))
+        positions_time = best_time(lambda: parse_program(program, parser, positions=Positions(program)))
+        positions = Positions(program)
+        parse_program(program, parser, positions=positions)
+        table_bytes = len(positions) * (8 + positions.offsets.itemsize)  # (a pointer per node in the list)
+        rows.append([
+            parser, len(positions), f"{plain_time * 1000:.1f} ms", f"{positions_time * 1000:.1f} ms",
+            f"{(positions_time / plain_time - 1) * 100:+.0f}%", f"{table_bytes / 1024:.0f} KiB",
+        ])
+    print_table(["parser", "nodes", "parse", "with positions", "overhead", "table"], rows)
+    print()
+
+    # an undefined variable at the very end of the program
+    failing = program + "func broken() {\n  print(missing);\n}\n"
+    failing = failing.replace("func main() {", "func main() {\n  broken();", 1)
+    interpreter = Interpreter(console_output=False)
+    message = "(no error)"
+    try:
+        interpreter.run(failing)
+    except Exception as error:
+        message = str(error)
+    node = interpreter.func_name_to_ast[("broken", 0)].statements[0].args[0]
+    line = interpreter.line_of(node)
+
+    def first_lookup():
+        interpreter.positions = None
+        interpreter.line_of(node)
+
+    first_time = best_time(first_lookup)
+    lookup_time = best_time(lambda: interpreter.line_of(node))
+    print_table(["error", "line", "first lookup", "later lookups"],
+                [[message, line, f"{first_time * 1000:.1f} ms", f"{lookup_time * 1000:.2f} ms"]])
+
+
+if __name__ == "__main__":
+    main()
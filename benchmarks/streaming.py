@@ -0,0 +1,60 @@
+# Peak memory (tracemalloc) and time to go through a big generated source file: reading it
+# whole and calling parse_program, vs stream_parse.iter_definitions, which yields one
+# definition at a time (each one is dropped here right after it's yielded, like a consumer
+# that compiles or indexes them as they come).
+#   python -m benchmarks.streaming [--functions N]
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import print_table
+from benchmarks.parsing import generate_program
+from brewparse import parse_program
+from stream_parse import iter_definitions
+
+
+def parse_whole(path):
+    with open(path) as f:
+        return parse_program(f.read())
+
+
+def stream(path):
+    for _ in iter_definitions(path):
+        pass
+
+
+def measure(func, path):
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        func(path)
+        elapsed = time.perf_counter() - start
+        return elapsed, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--functions", type=int, default=2000)
+    args = args.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n_funcs in (args.functions // 4, args.functions):
+            path = os.path.join(directory, f"program{n_funcs}.br")
+            with open(path, "w") as f:
+                f.write(generate_program(n_funcs))
+            for label, func in (("parse_program", parse_whole), ("iter_definitions", stream)):
+                elapsed, peak = measure(func, path)
+                rows.append([
+                    n_funcs, f"{os.path.getsize(path) // 1024} KiB", label, f"{elapsed * 1000:.0f} ms",
+                    f"{peak / 1024:.0f} KiB",
+                ])
+    print_table(["functions", "source", "parser", "time", "peak memory"], rows)
+
+
+if __name__ == "__main__":
+    main()
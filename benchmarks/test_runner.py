@@ -0,0 +1,138 @@
+# run_tests.py on a generated corpus of *OUT*-annotated programs (loops, recursion, input,
+# programs that fail), with 1, 2, 4, ... worker processes up to the number of cores: wall time,
+# speedup over one worker, and how much of the ideal linear speedup that is. Also the old way
+# for comparison: a new python process per test, one at a time.
+#   python -m benchmarks.test_runner [--tests N] [--workers N] [--engine ENGINE]
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import print_table
+from interpreterv2 import Interpreter
+from run_tests import discover, run_tests
+from sinks import ListSink
+
+TEMPLATES = [
+    """
+func main() {
+  var i;
+  var total;
+  total = 0;
+  for (i = 0; i < %(n)d; i = i + 1) {
+    total = total + i * %(k)d;
+  }
+  print("total: ", total);
+}
+""",
+    """
+func fib(n) {
+  if (n < 2) {
+    return n;
+  }
+  return fib(n - 1) + fib(n - 2);
+}
+func main() {
+  print("fib: ", fib(%(depth)d));
+}
+""",
+    """
+func main() {
+  var count;
+  var i;
+  var total;
+  count = inputi();
+  total = 0;
+  for (i = 0; i < count; i = i + 1) {
+    total = total + inputi();
+  }
+  print(inputs(), ": ", total);
+}
+""",
+    """
+func main() {
+  var i;
+  for (i = 0; i < %(n)d; i = i + 1) {
+    if (i == %(n)d - 1) {
+      print("last: ", i + "x");
+    }
+  }
+}
+""",
+]
+
+# runs a test file in a new process, the way each test used to get a fresh interpreter
+ONE_TEST = "import sys; from run_tests import run_test; sys.exit(0 if run_test(sys.argv[1]).passed else 1)"
+
+
+# a test program made from one of the templates, with its inputs, and its *OUT* block made
+# from a reference run
+def make_test(rng, engine):
+    template = rng.choice(TEMPLATES)
+    program = template % {"n": rng.randint(2000, 20000), "k": rng.randint(1, 9), "depth": rng.randint(12, 17)}
+    inputs = []
+    if "inputi" in program:
+        count = rng.randint(10, 200)
+        inputs = [str(count)] + [str(rng.randint(-99, 99)) for _ in range(count)] + ["sum"]
+    interpreter = Interpreter(console_output=False, inp=inputs, engine=engine, output_sink=ListSink())
+    try:
+        interpreter.run(program)
+    except Exception:
+        pass
+    expected = list(interpreter.get_output())
+    error_type, error_line = interpreter.get_error_type_and_line()
+    if error_type is not None:
+        expected.append(f"{error_type} on line {error_line}")
+    annotation = "/*\n"
+    if inputs:
+        annotation += "*IN*\n" + "\n".join(inputs) + "\n*IN*\n"
+    annotation += "*OUT*\n" + "\n".join(expected) + "\n*OUT*\n*/\n"
+    return program + annotation
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--tests", type=int, default=120)
+    args.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="the most workers to try")
+    args.add_argument("--engine", default="tree", choices=Interpreter.ENGINES)
+    args = args.parse_args()
+    # (for the new processes, like run_tests.py's main() sets it for its workers)
+    os.environ.setdefault("BREWIN_FROZEN_TABLES", "1")
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        for number in range(args.tests):
+            with open(os.path.join(directory, f"test{number:04d}.br"), "w") as f:
+                f.write(make_test(rng, args.engine))
+        paths = discover([directory])
+
+        rows = []
+        start = time.perf_counter()
+        failed = 0
+        for path in paths:
+            failed += subprocess.run([sys.executable, "-c", ONE_TEST, path]).returncode != 0
+        cold_time = time.perf_counter() - start
+        rows.append(["new process per test", 1, f"{cold_time * 1000:.0f} ms", "", "", failed])
+
+        workers = 1
+        base_time = None
+        while True:
+            start = time.perf_counter()
+            results = list(run_tests(paths, workers, args.engine))
+            elapsed = time.perf_counter() - start
+            base_time = base_time or elapsed
+            speedup = base_time / elapsed
+            rows.append(["run_tests.py", workers, f"{elapsed * 1000:.0f} ms", f"{speedup:.2f}x",
+                         f"{speedup / workers * 100:.0f}%", sum(not result.passed for result in results)])
+            if workers >= args.workers:
+                break
+            workers = min(workers * 2, args.workers)
+    print_table(["runner", "workers", "time", "speedup", "of linear", "failed"], rows)
+    print(f"\n{args.tests} tests, {args.engine} engine, {os.cpu_count()} cores")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# Parses a batch of generated programs from several threads at once through parse_program
+# (which borrows a brewparse.Parser from the pool for every call), checks every tree against
+# the one parsed on its own in the main thread, and compares the times. With the GIL the
+# threads can't run faster than one; on a free-threaded build they can.
+#   python -m benchmarks.threads [--threads N] [--programs N]
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import print_table
+from brewparse import parse_program
+from check_parser import ProgramGenerator
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--threads", type=int, default=8)
+    args.add_argument("--programs", type=int, default=400)
+    args = args.parse_args()
+
+    generator = ProgramGenerator(random.Random(0))
+    jobs = [(generator.program(), ("yacc", "pratt")[i % 2]) for i in range(args.programs)]
+
+    start = time.perf_counter()
+    expected = [str(parse_program(program, parser)) for program, parser in jobs]
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as executor:
+        trees = list(executor.map(lambda job: str(parse_program(*job)), jobs))
+    threaded_time = time.perf_counter() - start
+
+    wrong = sum(tree != want for tree, want in zip(trees, expected))
+    print_table(["programs", "threads", "one thread", f"{args.threads} threads", "wrong trees"], [[
+        args.programs, args.threads, f"{sequential_time * 1000:.0f} ms", f"{threaded_time * 1000:.0f} ms", wrong,
+    ]])
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
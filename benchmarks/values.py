@@ -0,0 +1,97 @@
+# Memory and allocation benchmark for type_valuev1.Value over a recursive program.
+# For each engine it reports the run time, the peak traced memory (tracemalloc) and how
+# many Value objects were constructed during the run.
+#   python -m benchmarks.values
+import sys
+import tracemalloc
+
+from benchmarks.common import best_time, print_table
+from interpreterv2 import Interpreter
+from type_valuev1 import Value
+
+PROGRAM = """
+func build(n, acc) {
+  var a;
+  var b;
+  var flag;
+  a = n * 2;
+  b = a - n;
+  flag = b == n;
+  if (n == 0) {
+    return acc;
+  }
+  return build(n - 1, acc + b);
+}
+
+func fib(n) {
+  if (n < 2) {
+    return n;
+  }
+  return fib(n - 1) + fib(n - 2);
+}
+
+func main() {
+  var i;
+  var total;
+  total = 0;
+  for (i = 0; i < 20; i = i + 1) {
+    total = total + build(600, 0);
+  }
+  print(total);
+  print(fib(18));
+}
+"""
+
+
+# number of Value objects constructed while running fn()
+def count_values(fn):
+    init_code = Value.__init__.__code__
+    count = 0
+
+    def profiler(frame, event, arg):
+        nonlocal count
+        if event == "call" and frame.f_code is init_code:
+            count += 1
+
+    sys.setprofile(profiler)
+    try:
+        fn()
+    finally:
+        sys.setprofile(None)
+    return count
+
+
+# bytes used by one Value, including its __dict__ if it has one
+def value_size():
+    value = Value("int", 1)
+    size = sys.getsizeof(value)
+    if hasattr(value, "__dict__"):
+        size += sys.getsizeof(value.__dict__)
+    return size
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    sys.setrecursionlimit(20000)
+    rows = []
+    for engine in Interpreter.ENGINES:
+        interpreter = Interpreter(console_output=False, engine=engine)
+        run = lambda: interpreter.run(PROGRAM)
+        elapsed = best_time(run)
+        peak = peak_memory(run)
+        allocated = count_values(run)
+        rows.append([engine, f"{elapsed * 1000:.1f} ms", f"{peak / 1024:.0f} KiB", f"{allocated:,}"])
+    print(f"size of one Value: {value_size()} bytes")
+    print_table(["engine", "time", "peak memory", "Values constructed"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
 
+import os
+import re
+import sys
+from array import array
+
 from ply import lex
 
+# BREWIN_FROZEN_TABLES=1: load the lexer (lextab.py) and parser (parsetab.py) tables as they
+# are, without reflecting over the t_*/p_* rules or writing any file. Much faster to
+# import, but the tables have to be kept current with `python freeze.py`
+FROZEN_TABLES = os.environ.get("BREWIN_FROZEN_TABLES") == "1"
+
 reserved = (
     "VAR",
     "FUNC",
@@ -104,9 +114,12 @@ def t_NUMBER(t):
     return t
 
 
+# names and strings are interned, so every occurrence of a name in the tree (and every
+# environment key made from one) is the same object
 def t_NAME(t):
     r"[A-Za-z_][\w_]*"
     t.type = reserved_map.get(t.value, "NAME")
+    t.value = sys.intern(t.value)
     return t
 
 def t_newline(t):
@@ -114,14 +127,38 @@ def t_newline(t):
     t.lexer.lineno += t.value.count("\n")
 
 
+# only matches the opening /*: the closing */ is found with str.find, in time linear in the
+# length of the comment (a regex like /\*(.|\n)*?\*/ goes through its alternation and lazy
+# repeat once per character, and that adds up on multi-megabyte comments)
 def t_comment(t):
-    r"/\*(.|\n)*?\*/"
-    t.lexer.lineno += t.value.count("\n")
+    r"/\*"
+    lexer = t.lexer
+    data = lexer.lexdata
+    start = t.lexpos + 2
+    # lexer.no_comment_end: (data, start) of the lexer's last search for a */ that found
+    # nothing, so none starts at start or later in data: searches from there on fail right
+    # away instead of each scanning to the end of the program again (an unterminated comment
+    # full of "/*"). Kept on the lexer, so threads with lexers of their own don't share it
+    known = getattr(lexer, "no_comment_end", None)
+    if known is not None and known[0] is data and start >= known[1]:
+        end = -1
+    else:
+        end = data.find("*/", start)
+        lexer.no_comment_end = (data, start) if end < 0 else None
+    if end < 0:
+        # unterminated: the "/" is a DIVIDE, and lexing carries on with the "*"
+        t.type = "DIVIDE"
+        t.value = "/"
+        lexer.lexpos = t.lexpos + 1
+        return t
+    lexer.lineno += data.count("\n", t.lexpos, end)
+    lexer.lexpos = end + 2
 
 
+# no backtracking past the end of the line on an unterminated string, unlike ".*?"
 def t_STRING(t):
-    r'".*?"'
-    t.value = t.value[1:-1]
+    r'"[^"\n]*"'
+    t.value = sys.intern(t.value[1:-1])
     return t
 
 
@@ -129,8 +166,169 @@ def t_error(t):
     print(f"Illegal character {t.value[0]}")
     t.lexer.skip(1)
 
-def reset_lineno():
-    lexer.lineno = 1
+def reset_lineno(lineno=1):
+    lexer.lineno = lineno
+
+def build_lexer():
+    if not FROZEN_TABLES:
+        return lex.lex()
+    import lextab
+    frozen = lex.Lexer()
+    frozen.readtab(lextab, globals())
+    lex.lexer = frozen  # what lex.lex() would have registered as the current lexer
+    return frozen
 
 # Build the lexer
-lexer = lex.lex()
+lexer = build_lexer()
+
+
+# ---------- array-backed token stream ----------
+# tokenize() scans a whole program in one pass with the lexer's own master regex and stores
+# the tokens as parallel arrays instead of a LexToken object per token. It's what the Pratt
+# parser (pratt.py) reads.
+
+END = 0  # type code of the end of the stream
+token_codes = {name: code for code, name in enumerate(tokens, start=1)}
+token_names = ("$end",) + tokens
+
+
+class TokenStream:
+    def __init__(self):
+        self.types = array("B")  # token type codes (token_codes)
+        self.value_ids = array("l")  # index of each token's value in values
+        self.lines = array("l")  # line number of each token
+        self.offsets = array("l")  # offset of each token in the source
+        self.values = []  # distinct token values (ints and strings)
+        self.value_index = {}
+
+    def append(self, code, value, line, offset):
+        index = self.value_index.get(value)
+        if index is None:
+            if type(value) is str:
+                value = sys.intern(value)
+            index = len(self.values)
+            self.values.append(value)
+            self.value_index[value] = index
+        self.types.append(code)
+        self.value_ids.append(index)
+        self.lines.append(line)
+        self.offsets.append(offset)
+
+    def __len__(self):
+        return len(self.types)
+
+    # (type name, value, line, offset) of every token, handy when debugging
+    def as_tuples(self):
+        return [
+            (token_names[code], self.values[value_id], line, offset)
+            for code, value_id, line, offset in zip(self.types, self.value_ids, self.lines, self.offsets)
+        ]
+
+    # the stream for tokens produced by the PLY lexer (a clone of it, so it's safe to call from
+    # several threads)
+    @staticmethod
+    def from_lexer(program):
+        stream = TokenStream()
+        clone = lexer.clone()
+        clone.lineno = 1
+        clone.input(program)
+        for token in clone:
+            stream.append(token_codes[token.type], token.value, token.lineno, token.lexpos)
+        return stream
+
+
+# how tokenize() handles each group of the master regex: a token code, or one of these
+_NAME, _NUMBER, _STRING, _NEWLINE, _COMMENT, _UNMATCHED = -1, -2, -3, -4, -5, -6
+_RULE_KINDS = {"t_NAME": _NAME, "t_NUMBER": _NUMBER, "t_STRING": _STRING, "t_newline": _NEWLINE, "t_comment": _COMMENT}
+
+
+def _scanner():
+    if len(lexer.lexre) != 1 or any(func is not None and func.__name__ not in _RULE_KINDS
+                                    for func, _ in filter(None, lexer.lexre[0][1])):
+        return None  # rules tokenize() doesn't know how to run: leave it all to PLY
+    master, index_funcs = lexer.lexre[0]
+    # skip spaces and tabs before every token like PLY's t_ignore check (atomic, so a space is
+    # never handed back to the rules, and non-capturing, so the groups of the master regex keep
+    # their numbers); a last group catches characters no rule matches, \Z the trailing spaces
+    ignore = re.escape(t_ignore)
+    pattern = re.compile("(?>[%s]*)(?:%s|([^%s])|\\Z)" % (ignore, master.pattern, ignore), master.flags)
+    kinds = [None] * (pattern.groups + 1)
+    for index, entry in enumerate(index_funcs):
+        if entry is not None:
+            func, token_type = entry
+            kinds[index] = _RULE_KINDS[func.__name__] if func is not None else token_codes[token_type]
+    kinds[pattern.groups] = _UNMATCHED
+    return pattern, kinds
+
+
+_SCANNER = _scanner()
+
+
+def tokenize(program):
+    if _SCANNER is None:
+        return TokenStream.from_lexer(program)
+    pattern, kinds = _SCANNER
+    stream = TokenStream()
+    types = stream.types.append
+    value_ids = stream.value_ids.append
+    lines = stream.lines.append
+    offsets = stream.offsets.append
+    values = stream.values
+    value_index = stream.value_index
+    name_code = token_codes["NAME"]
+    number_code = token_codes["NUMBER"]
+    string_code = token_codes["STRING"]
+    divide_code = token_codes["DIVIDE"]
+    line = 1
+    no_comment_end = len(program) + 1
+    # scanning restarts after every comment, which t_comment finishes without the regex
+    resume = 0
+    while resume is not None:
+        pos, resume = resume, None
+        for m in pattern.finditer(program, pos):
+            index = m.lastindex
+            if index is None:
+                continue  # trailing whitespace
+            kind = kinds[index]
+            if kind > 0:
+                value = m.group(index)
+            elif kind == _NAME:
+                value = m.group(index)
+                kind = token_codes[reserved_map[value]] if value in reserved_map else name_code
+            elif kind == _NEWLINE:
+                line += m.group(index).count("\n")
+                continue
+            elif kind == _NUMBER:
+                kind = number_code
+                value = int(m.group(index))
+            elif kind == _STRING:
+                kind = string_code
+                value = m.group(index)[1:-1]
+            elif kind == _COMMENT:
+                start = m.start(index)
+                # (no */ at no_comment_end or later, see t_comment)
+                end = -1 if start + 2 >= no_comment_end else program.find("*/", start + 2)
+                if end < 0:
+                    no_comment_end = start + 2
+                if end >= 0:
+                    line += program.count("\n", start, end)
+                    resume = end + 2
+                    break
+                kind = divide_code  # unterminated, see t_comment
+                value = "/"
+                resume = start + 1
+            else:
+                return TokenStream.from_lexer(program)  # a character no rule matches: PLY's t_error
+            value_id = value_index.get(value)
+            if value_id is None:
+                if type(value) is str:
+                    value = sys.intern(value)  # (see t_NAME)
+                value_id = value_index[value] = len(values)
+                values.append(value)
+            types(kind)
+            value_ids(value_id)
+            lines(line)
+            offsets(m.start(index))
+            if resume is not None:
+                break
+    return stream
@@ -1,7 +1,12 @@
+import copy
+import queue
+import sys
+
 from element import Element
 from brewlex import *
 from intbase import InterpreterBase
 from ply import yacc
+from pratt import PrattParser
 
 # Parsing rules
 
@@ -21,6 +26,13 @@ def collapse_items(p, group_index, singleton_index):
         p[0] = p[group_index]
         p[0].append(p[singleton_index])
 
+# the position of the node just built, at the first token of the rule (when the parse has a
+# positions table, see positions.py)
+def record(p):
+    positions = p.parser.positions
+    if positions is not None:
+        positions.add(p[0], p.lexpos(1))
+
 
 def p_program(p):
     """program : structs funcs
@@ -38,6 +50,7 @@ def p_structs(p):
 def p_struct(p):
    "struct : STRUCT NAME LBRACE fields RBRACE"
    p[0] = Element(InterpreterBase.STRUCT_NODE, name=p[2], fields=p[4])
+   record(p)
 
 def p_fields(p):
    """fields : fields field
@@ -47,6 +60,7 @@ def p_fields(p):
 def p_field(p):
   "field : NAME COLON NAME SEMI"  # field_name: type
   p[0] = Element(InterpreterBase.FIELD_DEF_NODE, name=p[1], var_type=p[3])
+  record(p)
 
 def p_funcs(p):
     """funcs : funcs func
@@ -61,6 +75,7 @@ def p_func(p):
         p[0] = Element(InterpreterBase.FUNC_NODE, name=p[2], args=p[4], return_type = p[7], statements=p[9])
     else:  # handle no formal args
         p[0] = Element(InterpreterBase.FUNC_NODE, name=p[2], args=[], return_type = p[6], statements=p[8])
+    record(p)
 
 def p_func2(p):
     """func : FUNC NAME LPAREN formal_args RPAREN LBRACE statements RBRACE
@@ -69,6 +84,7 @@ def p_func2(p):
         p[0] = Element(InterpreterBase.FUNC_NODE, name=p[2], args=p[4], return_type = None, statements=p[7])
     else:  # handle no formal args
         p[0] = Element(InterpreterBase.FUNC_NODE, name=p[2], args=[], return_type = None, statements=p[6])
+    record(p)
 
 def p_formal_args(p):
     """formal_args : formal_args COMMA formal_arg
@@ -83,6 +99,7 @@ def p_formal_arg(p):
       p[0] = Element(InterpreterBase.ARG_NODE, name=p[1], var_type = None)
     else:
       p[0] = Element(InterpreterBase.ARG_NODE, name=p[1], var_type = p[3])
+    record(p)
 
 def p_statements(p):
     """statements : statements statement
@@ -97,6 +114,7 @@ def p_statement___assign(p):
 def p_assign(p):
     "assign : variable_w_dot ASSIGN expression"
     p[0] = Element("=", name=p[1], expression=p[3])
+    record(p)
 
 def p_statement___var(p):
     """statement : VAR variable COLON NAME SEMI
@@ -105,6 +123,7 @@ def p_statement___var(p):
       p[0] = Element(InterpreterBase.VAR_DEF_NODE, name=p[2], var_type=p[4])
     else:
       p[0] = Element(InterpreterBase.VAR_DEF_NODE, name=p[2], var_type=None)
+    record(p)
 
 def p_variable(p):
     "variable : NAME"
@@ -114,7 +133,7 @@ def p_variable_w_dot(p):
     """variable_w_dot : variable_w_dot DOT NAME
     | NAME"""
     if len(p) == 4:
-        p[0] = p[1] + "." + p[3]
+        p[0] = sys.intern(p[1] + "." + p[3])  # (the lexer interns names, see t_NAME)
     else:
         p[0] = p[1]
 
@@ -136,10 +155,12 @@ def p_statement_if(p):
             statements=p[6],
             else_statements=p[10],
         )
+    record(p)
 
 def p_statement_try(p):
     """statement : TRY LBRACE statements RBRACE catchers"""
     p[0] = Element(InterpreterBase.TRY_NODE, statements=p[3], catchers=p[5])
+    record(p)
 
 def p_catches(p):
     """catchers : catchers catch
@@ -149,14 +170,17 @@ def p_catches(p):
 def p_catch(p):
     "catch : CATCH STRING LBRACE statements RBRACE"
     p[0] = Element(InterpreterBase.CATCH_NODE, exception_type=p[2], statements=p[4])
+    record(p)
 
 def p_statement_for(p):
     "statement : FOR LPAREN assign SEMI expression SEMI assign RPAREN LBRACE statements RBRACE"
     p[0] = Element(InterpreterBase.FOR_NODE, init=p[3], condition=p[5], update=p[7], statements=p[10])
+    record(p)
 
 def p_statement_raise(p):
     "statement : RAISE expression SEMI"
     p[0] = Element(InterpreterBase.RAISE_NODE, exception_type=p[2])
+    record(p)
 
 def p_statement_expr(p):
     "statement : expression SEMI"
@@ -171,20 +195,24 @@ def p_statement_return(p):
     else:
         expr = None
     p[0] = Element(InterpreterBase.RETURN_NODE, expression=expr)
+    record(p)
 
 
 def p_expression_not(p):
     "expression : NOT expression"
     p[0] = Element(InterpreterBase.NOT_NODE, op1=p[2])
+    record(p)
 
 
 def p_expression_uminus(p):
     "expression : MINUS expression %prec UMINUS"
     p[0] = Element(InterpreterBase.NEG_NODE, op1=p[2])
+    record(p)
 
 def p_expression_new(p):
     "expression : NEW NAME"
     p[0] = Element(InterpreterBase.NEW_NODE, var_type=p[2])
+    record(p)
 
 
 def p_arith_expression_binop(p):
@@ -198,7 +226,8 @@ def p_arith_expression_binop(p):
     | expression MINUS expression
     | expression MULTIPLY expression
     | expression DIVIDE expression"""
-    p[0] = Element(p[2], op1=p[1], op2=p[3])
+    p[0] = Element(sys.intern(p[2]), op1=p[1], op2=p[3])
+    record(p)
 
 
 def p_expression_group(p):
@@ -209,12 +238,14 @@ def p_expression_group(p):
 def p_expression_and_or(p):
     """expression : expression OR expression
     | expression AND expression"""
-    p[0] = Element(p[2], op1=p[1], op2=p[3])
+    p[0] = Element(sys.intern(p[2]), op1=p[1], op2=p[3])
+    record(p)
 
 
 def p_expression_number(p):
     "expression : NUMBER"
     p[0] = Element(InterpreterBase.INT_NODE, val=p[1])
+    record(p)
 
 
 def p_expression_bool(p):
@@ -222,21 +253,25 @@ def p_expression_bool(p):
     | FALSE"""
     bool_val = p[1] == InterpreterBase.TRUE_DEF
     p[0] = Element(InterpreterBase.BOOL_NODE, val=bool_val)
+    record(p)
 
 
 def p_expression_nil(p):
     "expression : NIL"
     p[0] = Element(InterpreterBase.NIL_NODE)
+    record(p)
 
 
 def p_expression_string(p):
     "expression : STRING"
     p[0] = Element(InterpreterBase.STRING_NODE, val=p[1])
+    record(p)
 
 
 def p_expression_variable(p):
     "expression : variable_w_dot"
     p[0] = Element(InterpreterBase.VAR_NODE, name=p[1])
+    record(p)
 
 
 def p_func_call(p):
@@ -246,6 +281,7 @@ def p_func_call(p):
         p[0] = Element(InterpreterBase.FCALL_NODE, name=p[1], args=p[3])
     else:
         p[0] = Element(InterpreterBase.FCALL_NODE, name=p[1], args=[])
+    record(p)
 
 
 def p_expression_args(p):
@@ -261,14 +297,121 @@ def p_error(p):
         print("Syntax error at EOF")
 
 
-# exported function
-def parse_program(program):
-    reset_lineno()
-    ast = yacc.parse(program)
-    if ast is None:
-        raise SyntaxError("Syntax error")
-    return ast
+# p_error for parses without error recovery: the first syntax error ends the parse
+def p_error_no_recovery(p):
+    if p:
+        raise SyntaxError(f"Syntax error at '{p.value}' on line {p.lineno}")
+    raise SyntaxError("Syntax error at EOF")
+
 
+# p_error for parsing a program again: its syntax errors were printed the first time
+def p_error_quiet(p):
+    pass
+
+
+# exported function
+# parser: "yacc" (the grammar above) or "pratt" (pratt.py, same trees, falls back to yacc for
+# programs with syntax errors)
+# first_line: line number of the first line of program, for syntax error messages (when it's
+# a piece of a bigger source, see stream_parse.py)
+# positions: a positions.Positions for program, filled in with the position of every node
+# recover: False to raise SyntaxError at the first syntax error, instead of printing it and
+# letting PLY's error recovery go on (which may still end in a tree)
+# quiet: True to not print the syntax errors error recovery goes on from
+# Safe to call from several threads at once: each call borrows a Parser from a pool
+PARSERS = ("yacc", "pratt")
+
+def parse_program(program, parser="yacc", first_line=1, positions=None, recover=True, quiet=False):
+    return parser_pool.parse(program, parser, first_line, positions, recover, quiet)
+
+
+# parser.signature: PLY's signature of the grammar the parser's tables are for: the one of the
+# rules in this file, or the frozen tables' own. The rules are only reflected on once, here:
+# when parsetab.py has their signature its tables are used as they are (the check yacc.yacc()
+# would do), otherwise yacc.yacc() rebuilds them and rewrites parsetab.py
+def build_parser():
+    if FROZEN_TABLES:
+        import parsetab
+        tables = yacc.LRTable()
+        signature = tables.read_table(parsetab)
+    else:
+        grammar = yacc.ParserReflect(globals())
+        grammar.get_all()
+        signature = grammar.signature()
+        tables = yacc.LRTable()
+        try:
+            current = not grammar.error and tables.read_table("parsetab") == signature
+        except (ImportError, yacc.VersionError):
+            current = False  # no tables yet, or from another version of PLY
+        if not current:
+            tables = None
+    if tables is not None:
+        tables.bind_callables(globals())
+        parser = yacc.LRParser(tables, p_error)
+    else:
+        parser = yacc.yacc() # yacc.yacc(debug=True, debuglog=open("parse.log", "w"))
+    parser.signature = signature
+    parser.positions = None  # see record()
+    return parser
 
 # generate our parser
-yacc.yacc() # yacc.yacc(debug=True, debuglog=open("parse.log", "w"))
+yacc_parser = build_parser()
+pratt_parser = PrattParser(precedence, unary={"NOT": "NOT", "MINUS": "UMINUS"})
+
+
+# A parser with all of its own parsing state: a clone of the lexer (position, line number),
+# a copy of the LR parser (its stacks) and a Pratt parser. The tables and the rules are
+# shared and never written to, so any number of Parsers can parse at the same time in
+# different threads, as long as each one is only used by one thread at a time.
+class Parser:
+    def __init__(self):
+        self.lexer = lexer.clone()
+        self.yacc_parser = copy.copy(yacc_parser)
+        self.pratt_parser = PrattParser(precedence, unary={"NOT": "NOT", "MINUS": "UMINUS"})
+
+    def parse(self, program, parser="yacc", first_line=1, positions=None, recover=True, quiet=False):
+        if parser not in PARSERS:
+            raise ValueError(f"Unknown parser {parser!r}, expected one of {PARSERS}")
+        if parser == "pratt":
+            ast = self.pratt_parser.parse(tokenize(program), positions)
+            if ast is not None:
+                return ast
+        self.lexer.lineno = first_line
+        # (tracking gives the rules the positions of nonterminals, which costs a little, so
+        # it's only on when they're recorded)
+        self.yacc_parser.positions = positions
+        if not recover:
+            self.yacc_parser.errorfunc = p_error_no_recovery
+        elif quiet:
+            self.yacc_parser.errorfunc = p_error_quiet
+        try:
+            ast = self.yacc_parser.parse(program, lexer=self.lexer, tracking=positions is not None)
+        finally:
+            self.yacc_parser.positions = None
+            self.yacc_parser.errorfunc = p_error
+            self.lexer.no_comment_end = None  # (holds on to the program, see t_comment)
+        if ast is None:
+            raise SyntaxError("Syntax error")
+        return ast
+
+
+# Parsers for any number of threads: parse() takes an idle Parser (or makes a new one when
+# they're all busy) and gives it back after, keeping at most size of them around
+class ParserPool:
+    def __init__(self, size=4):
+        self.size = size
+        self.idle = queue.SimpleQueue()
+
+    def parse(self, program, parser="yacc", first_line=1, positions=None, recover=True, quiet=False):
+        try:
+            instance = self.idle.get_nowait()
+        except queue.Empty:
+            instance = Parser()
+        try:
+            return instance.parse(program, parser, first_line, positions, recover, quiet)
+        finally:
+            if self.idle.qsize() < self.size:
+                self.idle.put(instance)
+
+
+parser_pool = ParserPool()
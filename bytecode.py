@@ -0,0 +1,276 @@
+# Lowers the func ASTs produced by brewparse.parse_program into a compact bytecode that the
+# stack VM in vm.py runs.
+#
+# Every instruction is two slots wide in an array('l'): [opcode, operand]. Operands index
+# into the function's constant pool (values, names, messages, call targets) or are jump
+# targets (an offset into the code array). `if`, `for` and `return` are plain jumps, so no
+# (result, ret_early) tuples get threaded through the statements. Variables live in a flat
+# per-call frame; resolver.py assigns each one its slot at compile time.
+
+from array import array
+
+from resolver import Resolver
+from type_valuev1 import Type, Value
+from intbase import InterpreterBase, ErrorType
+
+# ---------- opcodes ----------
+CONST = 0          # push consts[arg]
+LOAD = 1           # push frame[arg]
+STORE = 2          # pop into frame[arg]
+DEFINE = 3         # frame[arg] = 0 (a `var` statement)
+BINARY_OP = 4      # pop right, pop left, push `left op right`; op is op_sites[arg]
+NEG = 5            # unary minus on the top of the stack
+NOT = 6            # logical not on the top of the stack
+JUMP = 7           # pc = arg
+IF_FALSE = 8       # pop an if condition (must be bool), jump to arg if false
+LOOP_FALSE = 9     # pop a for condition (must be bool), jump to arg if false
+CALL = 10          # call consts[arg] = (name, argc) with argc args, push result (nil if none)
+CALL_STMT = 11     # same call as a statement: if the callee hit `return`, the caller returns too
+PRINT = 12         # pop arg values, print them, push nil
+INPUT = 13         # consts[arg] = (func name, has prompt); push the value read
+POP = 14           # discard the top of the stack
+RETURN = 15        # pop the return value and return it
+RETURN_NONE = 16   # fell off the end of the function
+ERROR = 17         # consts[arg] = (ErrorType, message); raise it
+TAIL_CALL = 18     # `return f(...)`: like CALL, but the callee replaces the current call
+
+OPCODE_NAMES = {
+    value: name
+    for name, value in list(globals().items())
+    if isinstance(value, int) and name.isupper() and not name.startswith("_")
+}
+
+# functions handled by the interpreter itself (never tail called)
+BUILTINS = {"print", "inputi", "inputs"}
+
+# jump opcodes whose operand must be patched once the target is known
+JUMP_OPS = {JUMP, IF_FALSE, LOOP_FALSE}
+
+
+class CodeObject:
+    def __init__(self, name, params, param_slots, frame_size, code, consts, op_sites, error_nodes):
+        self.name = name
+        self.params = params  # parameter names, in order
+        self.param_slots = param_slots  # frame slot of each parameter (None for a duplicate)
+        self.frame_size = frame_size
+        self.code = code  # array('l') of [opcode, operand] pairs
+        self.consts = consts  # constant pool
+        # operator of each BINARY_OP instruction; every site gets its own inline cache in the VM
+        self.op_sites = op_sites
+        # pc -> the node of each instruction that can raise an error, for its line number
+        self.error_nodes = error_nodes
+        self.memoized = False  # set by the VM when calls go through the memo cache
+
+    def __str__(self):
+        return f"<code {self.name}({', '.join(self.params)}): {len(self.code) // 2} instructions, {self.frame_size} slots>"
+
+
+# returns a readable listing of a CodeObject, handy when debugging the compiler
+def disassemble(code_obj):
+    lines = [str(code_obj)]
+    code = code_obj.code
+    for pc in range(0, len(code), 2):
+        op, arg = code[pc], code[pc + 1]
+        name = OPCODE_NAMES[op]
+        if op in JUMP_OPS:
+            detail = f"-> {arg}"
+        elif op == BINARY_OP:
+            detail = f"{code_obj.op_sites[arg]}  (site {arg})"
+        elif op in (LOAD, STORE, DEFINE, PRINT):
+            detail = str(arg)
+        elif op in (NEG, NOT, POP, RETURN, RETURN_NONE):
+            detail = ""
+        else:
+            const = code_obj.consts[arg]
+            detail = repr(const.v) if isinstance(const, Value) else repr(const)
+        lines.append(f"{pc:6}  {name:<12} {detail}")
+    return "\n".join(lines)
+
+
+class Compiler:
+    BIN_OPS = {'+', '-', '*', '/', '==', '<', '<=', '>', '>=', '!=', '&&', '||'}
+
+    def __init__(self):
+        self.code = None
+        self.consts = None
+        self.const_index = None
+        self.resolution = None
+        self.op_sites = None
+        self.error_nodes = None
+
+    # compiles every function in a {(name, arg_count): func_def} table
+    def compile_program(self, func_table):
+        return {key: self.compile_function(func_def) for key, func_def in func_table.items()}
+
+    def compile_function(self, func_def):
+        self.code = array("l")
+        self.consts = []
+        self.const_index = {}
+        self.op_sites = []
+        self.error_nodes = {}
+        self.resolution = Resolver().resolve_function(func_def)
+        self.__compile_block(func_def.get("statements"))
+        self.__emit(RETURN_NONE)
+        params = [param.get("name") for param in func_def.get("args")]
+        return CodeObject(
+            func_def.get("name"), params, self.resolution.param_slots, self.resolution.frame_size,
+            self.code, self.consts, self.op_sites, self.error_nodes,
+        )
+
+    # ---------- emit helpers ----------
+
+    # node: the node to report errors raised by this instruction at
+    def __emit(self, op, arg=0, node=None):
+        if node is not None:
+            self.error_nodes[len(self.code)] = node
+        self.code.append(op)
+        self.code.append(arg)
+        return len(self.code) - 2  # where the instruction starts, for patching
+
+    def __patch(self, at, target):
+        self.code[at + 1] = target
+
+    def __here(self):
+        return len(self.code)
+
+    def __const(self, const, key=None):
+        # identical constants share one pool entry
+        key = key if key is not None else (type(const), const)
+        index = self.const_index.get(key)
+        if index is None:
+            index = len(self.consts)
+            self.consts.append(const)
+            self.const_index[key] = index
+        return index
+
+    def __value_const(self, value_type, val):
+        return self.__const(Value(value_type, val), key=("value", value_type, type(val), val))
+
+    def __emit_error(self, error_type, message, node):
+        self.__emit(ERROR, self.__const((error_type, message)), node)
+
+    # ---------- statements ----------
+
+    def __compile_block(self, statements):
+        for statement in statements:
+            self.__compile_statement(statement)
+
+    def __compile_statement(self, statement):
+        kind = statement.elem_type
+        if kind == InterpreterBase.RETURN_NODE:
+            expression = statement.get("expression")
+            if expression is None:
+                self.__emit(CONST, self.__value_const(Type.NIL, None))
+            elif expression.elem_type == InterpreterBase.FCALL_NODE and expression.get("name") not in BUILTINS:
+                for arg in expression.get("args"):
+                    self.__compile_expr(arg)
+                self.__emit(TAIL_CALL, self.__const((expression.get("name"), len(expression.get("args")))), expression)
+                return
+            else:
+                self.__compile_expr(statement.get("expression"))
+            self.__emit(RETURN)
+        elif kind == InterpreterBase.FCALL_NODE:
+            self.__compile_call(statement, as_statement=True)
+        elif kind == "=":
+            self.__compile_assign(statement)
+        elif kind == InterpreterBase.VAR_DEF_NODE:
+            slot = self.resolution.slot(statement)
+            if slot is None:  # the resolver found a duplicate definition
+                self.__emit_error(ErrorType.NAME_ERROR, f"Duplicate definition for variable {statement.get('name')}", statement)
+            else:
+                self.__emit(DEFINE, slot)
+        elif kind == InterpreterBase.IF_NODE:
+            self.__compile_if(statement)
+        elif kind == InterpreterBase.FOR_NODE:
+            self.__compile_for(statement)
+        # every other statement is ignored, same as the tree walker
+
+    def __compile_assign(self, assign_ast):
+        self.__compile_expr(assign_ast.get("expression"))
+        slot = self.resolution.slot(assign_ast)
+        if slot is None:
+            self.__emit_error(ErrorType.NAME_ERROR, f"Undefined variable {assign_ast.get('name')} in assignment", assign_ast)
+        else:
+            self.__emit(STORE, slot)
+
+    def __compile_if(self, if_ast):
+        self.__compile_expr(if_ast.get("condition"))
+        to_else = self.__emit(IF_FALSE, node=if_ast)
+        self.__compile_block(if_ast.get("statements"))
+        else_statements = if_ast.get("else_statements")
+        if else_statements is None:
+            self.__patch(to_else, self.__here())
+            return
+        to_end = self.__emit(JUMP)
+        self.__patch(to_else, self.__here())
+        self.__compile_block(else_statements)
+        self.__patch(to_end, self.__here())
+
+    def __compile_for(self, for_ast):
+        self.__compile_assign(for_ast.get("init"))
+        loop_start = self.__here()
+        self.__compile_expr(for_ast.get("condition"))
+        to_exit = self.__emit(LOOP_FALSE, node=for_ast)
+        self.__compile_block(for_ast.get("statements"))
+        self.__compile_assign(for_ast.get("update"))
+        self.__emit(JUMP, loop_start)
+        self.__patch(to_exit, self.__here())
+
+    # ---------- expressions ----------
+
+    def __compile_expr(self, expr_ast):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.INT_NODE:
+            self.__emit(CONST, self.__value_const(Type.INT, expr_ast.get("val")))
+        elif kind == InterpreterBase.STRING_NODE:
+            self.__emit(CONST, self.__value_const(Type.STRING, expr_ast.get("val")))
+        elif kind == InterpreterBase.BOOL_NODE:
+            self.__emit(CONST, self.__value_const(Type.BOOL, expr_ast.get("val")))
+        elif kind == InterpreterBase.NIL_NODE:
+            self.__emit(CONST, self.__value_const(Type.NIL, expr_ast.get("val")))
+        elif kind == InterpreterBase.VAR_NODE:
+            slot = self.resolution.slot(expr_ast)
+            if slot is None:
+                self.__emit_error(ErrorType.NAME_ERROR, f"Variable {expr_ast.get('name')} not found", expr_ast)
+            else:
+                self.__emit(LOAD, slot)
+        elif kind == InterpreterBase.FCALL_NODE:
+            self.__compile_call(expr_ast, as_statement=False)
+        elif kind in Compiler.BIN_OPS:
+            self.__compile_expr(expr_ast.get("op1"))
+            self.__compile_expr(expr_ast.get("op2"))
+            self.op_sites.append(kind)
+            self.__emit(BINARY_OP, len(self.op_sites) - 1, expr_ast)
+        elif kind == InterpreterBase.NEG_NODE:
+            self.__compile_expr(expr_ast.get("op1"))
+            self.__emit(NEG, node=expr_ast)
+        elif kind == InterpreterBase.NOT_NODE:
+            self.__compile_expr(expr_ast.get("op1"))
+            self.__emit(NOT, node=expr_ast)
+        else:
+            # unsupported expression: the tree walker evaluates it to None too
+            self.__emit(CONST, self.__const(None))
+
+    def __compile_call(self, call_node, as_statement):
+        func_name = call_node.get("name")
+        args = call_node.get("args")
+        if func_name == "inputi" or func_name == "inputs":
+            if len(args) > 1:
+                self.__emit_error(ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter", call_node)
+                return
+            if args:
+                self.__compile_expr(args[0])
+            self.__emit(INPUT, self.__const((func_name, len(args) == 1)))
+            if as_statement:
+                self.__emit(POP)
+            return
+
+        for arg in args:
+            self.__compile_expr(arg)
+        if func_name == "print":
+            self.__emit(PRINT, len(args))
+            if as_statement:
+                self.__emit(POP)
+            return
+        target = self.__const((func_name, len(args)))
+        self.__emit(CALL_STMT if as_statement else CALL, target, call_node)
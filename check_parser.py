@@ -0,0 +1,219 @@
+# Differential check of the hand-written parser (pratt.py) against the yacc grammar in
+# brewparse.py, over a corpus of randomly generated programs: valid ones, which must parse to
+# identical Element trees, and mutated ones (tokens dropped, duplicated or swapped), which
+# the hand-written parser must reject whenever yacc reports a syntax error. The token arrays
+# it reads (brewlex.tokenize) are checked against the PLY lexer's tokens on the way, and the
+# node positions both parsers record against each other.
+#   python check_parser.py [--programs N] [--seed S]
+import argparse
+import contextlib
+import io
+import random
+import sys
+
+from element import Element
+from intbase import InterpreterBase
+from brewlex import TokenStream, tokenize
+from brewparse import lexer, reset_lineno, yacc_parser, pratt_parser
+from positions import Positions
+
+NAMES = ["a", "b", "x", "total", "n", "foo", "main", "_t1"]
+TYPES = ["int", "bool", "string", "node", "void"]
+BINARY = ["+", "-", "*", "/", "==", "!=", "<", "<=", ">", ">=", "&&", "||"]
+
+
+class ProgramGenerator:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def program(self):
+        rng = self.rng
+        structs = [self.struct() for _ in range(rng.choice([0, 0, 0, 1, 2]))]
+        funcs = [self.func() for _ in range(rng.randint(1, 3))]
+        return "\n".join(structs + funcs) + "\n"
+
+    def struct(self):
+        fields = " ".join(f"{self.name()}: {self.rng.choice(TYPES)};" for _ in range(self.rng.randint(1, 3)))
+        return f"struct {self.name()} {{ {fields} }}"
+
+    def func(self):
+        rng = self.rng
+        args = ", ".join(self.name() + (f": {rng.choice(TYPES)}" if rng.random() < 0.3 else "") for _ in range(rng.randint(0, 3)))
+        return_type = f": {rng.choice(TYPES)}" if rng.random() < 0.3 else ""
+        return f"func {self.name()}({args}){return_type} {self.block(2)}"
+
+    def block(self, depth):
+        statements = " ".join(self.statement(depth) for _ in range(self.rng.randint(1, 4)))
+        return "{ " + statements + " }"
+
+    def statement(self, depth):
+        rng = self.rng
+        choices = ["assign", "var", "call", "return", "expr"]
+        if depth > 0:
+            choices += ["if", "for", "try"]
+        kind = rng.choice(choices + ["raise"])
+        if kind == "assign":
+            return f"{self.assign()};"
+        if kind == "var":
+            return f"var {self.name()}" + (f": {rng.choice(TYPES)}" if rng.random() < 0.3 else "") + ";"
+        if kind == "call":
+            return f"{self.call(2)};"
+        if kind == "return":
+            return "return;" if rng.random() < 0.2 else f"return {self.expression(3)};"
+        if kind == "expr":
+            return f"{self.expression(2)};"
+        if kind == "raise":
+            return f"raise {self.expression(1)};"
+        if kind == "if":
+            else_block = f" else {self.block(depth - 1)}" if rng.random() < 0.5 else ""
+            return f"if ({self.expression(3)}) {self.block(depth - 1)}{else_block}"
+        if kind == "for":
+            return f"for ({self.assign()}; {self.expression(2)}; {self.assign()}) {self.block(depth - 1)}"
+        catches = " ".join(f'catch "{self.name()}" {self.block(depth - 1)}' for _ in range(rng.randint(1, 2)))
+        return f"try {self.block(depth - 1)} {catches}"
+
+    def assign(self):
+        return f"{self.variable()} = {self.expression(3)}"
+
+    def name(self):
+        return self.rng.choice(NAMES)
+
+    def variable(self):
+        return ".".join(self.name() for _ in range(self.rng.choice([1, 1, 1, 2, 3])))
+
+    def call(self, depth):
+        args = ", ".join(self.expression(depth - 1) for _ in range(self.rng.randint(0, 3)))
+        return f"{self.rng.choice(NAMES + ['print', 'inputi'])}({args})"
+
+    def expression(self, depth):
+        rng = self.rng
+        if depth <= 0 or rng.random() < 0.3:
+            return self.atom()
+        kind = rng.choice(["binary", "binary", "binary", "unary", "group", "call"])
+        if kind == "binary":
+            return f"{self.expression(depth - 1)} {rng.choice(BINARY)} {self.expression(depth - 1)}"
+        if kind == "unary":
+            return rng.choice(["-", "!", "- ", "!!", "-!"]) + self.expression(depth - 1)
+        if kind == "group":
+            return f"({self.expression(depth - 1)})"
+        return self.call(depth)
+
+    def atom(self):
+        rng = self.rng
+        kind = rng.choice(["number", "string", "bool", "nil", "variable", "new"])
+        if kind == "number":
+            return str(rng.randint(0, 1000))
+        if kind == "string":
+            return f'"{rng.choice(["", "hi", "a b", "true"])}"'
+        if kind == "bool":
+            return rng.choice(["true", "false"])
+        if kind == "nil":
+            return "nil"
+        if kind == "new":
+            return f"new {rng.choice(TYPES)}"
+        return self.variable()
+
+
+# the same program with a few of its tokens dropped, duplicated or swapped
+def mutate(program, rng):
+    reset_lineno()
+    lexer.input(program)
+    words = [str(token.value) if token.type != "STRING" else f'"{token.value}"' for token in lexer]
+    for _ in range(rng.randint(1, 3)):
+        if len(words) < 2:
+            break
+        i = rng.randrange(len(words))
+        action = rng.choice(["drop", "duplicate", "swap"])
+        if action == "drop":
+            del words[i]
+        elif action == "duplicate":
+            words.insert(i, words[i])
+        else:
+            j = rng.randrange(len(words))
+            words[i], words[j] = words[j], words[i]
+    return " ".join(words)
+
+
+def same_tree(a, b):
+    if isinstance(a, Element):
+        return (isinstance(b, Element) and a.elem_type == b.elem_type and a.field_names == b.field_names
+                and all(same_tree(getattr(a, key), getattr(b, key)) for key in a.field_names))
+    if isinstance(a, list):
+        return isinstance(b, list) and len(a) == len(b) and all(same_tree(x, y) for x, y in zip(a, b))
+    return type(a) is type(b) and a == b
+
+
+# the offset of every node in tree (except the program node, which has no position), in
+# pre-order
+def node_offsets(tree, positions, offsets):
+    if isinstance(tree, Element):
+        if tree.elem_type != InterpreterBase.PROGRAM_NODE:
+            offsets.append(positions.offset(tree))
+        for key in tree.field_names:
+            node_offsets(getattr(tree, key), positions, offsets)
+    elif isinstance(tree, list):
+        for item in tree:
+            node_offsets(item, positions, offsets)
+    return offsets
+
+
+# None if both parsers agree on program, otherwise a description of the difference
+def compare(program):
+    stream = tokenize(program)
+    expected = TokenStream.from_lexer(program).as_tuples()
+    if stream.as_tuples() != expected:
+        return f"different tokens:\n  lex:      {expected}\n  tokenize: {stream.as_tuples()}"
+    pratt_positions = Positions(program)
+    pratt_ast = pratt_parser.parse(stream, pratt_positions)
+    reset_lineno()
+    errors = io.StringIO()
+    yacc_positions = Positions(program)
+    yacc_parser.positions = yacc_positions
+    try:
+        with contextlib.redirect_stdout(errors):  # p_error prints the syntax errors
+            yacc_ast = yacc_parser.parse(program, lexer=lexer, tracking=True)
+    finally:
+        yacc_parser.positions = None
+    yacc_ok = yacc_ast is not None and not errors.getvalue()
+    if pratt_ast is None:
+        return "pratt rejected a program yacc accepts" if yacc_ok else None
+    if not yacc_ok:
+        return f"pratt accepted a program yacc rejects: {errors.getvalue().strip()}"
+    if not same_tree(pratt_ast, yacc_ast):
+        return f"different trees:\n  yacc:  {yacc_ast}\n  pratt: {pratt_ast}"
+    yacc_offsets = node_offsets(yacc_ast, yacc_positions, [])
+    pratt_offsets = node_offsets(pratt_ast, pratt_positions, [])
+    if None in yacc_offsets or yacc_offsets != pratt_offsets:
+        return f"different positions:\n  yacc:  {yacc_offsets}\n  pratt: {pratt_offsets}"
+    return None
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--programs", type=int, default=2000)
+    args.add_argument("--seed", type=int, default=0)
+    args = args.parse_args()
+    rng = random.Random(args.seed)
+    generator = ProgramGenerator(rng)
+
+    failures = 0
+    counts = {"valid": 0, "mutated": 0, "rejected by both": 0}
+    for _ in range(args.programs):
+        program = generator.program()
+        for label, source in (("valid", program), ("mutated", mutate(program, rng))):
+            counts[label] += 1
+            problem = compare(source)
+            if problem is None and label == "mutated":
+                if pratt_parser.parse(tokenize(source)) is None:
+                    counts["rejected by both"] += 1
+            if problem is not None:
+                failures += 1
+                if failures <= 10:
+                    print(f"--- {label} program:\n{source}\n{problem}\n")
+    print(f"{counts['valid']} valid and {counts['mutated']} mutated programs "
+          f"({counts['rejected by both']} rejected by both parsers), {failures} differences")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
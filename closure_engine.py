@@ -0,0 +1,417 @@
+# Closure-compilation engine: instead of re-dispatching on elem_type strings every time a
+# node runs, each function's Element tree is compiled ONCE into nested python closures
+# (one per node, with its operands and field values already captured). Running the program
+# is then just calling closures. Behaviour matches the tree walker in interpreterv2.py
+# exactly (same output, same errors, same quirks).
+#
+# Protocol used by the compiled code:
+# - every closure takes the current call's frame: a flat list of variable slots assigned
+#   by resolver.py, so variable access is just frame[slot]
+# - expression closures return a Value
+# - statement closures return None to keep going, or the returned Value when the function
+#   should return early (instead of the (result, ret_early) tuples)
+# - invoke(args) returns None if the function fell off the end, otherwise the Value it returned
+# - `return f(...)` on a user function doesn't call f: it returns a TailCall, which travels
+#   back up like any returned Value until the invoke() that's running the function, and that
+#   invoke() runs f in its place. So tail recursion doesn't grow the python stack
+
+from resolver import Resolver
+from inline_cache import BinaryOpCache
+from memo import MISSING, memo_key
+from type_valuev1 import Type, Value, NIL, TRUE, FALSE, ZERO, int_value, bool_value, create_value, get_printable
+from intbase import InterpreterBase, ErrorType
+
+
+class CompiledFunc:
+    def __init__(self, func_def):
+        self.name = func_def.get("name")
+        self.resolution = Resolver().resolve_function(func_def)
+        self.body = None  # filled in once every function has a CompiledFunc (allows recursion)
+
+    def new_frame(self, args):
+        frame = [None] * self.resolution.frame_size
+        for slot, arg_value in zip(self.resolution.param_slots, args):
+            if slot is not None:
+                frame[slot] = create_value(arg_value.value())  # pass-by-value
+        return frame
+
+
+# a pending `return f(args)`, run by the invoke() that receives it
+class TailCall:
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+
+
+class ClosureEngine:
+    def __init__(self, interpreter):
+        self.interp = interpreter
+        self.funcs = {}
+        self.resolution = None  # of the function being compiled
+
+    def run(self, func_table, main_func):
+        # two passes so calls can capture their target directly
+        for key, func_def in func_table.items():
+            self.funcs[key] = CompiledFunc(func_def)
+        for key, func_def in func_table.items():
+            self.resolution = self.funcs[key].resolution
+            self.funcs[key].body = self.__compile_block(func_def.get("statements"))
+        main = self.funcs[(main_func.get("name"), 0)]
+        self.__make_invoke(main)(())
+
+    # ---------- functions ----------
+
+    def __make_invoke(self, compiled):
+        new_frame = compiled.new_frame
+
+        def invoke(args):
+            result = compiled.body(new_frame(args))
+            while type(result) is TailCall:
+                callee = result.func
+                result = callee.body(callee.new_frame(result.args))
+                if result is None:
+                    result = NIL  # `return f();` where f fell off the end still returns (nil)
+            return result
+
+        return invoke
+
+    # ---------- statements ----------
+
+    def __compile_block(self, statements):
+        compiled = []
+        for statement in statements:
+            closure = self.__compile_statement(statement)
+            if closure is not None:
+                compiled.append(closure)
+        compiled = tuple(compiled)
+
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def run_block(frame):
+            for statement in compiled:
+                result = statement(frame)
+                if result is not None:
+                    return result
+            return None
+
+        return run_block
+
+    def __compile_statement(self, statement):
+        kind = statement.elem_type
+        if kind == InterpreterBase.RETURN_NODE:
+            return self.__compile_return(statement)
+        if kind == InterpreterBase.FCALL_NODE:
+            return self.__compile_call_statement(statement)
+        if kind == "=":
+            return self.__compile_assign(statement)
+        if kind == InterpreterBase.VAR_DEF_NODE:
+            return self.__compile_var_def(statement)
+        if kind == InterpreterBase.IF_NODE:
+            return self.__compile_if(statement)
+        if kind == InterpreterBase.FOR_NODE:
+            return self.__compile_for(statement)
+        return None  # the tree walker ignores every other statement, so do we
+
+    def __compile_return(self, return_node):
+        expression = return_node.get("expression")
+        if expression is None:
+            return lambda frame: NIL
+        if expression.elem_type == InterpreterBase.FCALL_NODE:
+            tail_call = self.__compile_tail_call(expression)
+            if tail_call is not None:
+                return tail_call
+        return self.__compile_expr(expression)  # the value IS the early return
+
+    def __compile_call_statement(self, call_node):
+        func_name = call_node.get("name")
+        if func_name == "print":
+            do_print = self.__compile_print(call_node)
+
+            def print_statement(frame):
+                do_print(frame)
+
+            return print_statement
+        if func_name == "inputi" or func_name == "inputs":
+            do_input = self.__compile_input(call_node)
+
+            def input_statement(frame):
+                do_input(frame)
+
+            return input_statement
+        # a statement-level call hands back whatever the callee returned, so a callee that hit
+        # a `return` makes the caller return too (same as the tree walker)
+        return self.__compile_user_call(call_node)
+
+    def __compile_assign(self, assign_ast):
+        var_name = assign_ast.get("name")
+        expr = self.__compile_expr(assign_ast.get("expression"))
+        slot = self.resolution.slot(assign_ast)
+
+        if slot is None:
+            error = self.interp.error_at(assign_ast)
+
+            def assign_undefined(frame):
+                expr(frame)
+                error(ErrorType.NAME_ERROR, f"Undefined variable {var_name} in assignment")
+
+            return assign_undefined
+
+        def assign(frame):
+            frame[slot] = expr(frame)
+
+        return assign
+
+    def __compile_var_def(self, var_ast):
+        var_name = var_ast.get("name")
+        slot = self.resolution.slot(var_ast)
+
+        if slot is None:  # the resolver found a duplicate definition
+            error = self.interp.error_at(var_ast)
+
+            def duplicate_var_def(frame):
+                error(ErrorType.NAME_ERROR, f"Duplicate definition for variable {var_name}")
+
+            return duplicate_var_def
+
+        def var_def(frame):
+            frame[slot] = ZERO
+
+        return var_def
+
+    def __compile_if(self, if_ast):
+        condition = self.__compile_expr(if_ast.get("condition"))
+        then_block = self.__compile_block(if_ast.get("statements"))
+        else_statements = if_ast.get("else_statements")
+        else_block = self.__compile_block(else_statements) if else_statements is not None else None
+        error = self.interp.error_at(if_ast)
+
+        def run_if(frame):
+            condition_value = condition(frame)
+            if condition_value.type() != Type.BOOL:
+                error(ErrorType.TYPE_ERROR, f"Condition in if statement must evaluate to a boolean. The condition is type: {condition_value.type()}")
+            if condition_value.v:
+                return then_block(frame)
+            if else_block is not None:
+                return else_block(frame)
+            return None
+
+        return run_if
+
+    def __compile_for(self, for_ast):
+        init = self.__compile_assign(for_ast.get("init"))
+        condition = self.__compile_expr(for_ast.get("condition"))
+        update = self.__compile_assign(for_ast.get("update"))
+        body = self.__compile_block(for_ast.get("statements"))
+        error = self.interp.error_at(for_ast)
+
+        def run_for(frame):
+            init(frame)
+            while True:
+                condition_value = condition(frame)
+                if condition_value.type() != Type.BOOL:
+                    error(ErrorType.TYPE_ERROR, f"Loop condition ({condition_value}) isn't a boolean")
+                if not condition_value.v:
+                    return None
+                result = body(frame)
+                if result is not None:
+                    return result
+                update(frame)
+
+        return run_for
+
+    # ---------- expressions ----------
+
+    def __compile_expr(self, expr_ast):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.INT_NODE:
+            const = int_value(expr_ast.get("val"))
+            return lambda frame: const
+        if kind == InterpreterBase.STRING_NODE:
+            const = Value(Type.STRING, expr_ast.get("val"))
+            return lambda frame: const
+        if kind == InterpreterBase.BOOL_NODE:
+            const = bool_value(expr_ast.get("val"))
+            return lambda frame: const
+        if kind == InterpreterBase.NIL_NODE:
+            return lambda frame: NIL
+        if kind == InterpreterBase.VAR_NODE:
+            return self.__compile_var(expr_ast)
+        if kind == InterpreterBase.FCALL_NODE:
+            func_name = expr_ast.get("name")
+            if func_name == "print":
+                return self.__compile_print(expr_ast)
+            if func_name == "inputi" or func_name == "inputs":
+                return self.__compile_input(expr_ast)
+            call = self.__compile_user_call(expr_ast)
+
+            def call_expr(frame):
+                result = call(frame)
+                return NIL if result is None else result
+
+            return call_expr
+        if kind in self.interp.BIN_OPS or kind in {"&&", "||"}:
+            return self.__compile_op(expr_ast)
+        if kind == InterpreterBase.NEG_NODE:
+            return self.__compile_neg(expr_ast)
+        if kind == InterpreterBase.NOT_NODE:
+            return self.__compile_not(expr_ast)
+        return lambda frame: None  # unsupported expression: the tree walker evaluates it to None too
+
+    def __compile_var(self, expr_ast):
+        var_name = expr_ast.get("name")
+        slot = self.resolution.slot(expr_ast)
+
+        if slot is None:
+            error = self.interp.error_at(expr_ast)
+
+            def read_undefined(frame):
+                error(ErrorType.NAME_ERROR, f"Variable {var_name} not found")
+
+            return read_undefined
+
+        return lambda frame: frame[slot]
+
+    def __compile_neg(self, expr_ast):
+        operand = self.__compile_expr(expr_ast.get("op1"))
+        error = self.interp.error_at(expr_ast)
+
+        def neg(frame):
+            value = operand(frame)
+            if value.type() != Type.INT:
+                error(ErrorType.TYPE_ERROR, "(- or 'neg') requires an INT operand")
+            return int_value(-value.v)
+
+        return neg
+
+    def __compile_not(self, expr_ast):
+        operand = self.__compile_expr(expr_ast.get("op1"))
+        error = self.interp.error_at(expr_ast)
+
+        def logical_not(frame):
+            value = operand(frame)
+            if value.type() != Type.BOOL:
+                error(ErrorType.TYPE_ERROR, "(!) requires a BOOL operand")
+            return FALSE if value.v else TRUE
+
+        return logical_not
+
+    def __compile_op(self, arith_ast):
+        left = self.__compile_expr(arith_ast.get("op1"))
+        right = self.__compile_expr(arith_ast.get("op2"))
+        error = self.interp.error_at(arith_ast)
+        # this node's inline cache: the handler for the operand types it saw last
+        cache = BinaryOpCache(arith_ast.elem_type, self.interp.op_to_lambda)
+        self.interp.inline_caches.append(cache)
+
+        def binary_op(frame):
+            left_value = left(frame)
+            left_type = left_value.type()
+            right_value = right(frame)
+            if left_type == cache.left_type and right_value.t == cache.right_type:
+                cache.hits += 1
+                return cache.handler(left_value, right_value)
+            return cache.miss(left_value, right_value, error)
+
+        return binary_op
+
+    # ---------- calls ----------
+
+    def __compile_args(self, call_node):
+        return tuple(self.__compile_expr(arg) for arg in call_node.get("args"))
+
+    def __compile_user_call(self, call_node):
+        func_name = call_node.get("name")
+        args = self.__compile_args(call_node)
+        arg_count = len(args)
+        compiled = self.funcs.get((func_name, arg_count))
+
+        if compiled is None:
+            error = self.interp.error_at(call_node)
+
+            def missing_call(frame):
+                [arg(frame) for arg in args]  # args are evaluated before the lookup fails
+                error(ErrorType.NAME_ERROR, f"Function {func_name} w/ arg_count {arg_count} not found")
+
+            return missing_call
+
+        invoke = self.__make_invoke(compiled)
+        if self.interp.memo is not None and (func_name, arg_count) in self.interp.pure_functions:
+            invoke = self.__memoized(func_name, invoke)
+        if arg_count == 0:
+            return lambda frame: invoke(())
+        if arg_count == 1:
+            only_arg = args[0]
+            return lambda frame: invoke((only_arg(frame),))
+        return lambda frame: invoke([arg(frame) for arg in args])
+
+    # wraps invoke so calls are looked up in the interpreter's MemoCache first
+    def __memoized(self, func_name, invoke):
+        memo = self.interp.memo
+
+        def memoized_invoke(args):
+            key = memo_key(func_name, args)
+            result = memo.get(key)
+            if result is MISSING:
+                result = invoke(args)
+                memo.put(key, result)
+            return result
+
+        return memoized_invoke
+
+    # `return f(...)`: evaluates the args and hands the call back to invoke() as a TailCall.
+    # Returns None for calls that can't be tail calls (builtins, unknown functions)
+    def __compile_tail_call(self, call_node):
+        func_name = call_node.get("name")
+        if func_name in ("print", "inputi", "inputs"):
+            return None
+        args = self.__compile_args(call_node)
+        compiled = self.funcs.get((func_name, len(args)))
+        if compiled is None:
+            return None
+        if len(args) == 1:
+            only_arg = args[0]
+            return lambda frame: TailCall(compiled, (only_arg(frame),))
+        return lambda frame: TailCall(compiled, [arg(frame) for arg in args])
+
+    def __compile_print(self, call_ast):
+        args = self.__compile_args(call_ast)
+        output = self.interp.output
+
+        def do_print(frame):
+            out = ""
+            for arg in args:
+                result = arg(frame)
+                if result.type() == Type.BOOL:
+                    out += "true" if result.value() else "false"
+                elif result.type() != Type.NIL:
+                    out += get_printable(result)
+            output(out)
+            return NIL
+
+        return do_print
+
+    def __compile_input(self, call_ast):
+        args = call_ast.get("args")
+        func_name = call_ast.get("name")
+        interp = self.interp
+        error = interp.error_at(call_ast)
+        prompt = None
+        too_many = args is not None and len(args) > 1
+        if args is not None and len(args) == 1:
+            prompt = self.__compile_expr(args[0])
+
+        def do_input(frame):
+            if prompt is not None:
+                interp.output(get_printable(prompt(frame)))
+            elif too_many:
+                error(ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter")
+            inp = interp.get_input(func_name == "inputi")
+            if func_name == "inputi":
+                return int_value(int(inp))
+            if func_name == "inputs":
+                return Value(Type.STRING, str(inp))
+
+        return do_input
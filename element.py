@@ -1,19 +1,63 @@
+from intbase import InterpreterBase
+
+# Every node type has its own class, with __slots__ for exactly its fields, which are plain
+# attributes (node.statements, node.op1, ...). Element(elem_type, **fields) still builds any
+# node: it picks the class for elem_type. get(field) is kept for the callers that look
+# fields up by name.
+
+BINARY_OPS = ("+", "-", "*", "/", "==", "!=", "<", "<=", ">", ">=", "&&", "||")
+
+# class name, node types, fields (in the order the parsers pass them)
+NODE_TYPES = (
+    ("ProgramNode", (InterpreterBase.PROGRAM_NODE,), ("structs", "functions")),
+    ("StructNode", (InterpreterBase.STRUCT_NODE,), ("name", "fields")),
+    ("FieldDefNode", (InterpreterBase.FIELD_DEF_NODE,), ("name", "var_type")),
+    ("FuncNode", (InterpreterBase.FUNC_NODE,), ("name", "args", "return_type", "statements")),
+    ("ArgNode", (InterpreterBase.ARG_NODE,), ("name", "var_type")),
+    ("VarDefNode", (InterpreterBase.VAR_DEF_NODE,), ("name", "var_type")),
+    ("AssignNode", ("=",), ("name", "expression")),
+    ("IfNode", (InterpreterBase.IF_NODE,), ("condition", "statements", "else_statements")),
+    ("ForNode", (InterpreterBase.FOR_NODE,), ("init", "condition", "update", "statements")),
+    ("TryNode", (InterpreterBase.TRY_NODE,), ("statements", "catchers")),
+    ("CatchNode", (InterpreterBase.CATCH_NODE,), ("exception_type", "statements")),
+    ("ReturnNode", (InterpreterBase.RETURN_NODE,), ("expression",)),
+    ("RaiseNode", (InterpreterBase.RAISE_NODE,), ("exception_type",)),
+    ("FcallNode", (InterpreterBase.FCALL_NODE,), ("name", "args")),
+    ("UnaryOpNode", (InterpreterBase.NOT_NODE, InterpreterBase.NEG_NODE), ("op1",)),
+    ("BinaryOpNode", BINARY_OPS, ("op1", "op2")),
+    ("LiteralNode", (InterpreterBase.INT_NODE, InterpreterBase.STRING_NODE, InterpreterBase.BOOL_NODE), ("val",)),
+    ("NilNode", (InterpreterBase.NIL_NODE,), ()),
+    ("NewNode", (InterpreterBase.NEW_NODE,), ("var_type",)),
+    ("VarNode", (InterpreterBase.VAR_NODE,), ("name",)),
+)
+
+
 class Element:
-    def __init__(self, elem_type, **kwargs):
-        self.elem_type = elem_type
-        self.dict = {}
-        for key, value in kwargs.items():
-            self.dict[key] = value
+    __slots__ = ("elem_type",)
+    field_names = ()
+
+    def __new__(cls, elem_type, *values, **fields):
+        if cls is Element:
+            cls = node_classes.get(elem_type)
+            if cls is None:
+                raise ValueError(f"Unknown node type {elem_type!r}")
+        return object.__new__(cls)
 
+    # (each node class gets its own __init__, see make_node_class)
+
+    # copy and pickle rebuild the node through Element(elem_type, *fields), since __new__
+    # needs the node type
+    def __reduce__(self):
+        return (Element, (self.elem_type, *[getattr(self, key) for key in self.field_names]))
+
+    # None for anything that isn't one of this node's fields (not the methods, elem_type, ...)
     def get(self, key):
-        if key not in self.dict:
-            return None
-        return self.dict[key]
+        return getattr(self, key) if key in self.field_names else None
 
     def __str__(self):
         s = f"{self.elem_type}: "
-        for key, value in self.dict.items():
-            s += key + ": " + self.__val(value) + ", "
+        for key in self.field_names:
+            s += key + ": " + self.__val(getattr(self, key)) + ", "
         return s[0:-2]
 
     def __val(self, v):
@@ -27,3 +71,25 @@ class Element:
                 return "[" + s[0:-2] + "]"
             return "[" + s + "]"
         return str(v)
+
+
+# a slotted Element subclass with an __init__(elem_type, field=None, ...) that stores each
+# field straight into its slot (generated, like namedtuple's, so it's one plain function call)
+def make_node_class(class_name, field_names):
+    args = "".join(f", {name}=None" for name in field_names)
+    body = "".join(f"\n    self.{name} = {name}" for name in field_names)
+    namespace = {}
+    exec(f"def __init__(self, elem_type{args}):\n    self.elem_type = elem_type{body}", namespace)
+    return type(class_name, (Element,), {
+        "__slots__": field_names,
+        "field_names": field_names,
+        "__init__": namespace["__init__"],
+    })
+
+
+node_classes = {}  # node type -> its class
+for class_name, elem_types, field_names in NODE_TYPES:
+    node_class = make_node_class(class_name, field_names)
+    globals()[class_name] = node_class
+    for elem_type in elem_types:
+        node_classes[elem_type] = node_class
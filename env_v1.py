@@ -30,6 +30,13 @@ class EnvironmentManager:
         else:
             raise RuntimeError("🙅‍♀️ Michelle!! check whats wrong bc u cannot pop anymore dicts on the stack!")
 
+    # start the next iteration of a loop block: reuse its dict instead of pop + push
+    def clear_dict(self):
+        if len(self.environment) > 0 and len(self.environment[-1]) > 1:
+            self.environment[-1][-1].clear()
+        else:
+            raise RuntimeError("🙅‍♀️ Michelle!! check whats wrong bc there's no block dict to clear!")
+
     # gets the data from var name (going from inner -> outer dict)
     def get(self, symbol):
         if not self.environment:
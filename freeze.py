@@ -0,0 +1,62 @@
+# Regenerates the frozen lexer and parser tables loaded when BREWIN_FROZEN_TABLES=1 (see
+# brewlex.py), after a change to the tokens in brewlex.py or the grammar in brewparse.py.
+#   python freeze.py          rewrite lextab.py and parsetab.py
+#   python freeze.py --check  only report whether they're current (exit status 1 if not)
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def freeze():
+    os.environ.pop("BREWIN_FROZEN_TABLES", None)
+    import brewparse  # built from the rules: yacc rewrites parsetab.py if it's out of date
+    brewparse.lexer.writetab("lextab", HERE)
+    print("froze lextab.py and parsetab.py")
+    return 0
+
+
+def check():
+    # import through the frozen tables (so nothing gets written), then rebuild the tables from
+    # the rules and compare
+    os.environ["BREWIN_FROZEN_TABLES"] = "1"
+    try:
+        import brewparse
+    except ImportError as e:
+        print(f"frozen tables are missing or unreadable ({e}), run: python freeze.py")
+        return 1
+    import brewlex
+    import parsetab
+    from ply import yacc
+
+    stale = []
+    with tempfile.TemporaryDirectory() as directory:
+        # lex.lex() called from brewlex's globals, like at import time: the rules have to be
+        # collected in definition order (lex(module=...) would sort them by name, and the
+        # order of the same-length string rules decides which one matches first)
+        eval("lex.lex()", vars(brewlex)).writetab("lextab", directory)
+        if read(os.path.join(directory, "lextab.py")) != read(os.path.join(HERE, "lextab.py")):
+            stale.append("lextab.py")
+    grammar = yacc.ParserReflect(vars(brewparse))
+    grammar.get_all()
+    if grammar.signature() != parsetab._lr_signature:
+        stale.append("parsetab.py")
+
+    if stale:
+        print(f"out of date: {', '.join(stale)}, run: python freeze.py")
+        return 1
+    print("frozen tables are current")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(check() if "--check" in sys.argv[1:] else freeze())
@@ -0,0 +1,87 @@
+# Incremental reparsing, for programs that get edited and run again and again (a REPL, an
+# editor re-running the program on every change). IncrementalParser.parse(program) cuts the
+# program into definitions the way stream_parse does, and only parses the ones whose text
+# changed since the last call: the Elements of all the others are reused as they are. The
+# parsing time goes with the size of the edit; what's left that goes with the size of the
+# program is a regex scan to find the definitions and a dict lookup for each one.
+#
+# It has the parse() of a ParseCache, so it can be passed as Interpreter(parse_cache=...).
+# The positions of each definition's nodes are kept with its Elements, counted from the start
+# of the definition, and moved to wherever the definition is in the new program.
+from element import Element
+from intbase import InterpreterBase
+from brewparse import parse_program
+from positions import Positions
+from stream_parse import definition_groups, split_program
+
+
+class IncrementalParser:
+    def __init__(self):
+        # text of a definition (structs go with the first func) -> its program Element and the
+        # Positions of its nodes
+        self.groups = {}
+        self.spans = {}  # (name, arity) -> (start, end, hash of the text) of every func in the last program
+        self.functions = {}  # (name, arity) -> func Element, for the last program
+        self.reused = 0
+        self.reparsed = 0
+
+    # the program Element for program; raises SyntaxError like parse_program. positions: a
+    # Positions for program to add the positions of the nodes to
+    def parse(self, program, parser="yacc", positions=None):
+        # every definition, parsed or reused: (its pieces, offset, program Element, Positions)
+        parsed = []
+        for pieces, first_line, offset in definition_groups(split_program(program)):
+            text = "".join(pieces)
+            group = self.groups.get(text)
+            if group is None:
+                group_positions = Positions(text, first_line)
+                try:
+                    group = (parse_program(text, parser, first_line, group_positions, recover=False), group_positions)
+                except SyntaxError:
+                    # PLY's error recovery may still make a tree of the whole program, and one
+                    # that no piece on its own would give: parse it whole, like parse_program
+                    return self.__parse_whole(program, parser, positions)
+                self.reparsed += 1
+            else:
+                self.reused += 1
+            parsed.append((pieces, offset) + group)
+
+        groups = {}
+        structs = []
+        functions = []
+        spans = {}
+        table = {}
+        for pieces, offset, ast, group_positions in parsed:
+            text = "".join(pieces)
+            groups[text] = (ast, group_positions)
+            if positions is not None:
+                positions.include(group_positions, offset)
+            structs.extend(ast.get("structs"))
+            for func_def in ast.get("functions"):
+                functions.append(func_def)
+                # the func is the last piece of its group (with the blanks and comments before it)
+                end = offset + len(text)
+                key = (func_def.get("name"), len(func_def.get("args")))
+                spans[key] = (end - len(pieces[-1]), end, hash(pieces[-1]))
+                table[key] = func_def
+        # only keep the definitions of this program: the cache never grows past one program
+        self.groups = groups
+        self.spans = spans
+        self.functions = table
+        return Element(InterpreterBase.PROGRAM_NODE, structs=structs, functions=functions)
+
+    # a program with a syntax error: parsed as a whole, and none of its pieces are kept (there
+    # are no spans either, the tree doesn't have to match the pieces)
+    def __parse_whole(self, program, parser, positions):
+        self.clear()
+        ast = parse_program(program, parser, positions=positions)
+        self.functions = {(func_def.get("name"), len(func_def.get("args"))): func_def for func_def in ast.get("functions")}
+        return ast
+
+    def stats(self):
+        return {"reused": self.reused, "reparsed": self.reparsed, "definitions": len(self.groups)}
+
+    def clear(self):
+        self.groups = {}
+        self.spans = {}
+        self.functions = {}
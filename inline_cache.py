@@ -0,0 +1,88 @@
+# Monomorphic inline caches for binary operators.
+#
+# Every binary-op node (an Element for the tree walker, a closure for the closure engine,
+# a BINARY_OP instruction for the VM) owns one BinaryOpCache. It remembers the operand
+# type pair it last saw and the handler specialized for that pair, so the hot path is one
+# guard on the two types plus the handler call, instead of the two op_to_lambda lookups and
+# the membership test in the generic path. When the operand types change the guard fails,
+# the engine falls back to miss(), which runs the generic checks (raising the same errors
+# as Interpreter.__eval_op) and re-specializes the cache.
+
+from type_valuev1 import Type, Value, int_value, bool_value
+from intbase import ErrorType
+
+# faster versions of the interpreter's op_to_lambda handlers for the common cases: they
+# read the value fields directly instead of going through .type()/.value()
+SPECIALIZED = {
+    (Type.INT, "+"): lambda x, y: int_value(x.v + y.v),
+    (Type.INT, "-"): lambda x, y: int_value(x.v - y.v),
+    (Type.INT, "*"): lambda x, y: int_value(x.v * y.v),
+    (Type.INT, "/"): lambda x, y: int_value(x.v // y.v),
+    (Type.INT, "=="): lambda x, y: bool_value(x.v == y.v),
+    (Type.INT, "!="): lambda x, y: bool_value(x.v != y.v),
+    (Type.INT, "<"): lambda x, y: bool_value(x.v < y.v),
+    (Type.INT, "<="): lambda x, y: bool_value(x.v <= y.v),
+    (Type.INT, ">"): lambda x, y: bool_value(x.v > y.v),
+    (Type.INT, ">="): lambda x, y: bool_value(x.v >= y.v),
+    (Type.BOOL, "&&"): lambda x, y: bool_value(x.v and y.v),
+    (Type.BOOL, "||"): lambda x, y: bool_value(x.v or y.v),
+    (Type.BOOL, "=="): lambda x, y: bool_value(x.v == y.v),
+    (Type.BOOL, "!="): lambda x, y: bool_value(x.v != y.v),
+    (Type.STRING, "+"): lambda x, y: Value(Type.STRING, x.v + y.v),
+    (Type.STRING, "=="): lambda x, y: bool_value(x.v == y.v),
+    (Type.STRING, "!="): lambda x, y: bool_value(x.v != y.v),
+}
+
+
+class BinaryOpCache:
+    def __init__(self, operator, op_to_lambda):
+        self.operator = operator
+        # generic handlers for this operator, keyed by operand type
+        self.handlers = {t: type_ops[operator] for t, type_ops in op_to_lambda.items() if operator in type_ops}
+        self.left_type = None
+        self.right_type = None
+        self.handler = None
+        self.hits = 0
+        self.misses = 0
+
+    # generic path, taken when the guard on (left type, right type) fails
+    def miss(self, left, right, error):
+        self.misses += 1
+        left_type = left.type()
+        right_type = right.type()
+        handler = self.__specialize(left_type, right_type)
+        if handler is None:
+            if left_type != right_type:
+                error(
+                    ErrorType.TYPE_ERROR,
+                    f"Incompatible types [{left_type} and {right_type}] for {self.operator} operation",
+                )
+            error(
+                ErrorType.TYPE_ERROR,
+                f"Incompatible operator {self.operator} for type {left_type}",
+            )
+        self.left_type = left_type
+        self.right_type = right_type
+        self.handler = handler
+        return handler(left, right)
+
+    def __specialize(self, left_type, right_type):
+        if left_type != right_type:
+            if self.operator == "==" or self.operator == "!=":
+                result = bool_value(self.operator == "!=")  # different types are never equal
+                return lambda x, y: result
+            return None
+        if left_type not in self.handlers:
+            return None
+        return SPECIALIZED.get((left_type, self.operator), self.handlers[left_type])
+
+
+# totals over a list of caches: hits, misses, how many caches there are and how many of
+# them saw more than one type pair (a miss after the first one means the types changed)
+def cache_stats(caches):
+    return {
+        "hits": sum(cache.hits for cache in caches),
+        "misses": sum(cache.misses for cache in caches),
+        "caches": len(caches),
+        "polymorphic": sum(1 for cache in caches if cache.misses > 1),
+    }
@@ -0,0 +1,178 @@
+# Input providers: where inputi()/inputs() read their lines from. Pass one as
+# Interpreter(inp=...) instead of a list of lines, which has to hold the whole input before the
+# run starts.
+#
+# LineReader and IntReader read a file a block at a time (memory-mapped when it's a regular
+# file opened in binary mode, or given by path) and split each block into lines ahead of the
+# reads, so only one block is in memory at once whatever the size of the input. IntReader also
+# turns a whole block into ints at once, for programs that read their input with inputi().
+#
+# inputs() reads with read_line() and inputi() with read_int(), which gives the line for
+# inputi() to convert unless the provider already has it as an int.
+#
+# at_eof says what a read past the end gives: a value to return (None by default, like the
+# end of a list of lines), or EOFError to raise it.
+#
+# The async versions, for Interpreter.run_async, are in async_io.py.
+import mmap
+import os
+
+from mapped_file import map_file
+
+BLOCK_SIZE = 1 << 16  # bytes (or characters) read ahead at a time
+
+_END = object()
+
+
+class InputProvider:
+    awaitable = False  # read_line() is a coroutine (async_io's inputs, for run_async only)
+
+    def __init__(self, at_eof=None):
+        self.at_eof = at_eof
+        self.count = 0  # lines read
+
+    # the next line, or the at_eof value
+    def read_line(self):
+        return self.end()
+
+    # the next line for inputi(): an int, or the line (or at_eof value) for it to convert
+    def read_int(self):
+        return self.read_line()
+
+    def end(self):
+        if self.at_eof is EOFError:
+            raise EOFError(f"No more input after {self.count} lines")
+        return self.at_eof
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# lines from any iterable (a generator, an open file, ...), pulled one at a time. close()
+# closes the iterable too, if it has a close()
+class IteratorInput(InputProvider):
+    def __init__(self, lines, at_eof=None):
+        super().__init__(at_eof)
+        self.lines = lines
+        self.iterator = iter(lines)
+
+    def read_line(self):
+        line = next(self.iterator, _END)
+        if line is _END:
+            return self.end()
+        self.count += 1
+        return line
+
+    def close(self):
+        if hasattr(self.lines, "close"):
+            self.lines.close()
+
+
+# the lines of a file: a path, or a file object opened in binary mode (memory-mapped when it's
+# a regular file) or in text mode (read in blocks). Lines are split on "\n", which isn't part
+# of them
+class LineReader(InputProvider):
+    def __init__(self, file, at_eof=None, block_size=BLOCK_SIZE, encoding="utf-8"):
+        super().__init__(at_eof)
+        self.encoding = encoding
+        self.owned = None  # the file, when it was opened here
+        if isinstance(file, (str, bytes, os.PathLike)):
+            file = self.owned = open(file, "rb")
+        self.blocks = _blocks(file, block_size)
+        self.lines = []  # the lines split off ahead of the reads
+        self.position = 0  # of the next line to read in lines
+        self.tail = None  # the start of a line that goes on in the next block
+
+    def read_line(self):
+        if self.position == len(self.lines) and not self.fill():
+            return self.end()
+        self.count += 1
+        self.position += 1
+        return self.lines[self.position - 1]
+
+    # the lines of a block of whole lines (bytes or str, without the last "\n")
+    def convert(self, block):
+        if isinstance(block, (bytes, bytearray)):
+            block = block.decode(self.encoding)
+        return block.split("\n")
+
+    def close(self):
+        self.blocks.close()  # (unmaps the file)
+        if self.owned is not None:
+            self.owned.close()
+
+    # splits the next block into lines; False at the end of the file
+    def fill(self):
+        self.position = 0
+        while True:
+            block = next(self.blocks, None)
+            if block is None:
+                if not self.tail:
+                    self.lines = []
+                    return False
+                self.lines = self.convert(self.tail)  # the last line has no "\n"
+                self.tail = None
+                return True
+            if self.tail:
+                block = self.tail + block
+            cut = block.rfind(b"\n" if isinstance(block, bytes) else "\n")
+            if cut < 0:
+                self.tail = block
+                continue
+            self.tail = block[cut + 1:]
+            self.lines = self.convert(block[:cut])
+            return True
+
+
+# a LineReader for inputi(): along with the lines of a block it converts all of them to ints
+# at once, and read_int() gives those. read_line() still gives the lines as they are, so
+# inputs() reads "007" as "007". A line that isn't a number goes to inputi() as it is, to fail
+# the same way it does on any other input
+class IntReader(LineReader):
+    def __init__(self, file, at_eof=None, block_size=BLOCK_SIZE, encoding="utf-8"):
+        super().__init__(file, at_eof, block_size, encoding)
+        self.numbers = []  # the int of each line in lines (None for a line that isn't a number)
+
+    def read_int(self):
+        if self.position == len(self.lines) and not self.fill():
+            return self.end()
+        self.count += 1
+        self.position += 1
+        number = self.numbers[self.position - 1]
+        return number if number is not None else self.lines[self.position - 1]
+
+    def convert(self, block):
+        lines = super().convert(block)
+        try:
+            self.numbers = list(map(int, lines))
+        except ValueError:
+            self.numbers = [self.__number(line) for line in lines]
+        return lines
+
+    def __number(self, line):
+        try:
+            return int(line)
+        except ValueError:
+            return None
+
+
+# blocks of f: slices of a memory map, or what f.read() returns
+def _blocks(f, block_size):
+    mapped = map_file(f)
+    if mapped is None:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+    with mapped:
+        if hasattr(mapped, "madvise"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)  # let the kernel read ahead
+        for start in range(f.tell(), len(mapped), block_size):
+            yield mapped[start:start + block_size]
@@ -40,9 +40,16 @@ class InterpreterBase:
     VOID_DEF = "void"
     
     # methods
-    def __init__(self, console_output=True, inp=None):
+    # inp: a list of input lines, or an inputs.InputProvider to read them from as the program
+    #   asks for them (None: read from the keyboard)
+    # output_sink: a sinks.OutputSink to send printed lines to, instead of print()ing them
+    # (when console_output is on) and keeping them all in output_log
+    def __init__(self, console_output=True, inp=None, output_sink=None):
         self.console_output = console_output
         self.inp = inp  # if not none, then read input from passed-in list
+        # (anything with a read_line(): not importing inputs keeps it off brewparse's imports)
+        self.input_provider = inp if hasattr(inp, "read_line") else None
+        self.output_sink = output_sink
         self.reset()
 
     # Call to reset I/O for another run of the program
@@ -56,8 +63,15 @@ class InterpreterBase:
     def run(self, program):
         pass
 
-    def get_input(self):
+    # number: the input is for inputi(), so the provider may give an int instead of the line
+    def get_input(self, number=False):
+        provider = self.input_provider
+        if provider is not None:
+            if number and hasattr(provider, "read_int"):
+                return provider.read_int()
+            return provider.read_line()
         if not self.inp:
+            self.flush_output()  # so a prompt shows up before input() waits
             return input()  # Get input from keyboard if not input list provided
 
         if self.input_cursor < len(self.inp):
@@ -81,11 +95,23 @@ class InterpreterBase:
         raise Exception(f"{error_type} on line {line_num}{description}")
 
     def output(self, v):
+        if self.output_sink is not None:
+            self.output_sink.write(v)
+            return
         if self.console_output:
             print(v)
         self.output_log.append(v)
 
+    # writes out the lines the output sink holds back
+    def flush_output(self):
+        if self.output_sink is not None:
+            self.output_sink.flush()
+
+    # the printed lines: output_log, or the lines the output sink keeps ([] if it keeps none)
     def get_output(self):
+        if self.output_sink is not None:
+            lines = self.output_sink.lines()
+            return lines if lines is not None else []
         return self.output_log
 
     def get_error_type_and_line(self):
@@ -1,46 +1,238 @@
 # Add to spec:
 # - printing out a nil value is undefined
 
+import threading
+
 from env_v1 import EnvironmentManager
-from type_valuev1 import Type, Value, create_value, get_printable
+from type_valuev1 import Type, Value, NIL, int_value, bool_value, create_value, get_printable
 from intbase import InterpreterBase, ErrorType
-from brewparse import parse_program
+from brewparse import PARSERS, parse_program
+from closure_engine import ClosureEngine
+from vm import VM, WANT_INPUT
+from optimizer import Optimizer
+from inline_cache import BinaryOpCache, cache_stats
+from memo import MemoCache, MISSING, memo_key, pure_functions
+from positions import Positions
+from sinks import HandoffSink, ListSink, StopRun
 
 
 # Main interpreter class
 class Interpreter(InterpreterBase):
     # constants
     BIN_OPS = {'+', '-', '*', '/', '==', '<', '<=', '>', '>=', '!='}
+    # "tree": walk the Element tree directly (reference implementation)
+    # "closures": compile each function into nested closures once, then run those
+    # "vm": compile each function to bytecode (bytecode.py) and run it on a stack VM (vm.py)
+    ENGINES = ("tree", "closures", "vm")
 
     # methods
-    def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)
+    # optimize: False, True (run every optimizer pass) or an optimizer.Optimizer instance
+    # memoize: False, True (cache calls to pure functions in a default size MemoCache) or a
+    #   memo.MemoCache instance; the default for every run, which run(memoize=...) overrides
+    # parse_cache: a parse_cache.ParseCache to load parsed programs from, or None to always parse
+    # parser: "yacc" or "pratt", see brewparse.parse_program
+    # inp: a list of input lines or an inputs.InputProvider, see intbase.InterpreterBase
+    # output_sink: a sinks.OutputSink for the printed lines, see intbase.InterpreterBase
+    def __init__(self, console_output=True, inp=None, trace_output=False, engine="tree", optimize=False, memoize=False,
+                 parse_cache=None, parser="yacc", output_sink=None):
+        super().__init__(console_output, inp, output_sink)
+        if engine not in Interpreter.ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {Interpreter.ENGINES}")
         self.trace_output = trace_output
+        self.engine = engine
         self.__setup_ops()
-
-    def run(self, program):
-        ast = parse_program(program)
+        if optimize is True:
+            optimize = Optimizer(self.op_to_lambda)
+        self.optimizer = optimize or None
+        self.optimizer_stats = {}  # {pass name: nodes removed} from the last run
+        self.inline_caches = []  # every BinaryOpCache created during the last run
+        if memoize is True:
+            memoize = MemoCache()
+        self.memo = memoize or None  # the MemoCache of the last run (None if it wasn't memoized)
+        self.default_memo = self.memo
+        self.pure_functions = set()  # (name, arg_count) of the functions whose calls get memoized
+        self.parse_cache = parse_cache
+        if parser not in PARSERS:
+            raise ValueError(f"Unknown parser {parser!r}, expected one of {PARSERS}")
+        self.parser = parser
+        self.positions = None  # positions.Positions of the nodes of the last program run, see line_of()
+        self.program = None  # the source and the tree of the last program run
+        self.ast = None
+
+    # memoize: None to memoize as the constructor says, or False/True/a MemoCache for this run
+    def run(self, program, memoize=None):
+        if getattr(self.input_provider, "awaitable", False):
+            raise TypeError("inp is an async input source, which only run_async can read from")
+        if getattr(self.output_sink, "awaitable", False):
+            raise TypeError("output_sink is an async sink, which only run_async can write to")
+        main_func = self.__load(program, memoize)
+        try:
+            if self.engine == "closures":
+                ClosureEngine(self).run(self.func_name_to_ast, main_func)
+                return
+            if self.engine == "vm":
+                VM(self).run(self.func_name_to_ast, main_func)
+                return
+            self.env = EnvironmentManager()
+            self.block_scopes = {}  # if/for node -> which of its blocks need their own scope
+            self.op_caches = {}  # binary op node -> its BinaryOpCache
+            self.string_literals = {}  # string literal -> the one Value for it
+            self.__run_statements(main_func.statements)
+        finally:
+            self.flush_output()  # what the output sink still holds, errors or not
+
+    # runs program as a coroutine, on the VM: inputi()/inputs() await input_source (an
+    # async_io.AsyncInput) and every printed line is awaited into output_sink (an
+    # async_io.AsyncSink), so a program waiting for input holds no thread and one event loop
+    # can serve any number of them. With input_source None the input comes from inp (an
+    # AsyncInput, or whatever get_input() reads in run()), and with output_sink None the output
+    # goes to the constructor's output_sink (an AsyncSink, or wherever run() sends it). Needs
+    # engine="vm": the other engines keep Brewin calls on the python stack, where they
+    # can't be suspended. The program only gives the event loop a turn at its prints and inputs
+    async def run_async(self, program, input_source=None, output_sink=None, memoize=None):
+        if self.engine != "vm":
+            raise ValueError(f"run_async needs engine='vm', not {self.engine!r}")
+        if input_source is None and getattr(self.input_provider, "awaitable", False):
+            input_source = self.input_provider
+        if output_sink is None and getattr(self.output_sink, "awaitable", False):
+            output_sink = self.output_sink
+        main_func = self.__load(program, memoize)
+        saved_sink = self.output_sink
+        if output_sink is not None:
+            self.output_sink = pending = ListSink()  # (what interp.output() gets, to pass on)
+        vm = VM(self)
+        steps = vm.steps(vm.load(self.func_name_to_ast, main_func), suspend=True)
+        try:
+            request = next(steps, None)
+            while request is not None:
+                if output_sink is not None:
+                    for line in pending.captured:
+                        await output_sink.write(line)
+                    pending.captured.clear()
+                if request != WANT_INPUT:
+                    request = next(steps, None)
+                    continue
+                if output_sink is not None:
+                    await output_sink.flush()  # so the prompt shows up before we wait
+                if input_source is not None:
+                    inp = await input_source.read_line()
+                else:
+                    inp = self.get_input()
+                request = steps.send(inp)
+        finally:
+            steps.close()
+            self.output_sink = saved_sink
+            if output_sink is not None:
+                await output_sink.flush()
+            else:
+                self.flush_output()
+
+    # runs program in a thread of its own and yields every line it prints, as it prints it.
+    # The program waits at each print until the next line is asked for, so lines are never
+    # buffered and a reader that stops early (closing the generator, or breaking out of a for
+    # loop over it) stops the program where it is. An error of the program is raised from the
+    # generator after the lines printed before it. Lines only go to the reader, not to the
+    # output sink or output_log
+    def iter_run(self, program, memoize=None):
+        handoff = HandoffSink()
+        failure = []
+
+        def run_program():
+            try:
+                self.run(program, memoize)
+            except StopRun:
+                pass
+            except BaseException as error:
+                failure.append(error)
+            finally:
+                handoff.finish()
+
+        saved_sink = self.output_sink
+        self.output_sink = handoff
+        thread = threading.Thread(target=run_program, name="brewin iter_run", daemon=True)
+        thread.start()
+        try:
+            while handoff.next_line():
+                yield handoff.line
+                handoff.resume_program()
+        finally:
+            if not handoff.done:
+                handoff.resume_program(stop=True)  # the reader stopped early
+                while handoff.next_line():  # (only the StopRun unwinding is left)
+                    pass
+            thread.join()
+            self.output_sink = saved_sink
+        if failure:
+            raise failure[0]
+
+    # parses program and sets it up to run; returns its main function
+    def __load(self, program, memoize=None):
+        self.inline_caches = []
+        self.positions = None
+        if self.parse_cache is not None:
+            ast = self.parse_cache.parse(program, self.parser)
+        else:
+            ast = parse_program(program, self.parser)
+        if self.optimizer is not None:
+            self.optimizer_stats = self.optimizer.run(ast)
+        self.program = program
+        self.ast = ast
         self.__set_up_function_table(ast)
-        main_func = self.__get_func_by_name("main", 0)
-        self.env = EnvironmentManager()
-        self.__run_statements(main_func.get("statements"))
+        if memoize is None:
+            self.memo = self.default_memo
+        elif memoize is True:
+            self.memo = self.default_memo or MemoCache()
+        else:
+            self.memo = memoize or None
+        self.pure_functions = set()
+        if self.memo is not None:
+            self.memo.clear()  # results are only valid for this program
+            self.pure_functions = pure_functions(self.func_name_to_ast)
+        return self.__get_func_by_name("main", 0)
+
+    # line number of node in the last program run, or None when it has no position (main,
+    # nodes made by the optimizer). Programs are parsed without positions: the first call
+    # parses the program again with them, optimizes that tree too, and takes the positions of
+    # its nodes for the nodes in the same places in the tree that ran
+    def line_of(self, node):
+        if node is None or self.ast is None:
+            return None
+        if self.positions is None:
+            parsed = Positions(self.program)
+            twin = parse_program(self.program, self.parser, positions=parsed, quiet=True)
+            if self.optimizer is not None:
+                self.optimizer.run(twin)
+            self.positions = parsed.for_twin(twin, self.ast)
+        return self.positions.line(node)
+
+    # an error() that reports the line of node, for the engines to hand to code that can fail
+    def error_at(self, node):
+        return lambda error_type, description=None: self.error(error_type, description, self.line_of(node))
+
+    # hit/miss counters of the binary operator inline caches from the last run
+    def inline_cache_stats(self):
+        return cache_stats(self.inline_caches)
+
+    # hits, misses and evictions of the memo cache in the last run (None if it wasn't memoized)
+    def memo_stats(self):
+        return self.memo.stats() if self.memo is not None else None
 
     def __set_up_function_table(self, ast):
         self.func_name_to_ast = {}
-        for func_def in ast.get("functions"):
-            func_name = func_def.get("name")
-            arg_count = len(func_def.get("args"))
+        for func_def in ast.functions:
+            func_name = func_def.name
+            arg_count = len(func_def.args)
             self.func_name_to_ast[(func_name, arg_count)] = func_def # for func overloading: use (name, param_count) tuple as the key
 
-    def __get_func_by_name(self, name, arg_count):
+    def __get_func_by_name(self, name, arg_count, call_node=None):
         func_key = (name, arg_count)
         if func_key not in self.func_name_to_ast:
-            super().error(ErrorType.NAME_ERROR, f"Function {name} w/ arg_count {arg_count} not found")
+            super().error(ErrorType.NAME_ERROR, f"Function {name} w/ arg_count {arg_count} not found", self.line_of(call_node))
         return self.func_name_to_ast[func_key]
 
     def __run_statements(self, statements):
         # all statements of a function are held in arg3 of the function AST node
-        result_tuple = (Value(Type.NIL, None), False)
+        result_tuple = (NIL, False)
         for statement in statements:
             # 🍅: to deal with returning out of the IF block and straight back out the func?
             if result_tuple[1] == True:
@@ -64,25 +256,32 @@ class Interpreter(InterpreterBase):
                 result_tuple = self.__handle_for(statement)
                 if result_tuple[1]: # ret_early = True
                     return result_tuple 
-        return Value(Type.NIL, None), False # no return statement, so return nil
+        return NIL, False # no return statement, so return nil
 
     def __call_func(self, call_node):
-        func_name = call_node.get("name")
+        func_name = call_node.name
         
         if func_name == "print":
             return self.__call_print(call_node), False
         if func_name == "inputi" or func_name == "inputs":
             return self.__call_input(call_node), False
 
-        args = [self.__eval_expr(arg) for arg in call_node.get("args")]
+        args = [self.__eval_expr(arg) for arg in call_node.args]
         arg_count = len(args)
-        func_def = self.__get_func_by_name(func_name, arg_count)
+        func_def = self.__get_func_by_name(func_name, arg_count, call_node)
+        if self.memo is not None and (func_name, arg_count) in self.pure_functions:
+            key = memo_key(func_name, args)
+            result_tuple = self.memo.get(key)
+            if result_tuple is MISSING:
+                result_tuple = self.__run_func(func_def, args)
+                self.memo.put(key, result_tuple)
+            return result_tuple
         return self.__run_func(func_def, args) # __run_func returns (result, ret_early)
 
     def __call_print(self, call_ast):
         output = ""
         count = 0
-        for arg in call_ast.get("args"):
+        for arg in call_ast.args:
             result = self.__eval_expr(arg)  # result gives a Value object
             # BOOLS:
             if result.type() == Type.BOOL:
@@ -93,57 +292,60 @@ class Interpreter(InterpreterBase):
                 output += get_printable(result)
             count += 1
         super().output(output)
-        return Value(Type.NIL, None)  # print returns 'nil' (needed within an expression)
+        return NIL  # print returns 'nil' (needed within an expression)
 
 
     def __call_input(self, call_ast):
-        args = call_ast.get("args")
+        args = call_ast.args
         if args is not None and len(args) == 1:
             result = self.__eval_expr(args[0])
             super().output(get_printable(result))
         elif args is not None and len(args) > 1:
             super().error(
-                ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter"
+                ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter", self.line_of(call_ast)
             )
-        inp = super().get_input()
-        if call_ast.get("name") == "inputi":
-            return Value(Type.INT, int(inp))
-        if call_ast.get("name") == "inputs":
+        inp = super().get_input(call_ast.name == "inputi")
+        if call_ast.name == "inputi":
+            return int_value(int(inp))
+        if call_ast.name == "inputs":
             return Value(Type.STRING, str(inp))
 
     def __assign(self, assign_ast):
-        var_name = assign_ast.get("name")
-        value_obj = self.__eval_expr(assign_ast.get("expression"))
+        var_name = assign_ast.name
+        value_obj = self.__eval_expr(assign_ast.expression)
         if not self.env.set(var_name, value_obj):
             super().error(
-                ErrorType.NAME_ERROR, f"Undefined variable {var_name} in assignment"
+                ErrorType.NAME_ERROR, f"Undefined variable {var_name} in assignment", self.line_of(assign_ast)
             )
 
     def __var_def(self, var_ast):
-        var_name = var_ast.get("name")
-        if not self.env.create(var_name, Value(Type.INT, 0)):
+        var_name = var_ast.name
+        if not self.env.create(var_name, int_value(0)):
             super().error(
-                ErrorType.NAME_ERROR, f"Duplicate definition for variable {var_name}"
+                ErrorType.NAME_ERROR, f"Duplicate definition for variable {var_name}", self.line_of(var_ast)
             )
 
     def __eval_expr(self, expr_ast):
         if expr_ast.elem_type == InterpreterBase.INT_NODE:
-            return Value(Type.INT, expr_ast.get("val"))
+            return int_value(expr_ast.val)
         if expr_ast.elem_type == InterpreterBase.STRING_NODE:
-            return Value(Type.STRING, expr_ast.get("val"))
+            value = self.string_literals.get(expr_ast.val)
+            if value is None:
+                value = self.string_literals[expr_ast.val] = Value(Type.STRING, expr_ast.val)
+            return value
         if expr_ast.elem_type == InterpreterBase.BOOL_NODE:
-            return Value(Type.BOOL, expr_ast.get("val"))
+            return bool_value(expr_ast.val)
         if expr_ast.elem_type == InterpreterBase.NIL_NODE:
-            return Value(Type.NIL, expr_ast.get("val"))
+            return NIL
         if expr_ast.elem_type == InterpreterBase.VAR_NODE:
-            var_name = expr_ast.get("name")
+            var_name = expr_ast.name
             val = self.env.get(var_name)
             if val is None:
-                super().error(ErrorType.NAME_ERROR, f"Variable {var_name} not found")
+                super().error(ErrorType.NAME_ERROR, f"Variable {var_name} not found", self.line_of(expr_ast))
             return val
         if expr_ast.elem_type == InterpreterBase.FCALL_NODE:        
             # Handle the print function as a special case
-            func_name = expr_ast.get("name")
+            func_name = expr_ast.name
             if func_name == "print":
                 return self.__call_print(expr_ast)  # Call print only once
             # For other function calls
@@ -153,44 +355,33 @@ class Interpreter(InterpreterBase):
         if expr_ast.elem_type in Interpreter.BIN_OPS or expr_ast.elem_type in {"&&", "||"}:
             return self.__eval_op(expr_ast)
         if expr_ast.elem_type == 'neg' or expr_ast.elem_type == '!':
-            operand = self.__eval_expr(expr_ast.get("op1"))
+            operand = self.__eval_expr(expr_ast.op1)
             if expr_ast.elem_type == 'neg':
                 if operand.type() != Type.INT:
-                    super().error(ErrorType.TYPE_ERROR, "(- or 'neg') requires an INT operand")
-                return Value(Type.INT, -operand.value())
+                    super().error(ErrorType.TYPE_ERROR, "(- or 'neg') requires an INT operand", self.line_of(expr_ast))
+                return int_value(-operand.value())
             elif expr_ast.elem_type == '!':
                 if operand.type() != Type.BOOL:
-                    super().error(ErrorType.TYPE_ERROR, "(!) requires a BOOL operand")
-                return Value(Type.BOOL, not operand.value())
+                    super().error(ErrorType.TYPE_ERROR, "(!) requires a BOOL operand", self.line_of(expr_ast))
+                return bool_value(not operand.value())
 
     def __eval_op(self, arith_ast):
         # handles strict evaluation already?
-        left_value_obj = self.__eval_expr(arith_ast.get("op1")) # returns type Value
+        left_value_obj = self.__eval_expr(arith_ast.op1) # returns type Value
         left_type = left_value_obj.type()
-        right_value_obj = self.__eval_expr(arith_ast.get("op2")) # returns type Value
-        right_type = right_value_obj.type()
-        operator = arith_ast.elem_type
-
-        # special: "==" and "!="
-        if operator == "==" or operator == "!=":
-            # check if diff types: always not equal
-            if left_type != right_type:
-                return Value(Type.BOOL, operator == "!=")  # True for "!=", False for "=="
-            f = self.op_to_lambda[left_type][operator] # same type: get lambda for the operator and run it
-            return f(left_value_obj, right_value_obj)
-        if left_type != right_type:
-            super().error(
-                ErrorType.TYPE_ERROR,
-                f"Incompatible types [{left_type} and {right_type}] for {operator} operation",
-            )
-        if operator not in self.op_to_lambda[left_type]:
-            super().error(
-                ErrorType.TYPE_ERROR,
-                f"Incompatible operator {operator} for type {left_type}",
-            )
-        f = self.op_to_lambda[left_type][operator]
-        result_val_obj = (f(left_value_obj, right_value_obj))
-        return result_val_obj
+        right_value_obj = self.__eval_expr(arith_ast.op2) # returns type Value
+
+        # each op node caches the handler for the operand types it saw last (inline cache)
+        cache = self.op_caches.get(arith_ast)
+        if cache is None:
+            cache = BinaryOpCache(arith_ast.elem_type, self.op_to_lambda)
+            self.op_caches[arith_ast] = cache
+            self.inline_caches.append(cache)
+        if left_type == cache.left_type and right_value_obj.t == cache.right_type:
+            cache.hits += 1
+            return cache.handler(left_value_obj, right_value_obj)
+        # types changed (or first run): generic checks, errors, then re-specialize
+        return cache.miss(left_value_obj, right_value_obj, self.error_at(arith_ast))
 
     def __setup_ops(self):
         # dict of ops to corresponding lambda
@@ -198,116 +389,139 @@ class Interpreter(InterpreterBase):
         # INT
         # arithmetic
         self.op_to_lambda[Type.INT] = {}
-        self.op_to_lambda[Type.INT]["+"] = lambda x, y: Value(x.type(), x.value() + y.value())
-        self.op_to_lambda[Type.INT]["-"] = lambda x, y: Value(x.type(), x.value() - y.value())
-        self.op_to_lambda[Type.INT]["*"] = lambda x, y: Value(x.type(), x.value() * y.value())
-        self.op_to_lambda[Type.INT]["/"] = lambda x, y: Value(x.type(), x.value() // y.value())  # integer division
+        self.op_to_lambda[Type.INT]["+"] = lambda x, y: int_value(x.value() + y.value())
+        self.op_to_lambda[Type.INT]["-"] = lambda x, y: int_value(x.value() - y.value())
+        self.op_to_lambda[Type.INT]["*"] = lambda x, y: int_value(x.value() * y.value())
+        self.op_to_lambda[Type.INT]["/"] = lambda x, y: int_value(x.value() // y.value())  # integer division
         # comparison
-        self.op_to_lambda[Type.INT]["=="] = lambda x, y: Value(Type.BOOL, x.value() == y.value())
-        self.op_to_lambda[Type.INT]["!="] = lambda x, y: Value(Type.BOOL, x.value() != y.value())
-        self.op_to_lambda[Type.INT][">"] = lambda x, y: Value(Type.BOOL, x.value() > y.value())
-        self.op_to_lambda[Type.INT][">="] = lambda x, y: Value(Type.BOOL, x.value() >= y.value())
-        self.op_to_lambda[Type.INT]["<"] = lambda x, y: Value(Type.BOOL, x.value() < y.value())
-        self.op_to_lambda[Type.INT]["<="] = lambda x, y: Value(Type.BOOL, x.value() <= y.value())
+        self.op_to_lambda[Type.INT]["=="] = lambda x, y: bool_value(x.value() == y.value())
+        self.op_to_lambda[Type.INT]["!="] = lambda x, y: bool_value(x.value() != y.value())
+        self.op_to_lambda[Type.INT][">"] = lambda x, y: bool_value(x.value() > y.value())
+        self.op_to_lambda[Type.INT][">="] = lambda x, y: bool_value(x.value() >= y.value())
+        self.op_to_lambda[Type.INT]["<"] = lambda x, y: bool_value(x.value() < y.value())
+        self.op_to_lambda[Type.INT]["<="] = lambda x, y: bool_value(x.value() <= y.value())
         
         # BOOL
         self.op_to_lambda[Type.BOOL] = {}
         # logical
-        self.op_to_lambda[Type.BOOL]["&&"] = lambda x, y: Value(Type.BOOL, x.value() and y.value())
-        self.op_to_lambda[Type.BOOL]["||"] = lambda x, y: Value(Type.BOOL, x.value() or y.value())
+        self.op_to_lambda[Type.BOOL]["&&"] = lambda x, y: bool_value(x.value() and y.value())
+        self.op_to_lambda[Type.BOOL]["||"] = lambda x, y: bool_value(x.value() or y.value())
         # comparison
-        self.op_to_lambda[Type.BOOL]["=="] = lambda x, y: Value(Type.BOOL, x.value() == y.value())
-        self.op_to_lambda[Type.BOOL]["!="] = lambda x, y: Value(Type.BOOL, x.value() != y.value())
+        self.op_to_lambda[Type.BOOL]["=="] = lambda x, y: bool_value(x.value() == y.value())
+        self.op_to_lambda[Type.BOOL]["!="] = lambda x, y: bool_value(x.value() != y.value())
 
         # STRING
         self.op_to_lambda[Type.STRING] = {}
         # concatenation
         self.op_to_lambda[Type.STRING]["+"] = lambda x, y: Value(Type.STRING, x.value() + y.value())
         # comparison
-        self.op_to_lambda[Type.STRING]["=="] = lambda x, y: Value(Type.BOOL, x.value() == y.value())
-        self.op_to_lambda[Type.STRING]["!="] = lambda x, y: Value(Type.BOOL, x.value() != y.value())
+        self.op_to_lambda[Type.STRING]["=="] = lambda x, y: bool_value(x.value() == y.value())
+        self.op_to_lambda[Type.STRING]["!="] = lambda x, y: bool_value(x.value() != y.value())
 
         # NIL
         self.op_to_lambda[Type.NIL] = {}
-        self.op_to_lambda[Type.NIL]["=="] = lambda x, y: Value(Type.BOOL, x.type() == y.type())
-        self.op_to_lambda[Type.NIL]["!="] = lambda x, y: Value(Type.BOOL, x.type() != y.type())
+        self.op_to_lambda[Type.NIL]["=="] = lambda x, y: bool_value(x.type() == y.type())
+        self.op_to_lambda[Type.NIL]["!="] = lambda x, y: bool_value(x.type() != y.type())
+
+    # a block only needs its own scope dict if it declares variables directly in it;
+    # nested if/for blocks get their own scopes anyway
+    def __declares_vars(self, statements):
+        if statements is None:
+            return False
+        return any(statement.elem_type == InterpreterBase.VAR_DEF_NODE for statement in statements)
+
+    # (then block needs a scope, else block needs a scope) for an if node, computed once
+    def __if_scopes(self, if_ast):
+        scopes = self.block_scopes.get(if_ast)
+        if scopes is None:
+            scopes = (self.__declares_vars(if_ast.statements), self.__declares_vars(if_ast.else_statements))
+            self.block_scopes[if_ast] = scopes
+        return scopes
 
     def __handle_if(self, if_ast):
         # evaluate the condition
-        condition_expr = if_ast.get("condition")
+        condition_expr = if_ast.condition
         condition_value = self.__eval_expr(condition_expr)
         
         # CHECK: the condition is a boolean
         if condition_value.type() != Type.BOOL:
-          super().error(ErrorType.TYPE_ERROR, f"Condition in if statement must evaluate to a boolean. The condition is type: {condition_value.type()}")
+          super().error(ErrorType.TYPE_ERROR, f"Condition in if statement must evaluate to a boolean. The condition is type: {condition_value.type()}", self.line_of(if_ast))
 
-        # push new dict for IF block
-        self.env.push_dict()
+        then_scope, else_scope = self.__if_scopes(if_ast)
         if condition_value.value():  # true condition
-            # self.__run_statements(if_ast.get("statements"))
-            result, ret_early = self.__run_statements(if_ast.get("statements"))
-            if ret_early:
-                self.env.pop_dict()  # pop out!
-                return result, True
-        elif if_ast.get("else_statements") is not None:  # false & else block exists
-            # self.__run_statements(if_ast.get("else_statements"))
-            result, ret_early = self.__run_statements(if_ast.get("else_statements"))
-            if ret_early:
-                self.env.pop_dict()  # ensure we clean up before returning
-                return result, True
-
-        # after running statements, exit IF block
-        self.env.pop_dict()
-        return Value(Type.NIL, None), False  # no early return happened
+            statements, needs_scope = if_ast.statements, then_scope
+        elif if_ast.else_statements is not None:  # false & else block exists
+            statements, needs_scope = if_ast.else_statements, else_scope
+        else:
+            return NIL, False
+
+        # only push a new dict for the block if something gets declared in it
+        if not needs_scope:
+            return self.__run_statements(statements)
+        self.env.push_dict()
+        result_tuple = self.__run_statements(statements)
+        self.env.pop_dict()  # ensure we clean up before returning
+        return result_tuple
 
     def __handle_for(self, for_ast):
-        init_expr = for_ast.get("init")
-        condition_expr = for_ast.get("condition")
-        update_expr = for_ast.get("update")
-        body_statements = for_ast.get("statements")
+        init_expr = for_ast.init
+        condition_expr = for_ast.condition
+        update_expr = for_ast.update
+        body_statements = for_ast.statements
 
         self.__assign(init_expr) # assign the initialization once
 
-        while True:
+        needs_scope = self.block_scopes.get(for_ast)
+        if needs_scope is None:
+            needs_scope = self.__declares_vars(body_statements)
+            self.block_scopes[for_ast] = needs_scope
+
+        # no declarations in the body: the per-iteration dict would always stay empty, skip it.
+        # otherwise push ONE dict for the loop and clear it between iterations
+        if needs_scope:
             self.env.push_dict()
+        while True:
             # eval the condition expression
             condition_value = self.__eval_expr(condition_expr)
 
             # CHECK: the condition is a boolean
             if condition_value.type() != Type.BOOL:
-                super().error(ErrorType.TYPE_ERROR, f"Loop condition ({condition_value}) isn't a boolean")
+                super().error(ErrorType.TYPE_ERROR, f"Loop condition ({condition_value}) isn't a boolean", self.line_of(for_ast))
 
             # if condition is false: exit loop
             if not condition_value.value():
-                self.env.pop_dict()
                 break
 
             # run statements & check for ret_early
             result_tuple = self.__run_statements(body_statements)
             if result_tuple[1]:
-                self.env.pop_dict()
+                if needs_scope:
+                    self.env.pop_dict()
                 return result_tuple
             
             self.__assign(update_expr) # update
+            if needs_scope:
+                self.env.clear_dict()
+        if needs_scope:
             self.env.pop_dict()
-        return Value(Type.NIL, None), False
+        return NIL, False
 
     def __handle_return(self, return_node):
-        if return_node.get("expression") is not None:
-            return self.__eval_expr(return_node.get("expression")), True
-        return Value(Type.NIL, None), True # return nil, and early return
+        if return_node.expression is not None:
+            return self.__eval_expr(return_node.expression), True
+        return NIL, True # return nil, and early return
     
     def __run_func(self, func_def, args):
         self.env.push_func_stack()
 
         # add args to new func stack
-        params = func_def.get("args")
+        params = func_def.args
         for param, arg_value in zip(params, args):
-            param = param.get('name')
+            param = param.name
             arg_value = create_value(arg_value.value())
             self.env.create(param, arg_value) # pass-by-value: copy arg value (puts args in curr env)
 
-        result, ret_early = self.__run_statements(func_def.get("statements"))
+        result, ret_early = self.__run_statements(func_def.statements)
         self.env.pop_func_stack()
         return result, ret_early
     
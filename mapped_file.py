@@ -0,0 +1,14 @@
+# Read-only memory maps of the files stream_parse.py and inputs.py read from.
+import io
+import mmap
+
+
+# a read-only mmap of the whole of f, or None if f can't be mapped: a text file, something
+# that isn't a regular file (a pipe, a BytesIO, ...), or an empty file
+def map_file(f):
+    if isinstance(f, io.TextIOBase):
+        return None
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):  # (io.UnsupportedOperation is both)
+        return None
@@ -0,0 +1,96 @@
+# Automatic memoization of pure Brewin functions.
+#
+# A function is pure when it never calls print/inputi/inputs and only calls other pure
+# functions. Brewin functions can't see their caller's variables and Values are immutable,
+# so a pure function's result only depends on its arguments: every engine can then look the
+# call up in a MemoCache (a bounded LRU) before running it. Errors are never cached, the
+# call just runs again and raises again.
+
+from collections import OrderedDict
+
+from element import Element
+from intbase import InterpreterBase
+
+IO_FUNCS = {"print", "inputi", "inputs"}
+
+MISSING = object()  # MemoCache.get() on a miss (None is a valid result: fell off the end)
+
+
+# returns the set of (name, arg_count) keys of the pure functions in func_table
+def pure_functions(func_table):
+    calls = {}
+    for key, func_def in func_table.items():
+        callees = set()
+        if _collect_calls(func_def.get("statements"), callees):
+            calls[key] = callees
+    # drop functions calling impure or unknown functions until nothing changes
+    pure = set(calls)
+    changed = True
+    while changed:
+        changed = False
+        for key in list(pure):
+            if not calls[key] <= pure:
+                pure.discard(key)
+                changed = True
+    return pure
+
+
+# adds the user functions called anywhere in node to callees; False if it does any I/O
+def _collect_calls(node, callees):
+    if isinstance(node, list):
+        return all(_collect_calls(item, callees) for item in node)
+    if not isinstance(node, Element):
+        return True
+    if node.elem_type == InterpreterBase.FCALL_NODE:
+        if node.get("name") in IO_FUNCS:
+            return False
+        callees.add((node.get("name"), len(node.get("args"))))
+    return all(_collect_calls(getattr(node, key), callees) for key in node.field_names)
+
+
+# cache key of a call. The python type of the value is part of it since an INT can hold
+# True (see create_value) and True == 1 as far as a dict is concerned
+def memo_key(name, args):
+    return (name, len(args), tuple((arg.t, type(arg.v), arg.v) for arg in args))
+
+
+class MemoCache:
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError(f"MemoCache maxsize must be at least 1, got {maxsize}")
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        result = self.entries.get(key, MISSING)
+        if result is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+        }
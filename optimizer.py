@@ -0,0 +1,236 @@
+# AST optimizer pipeline that runs between parse_program and execution.
+#
+# Each pass rewrites the program Element tree in place and returns how many nodes it
+# removed. The Optimizer runs the enabled passes in order and keeps per-pass stats, so the
+# effect of each one can be measured (and any of them switched off).
+#
+# Passes never change behaviour: anything that would raise at runtime (type errors,
+# division by zero, bad conditions) is simply left alone so the error still happens at
+# the same point.
+
+import sys
+
+from element import Element
+from type_valuev1 import Type, Value, int_value, bool_value
+from intbase import InterpreterBase
+
+BIN_OPS = {'+', '-', '*', '/', '==', '<', '<=', '>', '>=', '!=', '&&', '||'}
+
+LITERAL_TYPES = {
+    InterpreterBase.INT_NODE: Type.INT,
+    InterpreterBase.STRING_NODE: Type.STRING,
+    InterpreterBase.BOOL_NODE: Type.BOOL,
+    InterpreterBase.NIL_NODE: Type.NIL,
+}
+
+
+# number of Element nodes in a subtree (lists of nodes are walked too)
+def count_nodes(node):
+    if isinstance(node, list):
+        return sum(count_nodes(item) for item in node)
+    if not isinstance(node, Element):
+        return 0
+    return 1 + sum(count_nodes(getattr(node, key)) for key in node.field_names)
+
+
+def is_literal(node):
+    return node.elem_type in LITERAL_TYPES
+
+
+def literal_value(node):
+    return Value(LITERAL_TYPES[node.elem_type], node.get("val"))
+
+
+def literal_node(value):
+    if value.type() == Type.NIL:
+        return Element(InterpreterBase.NIL_NODE)
+    for elem_type, value_type in LITERAL_TYPES.items():
+        if value.type() == value_type:
+            val = value.value()
+            if type(val) is str:
+                val = sys.intern(val)  # like the strings the parsers make
+            return Element(elem_type, val=val)
+    return None
+
+
+# every block (list of statements) in a function, outermost first
+def blocks_of(statements):
+    yield statements
+    for statement in statements:
+        if statement.elem_type == InterpreterBase.IF_NODE:
+            yield from blocks_of(statement.get("statements"))
+            if statement.get("else_statements") is not None:
+                yield from blocks_of(statement.get("else_statements"))
+        elif statement.elem_type == InterpreterBase.FOR_NODE:
+            yield from blocks_of(statement.get("statements"))
+
+
+# folds operators whose operands are all literals: 3 * 4 + 1, "a" + "b", !true, - -5
+class ConstantFolding:
+    name = "fold_constants"
+
+    def __init__(self, op_to_lambda):
+        self.op_to_lambda = op_to_lambda  # same handlers the interpreter runs
+        self.removed = 0
+
+    def run(self, ast):
+        self.removed = 0
+        for func_def in ast.get("functions"):
+            for block in blocks_of(func_def.get("statements")):
+                for statement in block:
+                    self.__fold_statement(statement)
+        return self.removed
+
+    def __fold_statement(self, statement):
+        kind = statement.elem_type
+        if kind == "=" or kind == InterpreterBase.RETURN_NODE:
+            self.__fold_field(statement, "expression")
+        elif kind == InterpreterBase.FCALL_NODE:
+            self.__fold_args(statement)
+        elif kind == InterpreterBase.IF_NODE:
+            self.__fold_field(statement, "condition")
+        elif kind == InterpreterBase.FOR_NODE:
+            self.__fold_statement(statement.get("init"))
+            self.__fold_field(statement, "condition")
+            self.__fold_statement(statement.get("update"))
+
+    def __fold_field(self, node, key):
+        if node.get(key) is not None:
+            setattr(node, key, self.__fold(node.get(key)))
+
+    def __fold_args(self, call_node):
+        call_node.args = [self.__fold(arg) for arg in call_node.args]
+
+    # returns the folded replacement for expr (or expr itself)
+    def __fold(self, expr):
+        kind = expr.elem_type
+        if kind == InterpreterBase.FCALL_NODE:
+            self.__fold_args(expr)
+            return expr
+        if kind in BIN_OPS:
+            self.__fold_field(expr, "op1")
+            self.__fold_field(expr, "op2")
+            left, right = expr.get("op1"), expr.get("op2")
+            if is_literal(left) and is_literal(right):
+                return self.__replace(expr, self.__eval_op(kind, literal_value(left), literal_value(right)))
+            return expr
+        if kind == InterpreterBase.NEG_NODE or kind == InterpreterBase.NOT_NODE:
+            self.__fold_field(expr, "op1")
+            operand = expr.get("op1")
+            if not is_literal(operand):
+                return expr
+            operand = literal_value(operand)
+            if kind == InterpreterBase.NEG_NODE and operand.type() == Type.INT:
+                return self.__replace(expr, int_value(-operand.value()))
+            if kind == InterpreterBase.NOT_NODE and operand.type() == Type.BOOL:
+                return self.__replace(expr, bool_value(not operand.value()))
+            return expr
+        return expr
+
+    def __replace(self, expr, value):
+        if value is None:
+            return expr  # would fail at runtime, leave it for the interpreter to report
+        replacement = literal_node(value)
+        self.removed += count_nodes(expr) - 1
+        return replacement
+
+    # same rules as Interpreter.__eval_op, but returns None instead of raising
+    def __eval_op(self, operator, left, right):
+        if left.type() != right.type():
+            if operator == "==" or operator == "!=":
+                return bool_value(operator == "!=")
+            return None
+        f = self.op_to_lambda[left.type()].get(operator)
+        if f is None:
+            return None
+        if operator == "/" and right.value() == 0:
+            return None
+        return f(left, right)
+
+
+# replaces `if` statements whose condition is a bool literal by the branch that runs
+class IfFolding:
+    name = "fold_ifs"
+
+    def __init__(self):
+        self.removed = 0
+
+    def run(self, ast):
+        self.removed = 0
+        for func_def in ast.get("functions"):
+            func_def.statements = self.__fold_block(func_def.statements)
+        return self.removed
+
+    def __fold_block(self, statements):
+        folded = []
+        for statement in statements:
+            if statement.elem_type == InterpreterBase.FOR_NODE:
+                statement.statements = self.__fold_block(statement.statements)
+                folded.append(statement)
+            elif statement.elem_type == InterpreterBase.IF_NODE:
+                folded.extend(self.__fold_if(statement))
+            else:
+                folded.append(statement)
+        return folded
+
+    # returns the statements that replace if_ast in its block
+    def __fold_if(self, if_ast):
+        if_ast.statements = self.__fold_block(if_ast.statements)
+        if if_ast.get("else_statements") is not None:
+            if_ast.else_statements = self.__fold_block(if_ast.else_statements)
+
+        condition = if_ast.get("condition")
+        if condition.elem_type != InterpreterBase.BOOL_NODE:
+            return [if_ast]  # not constant (or not a bool, which has to fail at runtime)
+
+        taken = if_ast.get("statements") if condition.get("val") else if_ast.get("else_statements")
+        if taken is None:
+            self.removed += count_nodes(if_ast)
+            return []
+        # the block keeps its own scope if it declares variables, otherwise it can be spliced
+        # straight into the enclosing block
+        if any(statement.elem_type == InterpreterBase.VAR_DEF_NODE for statement in taken):
+            self.removed += count_nodes(if_ast) - count_nodes(taken) - 2
+            return [Element(InterpreterBase.IF_NODE, condition=Element(InterpreterBase.BOOL_NODE, val=True),
+                            statements=taken, else_statements=None)]
+        self.removed += count_nodes(if_ast) - count_nodes(taken)
+        return taken
+
+
+# drops the statements that follow an unconditional `return` in a block
+class DeadCodeElimination:
+    name = "remove_dead_code"
+
+    def run(self, ast):
+        removed = 0
+        for func_def in ast.get("functions"):
+            for block in blocks_of(func_def.get("statements")):
+                for index, statement in enumerate(block):
+                    if statement.elem_type == InterpreterBase.RETURN_NODE:
+                        removed += count_nodes(block[index + 1:])
+                        del block[index + 1:]
+                        break
+        return removed
+
+
+class Optimizer:
+    PASS_NAMES = (ConstantFolding.name, IfFolding.name, DeadCodeElimination.name)
+
+    # op_to_lambda: the interpreter's operator handlers (used for constant folding)
+    # disable: names of passes to skip, see PASS_NAMES
+    # passes: a custom list of pass objects (anything with a `name` and a run(ast) -> removed)
+    def __init__(self, op_to_lambda, disable=(), passes=None):
+        for name in disable:
+            if name not in Optimizer.PASS_NAMES:
+                raise ValueError(f"Unknown optimizer pass {name!r}, expected one of {Optimizer.PASS_NAMES}")
+        if passes is None:
+            passes = [ConstantFolding(op_to_lambda), IfFolding(), DeadCodeElimination()]
+        self.passes = [p for p in passes if p.name not in disable]
+        self.stats = {}
+
+    # optimizes ast in place; returns {pass name: nodes removed}
+    def run(self, ast):
+        self.stats = {p.name: 0 for p in self.passes}
+        for p in self.passes:
+            self.stats[p.name] += p.run(ast)
+        return self.stats
@@ -0,0 +1,259 @@
+# Persistent on-disk cache of parsed programs.
+#
+# Entries are keyed on a hash of the program source and stored as a compressed marshal dump
+# of the Element tree, so running the same program again loads the tree instead of going
+# through yacc. Every entry lives in a directory named after the grammar signature
+# (brewparse.yacc_parser.signature, PLY's signature of the grammar the parser was built
+# from, which changes whenever the grammar in brewparse.py does), so trees parsed by an old
+# grammar are never loaded. The directories of other signatures are left alone (another
+# checkout or python sharing the directory may still use them) until prune() drops them. The
+# total size on disk is capped; the least recently used entries (oldest mtime, touched on every
+# hit) get evicted first. The cache never fails a run: when the directory can't be read or
+# written, programs are just parsed.
+# Entries carry the source offset of every node too, so trees loaded from the cache get the
+# same positions (positions.py) as freshly parsed ones.
+
+import gc
+import hashlib
+import marshal
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+
+from element import Element, node_classes
+from brewparse import parse_program, yacc_parser
+from positions import Positions
+
+FORMAT_VERSION = 3  # bump when the encoding below changes
+ENTRY_SUFFIX = ".ast"
+GRAMMAR_DIR = re.compile(r"[0-9a-f]{16}")  # names of the per-signature directories
+
+
+# Element trees as marshal-able values: an Element becomes the flat tuple
+# (elem_type, value, value, ...) with its fields in the order of its class's field_names,
+# lists stay lists (no tuples ever appear in a tree, so a tuple is always an Element).
+# Strings are interned so marshal writes each distinct one once and refers back to it after
+# that
+def encode(node):
+    if isinstance(node, Element):
+        data = [sys.intern(node.elem_type)]
+        for key in node.field_names:
+            data.append(encode(getattr(node, key)))
+        return tuple(data)
+    if isinstance(node, list):
+        return [encode(item) for item in node]
+    if isinstance(node, str):
+        return sys.intern(node)
+    return node
+
+
+def decode(data):
+    if type(data) is tuple:
+        elem_type = data[0]
+        return node_classes[elem_type](elem_type, *[decode(value) for value in data[1:]])
+    if type(data) is list:
+        return [decode(item) for item in data]
+    return data
+
+
+# the offset of every Element of the tree, in pre-order (-1 for the ones without a position),
+# from a {node: offset} table
+def encode_offsets(node, table, offsets):
+    if isinstance(node, Element):
+        offsets.append(table.get(node, -1))
+        for key in node.field_names:
+            encode_offsets(getattr(node, key), table, offsets)
+    elif isinstance(node, list):
+        for item in node:
+            encode_offsets(item, table, offsets)
+    return offsets
+
+
+# adds the positions encode_offsets() listed (offsets: an iterator over them) back for a
+# decoded tree
+def decode_offsets(node, offsets, positions):
+    if isinstance(node, Element):
+        offset = next(offsets)
+        if offset >= 0:
+            positions.add(node, offset)
+        for key in node.field_names:
+            decode_offsets(getattr(node, key), offsets, positions)
+    elif isinstance(node, list):
+        for item in node:
+            decode_offsets(item, offsets, positions)
+
+
+# positions: the Positions the tree was parsed with
+def dumps(ast, positions):
+    table = dict(positions.items())
+    offsets = encode_offsets(ast, table, array("q"))
+    return zlib.compress(marshal.dumps((encode(ast), offsets.tobytes())), 1)
+
+
+# positions: a Positions to add the positions of the nodes to, or None
+def loads(data, positions=None):
+    # a big tree is a lot of new container objects at once: don't let the cyclic GC keep
+    # scanning them while they're being built (they hold no cycles anyway)
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        tree, offset_bytes = marshal.loads(zlib.decompress(data))
+        ast = decode(tree)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    if positions is not None:
+        offsets = array("q")
+        offsets.frombytes(offset_bytes)
+        decode_offsets(ast, iter(offsets), positions)
+    return ast
+
+
+def grammar_key():
+    signature = f"{FORMAT_VERSION}:{marshal.version}:{yacc_parser.signature}"
+    return hashlib.sha256(signature.encode()).hexdigest()[:16]
+
+
+class ParseCache:
+    # directory: where entries are stored (created if needed)
+    # max_bytes: size cap over all entries of the current grammar
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024):
+        self.root = directory
+        self.max_bytes = max_bytes
+        self.directory = os.path.join(directory, grammar_key())
+        os.makedirs(self.directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # parse_program(program, parser, positions=positions), through the cache
+    def parse(self, program, parser="yacc", positions=None):
+        path = self.__path(program)
+        ast = self.__load(path, positions)
+        if ast is not None:
+            self.hits += 1
+            return ast
+        self.misses += 1
+        # (positions are always recorded, for the entry)
+        parsed = Positions(program)
+        ast = parse_program(program, parser, positions=parsed)  # raises on syntax errors, which are never cached
+        if positions is not None:
+            positions.include(parsed, 0)
+        self.__store(path, ast, parsed)
+        return ast
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.__entries()),
+            "bytes": sum(size for _, _, size in self.__entries()),
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        for path, _, _ in self.__entries():
+            self.__remove(path)
+
+    # deletes the directories of the other grammar signatures under the cache's root: all of
+    # them, or those with no entry used in the last max_age seconds
+    def prune(self, max_age=None):
+        current = os.path.basename(self.directory)
+        now = time.time()
+        for entry in os.scandir(self.root):
+            # only touch directories this cache created
+            if not entry.is_dir() or entry.name == current or not GRAMMAR_DIR.fullmatch(entry.name):
+                continue
+            if max_age is not None and now - self.__last_used(entry.path) < max_age:
+                continue
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    def __path(self, program):
+        digest = hashlib.sha256(program.encode()).hexdigest()
+        return os.path.join(self.directory, digest + ENTRY_SUFFIX)
+
+    def __load(self, path, positions):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # (into a Positions of its own, so a corrupt entry adds nothing to positions)
+            loaded = Positions(None) if positions is not None else None
+            ast = loads(data, loaded)
+        except OSError:
+            return None  # not cached (or the cache can't be read)
+        except (EOFError, ValueError, TypeError, IndexError, StopIteration, zlib.error):
+            self.__remove(path)  # truncated or corrupt entry: parse again
+            return None
+        if positions is not None:
+            positions.include(loaded, 0)
+        try:
+            os.utime(path)  # most recently used
+        except OSError:
+            pass
+        return ast
+
+    def __store(self, path, ast, positions):
+        data = dumps(ast, positions)
+        if len(data) > self.max_bytes:
+            return
+        # write to a temp file and rename, so other processes never read half an entry
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return  # a read-only, full or deleted directory: the run goes on without storing
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            self.__remove(tmp_path)
+            return
+        self.__evict()
+
+    # removes least recently used entries until the cache fits in max_bytes
+    def __evict(self):
+        entries = self.__entries()
+        total = sum(size for _, _, size in entries)
+        for path, _, size in sorted(entries, key=lambda entry: entry[1]):
+            if total <= self.max_bytes:
+                break
+            self.__remove(path)
+            total -= size
+            self.evictions += 1
+
+    # (path, mtime, size) of every entry
+    def __entries(self, directory=None):
+        entries = []
+        try:
+            scan = list(os.scandir(directory or self.directory))
+        except OSError:
+            return entries  # the directory is gone (pruned by another process) or unreadable
+        for entry in scan:
+            if entry.name.endswith(ENTRY_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # evicted by another process
+                entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return entries
+
+    # mtime of the most recently used entry in a grammar directory (of the directory when it's
+    # empty)
+    def __last_used(self, directory):
+        try:
+            last_used = os.stat(directory).st_mtime
+        except OSError:
+            return 0
+        return max([last_used] + [mtime for _, mtime, _ in self.__entries(directory)])
+
+    def __remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,96 @@
+# Source positions of AST nodes, kept out of the nodes themselves: a side table of
+# (node, offset of its first token in the source), a list of the nodes and a flat array of the
+# offsets, filled in by the parsers when they're given one (parse_program(..., positions=...)).
+# Nothing is looked up until a runtime error needs a line number, so running a program never
+# touches the table; the line and column are worked out from the offset then.
+#
+# The table holds on to its nodes, so an entry can't end up pointing at some other node that
+# took the place of one the optimizer or the incremental parser let go of. If a node is added
+# more than once, its last entry counts.
+from array import array
+
+from element import Element
+
+
+class Positions:
+    def __init__(self, source, first_line=1):
+        self.source = source
+        self.first_line = first_line
+        self.nodes = []
+        self.offsets = array("Q")  # offset of each node's first token in source
+        self.parts = []  # (Positions of a piece of source, offset of the piece in source)
+
+    def add(self, node, offset):
+        self.nodes.append(node)
+        self.offsets.append(offset)
+
+    # the positions of the nodes of a piece of source (offsets counted from the start of the
+    # piece) that starts at offset start
+    def include(self, positions, start):
+        self.parts.append((positions, start))
+
+    # the offset of node in source, or None if it isn't in the table
+    def offset(self, node):
+        found = -1
+        try:
+            while True:
+                found = self.nodes.index(node, found + 1)  # (nodes compare by identity)
+        except ValueError:
+            pass
+        if found >= 0:
+            return self.offsets[found]
+        for positions, start in reversed(self.parts):
+            offset = positions.offset(node)
+            if offset is not None:
+                return start + offset
+        return None
+
+    # every (node, offset) in the table, the entry that offset() goes by for a node last
+    def items(self):
+        for positions, start in self.parts:
+            for node, offset in positions.items():
+                yield node, start + offset
+        yield from zip(self.nodes, self.offsets)
+
+    # a Positions for tree, given that this is the table of twin: a tree parsed from the same
+    # source and optimized the same way. Nodes are matched up by where they are in the two
+    # trees (and a node without a twin of the same type gets no position)
+    def for_twin(self, twin, tree):
+        table = dict(self.items())
+        positions = Positions(self.source, self.first_line)
+        add = positions.add
+        pending = [(twin, tree)]
+        pop = pending.pop
+        push = pending.append
+        while pending:
+            twin, tree = pop()
+            if type(twin) is list:
+                if type(tree) is list and len(twin) == len(tree):
+                    pending.extend(zip(twin, tree))
+                continue
+            if not isinstance(tree, Element) or tree.elem_type != twin.elem_type:
+                continue
+            offset = table.get(twin)
+            if offset is not None:
+                add(tree, offset)
+            for key in twin.field_names:
+                child = getattr(twin, key)
+                if isinstance(child, (Element, list)):  # (not the names and values)
+                    push((child, getattr(tree, key)))
+        return positions
+
+    def line(self, node):
+        offset = self.offset(node)
+        if offset is None:
+            return None
+        return self.first_line + self.source.count("\n", 0, offset)
+
+    # (1 for the first character of the line)
+    def column(self, node):
+        offset = self.offset(node)
+        if offset is None:
+            return None
+        return offset - self.source.rfind("\n", 0, offset)
+
+    def __len__(self):
+        return len(self.nodes) + sum(len(positions) for positions, _ in self.parts)
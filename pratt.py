@@ -0,0 +1,333 @@
+# Hand-written parser for Brewin: recursive descent for programs and statements, a Pratt
+# parser (precedence climbing) for expressions. It builds exactly the same Element trees as
+# the yacc grammar in brewparse.py, from the same tokens, without PLY's per-reduction
+# overhead (a YaccProduction and a p_* call for every rule).
+#
+# It only has to handle valid programs: parse() returns None on the first syntax error and
+# brewparse.parse_program then hands the program to yacc, so error messages and PLY's error
+# recovery stay exactly what they were.
+
+import sys
+from array import array
+
+from element import Element
+from intbase import InterpreterBase
+from brewlex import END, token_codes
+
+(ASSIGN, CATCH, COLON, COMMA, DOT, ELSE, FALSE, FOR, FUNC, IF, LBRACE, LPAREN, NAME, NEW, NIL, NOT,
+ NUMBER, RAISE, RBRACE, RETURN, RPAREN, SEMI, STRING, STRUCT, TRUE, TRY, VAR) = (token_codes[name] for name in (
+    "ASSIGN", "CATCH", "COLON", "COMMA", "DOT", "ELSE", "FALSE", "FOR", "FUNC", "IF", "LBRACE", "LPAREN", "NAME",
+    "NEW", "NIL", "NOT", "NUMBER", "RAISE", "RBRACE", "RETURN", "RPAREN", "SEMI", "STRING", "STRUCT", "TRUE", "TRY",
+    "VAR"))
+
+
+class _SyntaxError(Exception):
+    pass
+
+
+class PrattParser:
+    # precedence: a yacc precedence table (see brewparse.precedence)
+    # unary: {token type: the precedence table entry it uses as a prefix operator}
+    def __init__(self, precedence, unary):
+        self.binary = {}  # token code -> (level, associativity)
+        levels = {}
+        for level, (associativity, *names) in enumerate(precedence, start=1):
+            for name in names:
+                levels[name] = (level, associativity)
+        for name, level in levels.items():
+            if name not in unary.values():  # UMINUS, NOT: only ever prefix operators
+                self.binary[token_codes[name]] = level
+        self.unary = {token_codes[token]: levels[entry] for token, entry in unary.items()}
+        self.types = None
+        self.value_ids = None
+        self.values = None
+        self.offsets = None
+        self.positions = None
+        self.pos = 0
+
+    # returns the program Element, or None if stream (a brewlex.TokenStream) isn't a valid
+    # program. positions: a positions.Positions to add the position of every node to
+    def parse(self, stream, positions=None):
+        # two END tokens past the end, so looking one token ahead never runs off the arrays
+        self.types = stream.types + array("B", (END, END))
+        self.value_ids = stream.value_ids + array("l", (0, 0))
+        self.values = stream.values
+        self.offsets = stream.offsets + array("l", (0, 0))
+        self.positions = positions
+        self.pos = 0
+        try:
+            program = self.__program()
+        except _SyntaxError:
+            return None
+        finally:
+            self.types = self.value_ids = self.values = self.offsets = self.positions = None
+        return program
+
+    # ---------- helpers ----------
+
+    def __expect(self, token_type):
+        if self.types[self.pos] != token_type:
+            raise _SyntaxError()
+        value = self.values[self.value_ids[self.pos]]
+        self.pos += 1
+        return value
+
+    def __accept(self, token_type):
+        if self.types[self.pos] == token_type:
+            self.pos += 1
+            return True
+        return False
+
+    # node, with its position (the token at start) recorded when there's a positions table
+    def __at(self, start, node):
+        if self.positions is not None:
+            self.positions.add(node, self.offsets[start])
+        return node
+
+    # ---------- program ----------
+
+    def __program(self):
+        structs = []
+        while self.types[self.pos] == STRUCT:
+            structs.append(self.__struct())
+        functions = [self.__func()]
+        while self.types[self.pos] == FUNC:
+            functions.append(self.__func())
+        if self.types[self.pos] != END:
+            raise _SyntaxError()
+        return Element(InterpreterBase.PROGRAM_NODE, structs=structs, functions=functions)
+
+    def __struct(self):
+        start = self.pos
+        self.__expect(STRUCT)
+        name = self.__expect(NAME)
+        self.__expect(LBRACE)
+        fields = [self.__field()]
+        while self.types[self.pos] != RBRACE:
+            fields.append(self.__field())
+        self.pos += 1
+        return self.__at(start, Element(InterpreterBase.STRUCT_NODE, name=name, fields=fields))
+
+    def __field(self):
+        start = self.pos
+        name = self.__expect(NAME)
+        self.__expect(COLON)
+        var_type = self.__expect(NAME)
+        self.__expect(SEMI)
+        return self.__at(start, Element(InterpreterBase.FIELD_DEF_NODE, name=name, var_type=var_type))
+
+    def __func(self):
+        start = self.pos
+        self.__expect(FUNC)
+        name = self.__expect(NAME)
+        self.__expect(LPAREN)
+        args = []
+        if not self.__accept(RPAREN):
+            args.append(self.__formal_arg())
+            while self.__accept(COMMA):
+                args.append(self.__formal_arg())
+            self.__expect(RPAREN)
+        return_type = None
+        if self.__accept(COLON):
+            return_type = self.__expect(NAME)
+        statements = self.__block()
+        return self.__at(start, Element(
+            InterpreterBase.FUNC_NODE, name=name, args=args, return_type=return_type, statements=statements))
+
+    def __formal_arg(self):
+        start = self.pos
+        name = self.__expect(NAME)
+        var_type = None
+        if self.__accept(COLON):
+            var_type = self.__expect(NAME)
+        return self.__at(start, Element(InterpreterBase.ARG_NODE, name=name, var_type=var_type))
+
+    # ---------- statements ----------
+
+    # { statement+ }
+    def __block(self):
+        self.__expect(LBRACE)
+        statements = [self.__statement()]
+        while self.types[self.pos] != RBRACE:
+            statements.append(self.__statement())
+        self.pos += 1
+        return statements
+
+    def __statement(self):
+        kind = self.types[self.pos]
+        if kind == NAME and self.__at_assign():
+            statement = self.__assign()
+        elif kind == VAR:
+            statement = self.__var_def()
+        elif kind == IF:
+            return self.__if()
+        elif kind == FOR:
+            return self.__for()
+        elif kind == TRY:
+            return self.__try()
+        elif kind == RETURN:
+            start = self.pos
+            self.pos += 1
+            expression = None
+            if self.types[self.pos] != SEMI:
+                expression = self.__expression()
+            statement = self.__at(start, Element(InterpreterBase.RETURN_NODE, expression=expression))
+        elif kind == RAISE:
+            start = self.pos
+            self.pos += 1
+            statement = self.__at(start, Element(InterpreterBase.RAISE_NODE, exception_type=self.__expression()))
+        else:
+            statement = self.__expression()
+        self.__expect(SEMI)
+        return statement
+
+    # is the statement at pos an assignment: NAME (DOT NAME)* ASSIGN
+    def __at_assign(self):
+        types = self.types
+        i = self.pos + 1
+        while types[i] == DOT and types[i + 1] == NAME:
+            i += 2
+        return types[i] == ASSIGN
+
+    def __assign(self):
+        start = self.pos
+        name = self.__dotted_name()
+        self.__expect(ASSIGN)
+        return self.__at(start, Element("=", name=name, expression=self.__expression()))
+
+    def __var_def(self):
+        start = self.pos
+        self.pos += 1
+        name = self.__expect(NAME)
+        var_type = None
+        if self.__accept(COLON):
+            var_type = self.__expect(NAME)
+        return self.__at(start, Element(InterpreterBase.VAR_DEF_NODE, name=name, var_type=var_type))
+
+    def __if(self):
+        start = self.pos
+        self.pos += 1
+        self.__expect(LPAREN)
+        condition = self.__expression()
+        self.__expect(RPAREN)
+        statements = self.__block()
+        else_statements = None
+        if self.__accept(ELSE):
+            else_statements = self.__block()
+        return self.__at(start, Element(
+            InterpreterBase.IF_NODE, condition=condition, statements=statements, else_statements=else_statements))
+
+    def __for(self):
+        start = self.pos
+        self.pos += 1
+        self.__expect(LPAREN)
+        init = self.__assign()
+        self.__expect(SEMI)
+        condition = self.__expression()
+        self.__expect(SEMI)
+        update = self.__assign()
+        self.__expect(RPAREN)
+        statements = self.__block()
+        return self.__at(start, Element(
+            InterpreterBase.FOR_NODE, init=init, condition=condition, update=update, statements=statements))
+
+    def __try(self):
+        start = self.pos
+        self.pos += 1
+        statements = self.__block()
+        catchers = [self.__catch()]
+        while self.types[self.pos] == CATCH:
+            catchers.append(self.__catch())
+        return self.__at(start, Element(InterpreterBase.TRY_NODE, statements=statements, catchers=catchers))
+
+    def __catch(self):
+        start = self.pos
+        self.__expect(CATCH)
+        exception_type = self.__expect(STRING)
+        statements = self.__block()
+        return self.__at(start, Element(InterpreterBase.CATCH_NODE, exception_type=exception_type, statements=statements))
+
+    # ---------- expressions ----------
+
+    # parses an expression whose binary operators all bind at least as tightly as min_level
+    def __expression(self, min_level=1):
+        start = self.pos
+        left = self.__prefix()
+        binary = self.binary
+        while True:
+            operator = binary.get(self.types[self.pos])
+            if operator is None:
+                return left
+            level, associativity = operator
+            if level < min_level:
+                return left
+            op = self.values[self.value_ids[self.pos]]
+            self.pos += 1
+            if associativity == "right":
+                right = self.__expression(level)
+            else:
+                right = self.__expression(level + 1)
+                if associativity == "nonassoc":
+                    following = binary.get(self.types[self.pos])
+                    if following is not None and following[0] == level:
+                        raise _SyntaxError()
+            left = self.__at(start, Element(op, op1=left, op2=right))
+
+    def __prefix(self):
+        kind = self.types[self.pos]
+        unary = self.unary.get(kind)
+        if unary is not None:
+            start = self.pos
+            self.pos += 1
+            level, associativity = unary
+            operand = self.__expression(level if associativity == "right" else level + 1)
+            if kind == NOT:
+                return self.__at(start, Element(InterpreterBase.NOT_NODE, op1=operand))
+            return self.__at(start, Element(InterpreterBase.NEG_NODE, op1=operand))
+        return self.__primary()
+
+    def __primary(self):
+        start = self.pos
+        kind = self.types[start]
+        value = self.values[self.value_ids[start]]
+        if kind == NAME:
+            if self.types[start + 1] == LPAREN:
+                return self.__call()
+            return self.__at(start, Element(InterpreterBase.VAR_NODE, name=self.__dotted_name()))
+        self.pos += 1
+        if kind == NUMBER:
+            return self.__at(start, Element(InterpreterBase.INT_NODE, val=value))
+        if kind == STRING:
+            return self.__at(start, Element(InterpreterBase.STRING_NODE, val=value))
+        if kind == TRUE or kind == FALSE:
+            return self.__at(start, Element(InterpreterBase.BOOL_NODE, val=value == InterpreterBase.TRUE_DEF))
+        if kind == NIL:
+            return self.__at(start, Element(InterpreterBase.NIL_NODE))
+        if kind == LPAREN:
+            expression = self.__expression()
+            self.__expect(RPAREN)
+            return expression
+        if kind == NEW:
+            return self.__at(start, Element(InterpreterBase.NEW_NODE, var_type=self.__expect(NAME)))
+        raise _SyntaxError()
+
+    def __call(self):
+        start = self.pos
+        name = self.values[self.value_ids[self.pos]]
+        self.pos += 2  # NAME LPAREN
+        args = []
+        if not self.__accept(RPAREN):
+            args.append(self.__expression())
+            while self.__accept(COMMA):
+                args.append(self.__expression())
+            self.__expect(RPAREN)
+        return self.__at(start, Element(InterpreterBase.FCALL_NODE, name=name, args=args))
+
+    # NAME (DOT NAME)*, joined with "." whatever character the DOT token matched
+    def __dotted_name(self):
+        name = self.__expect(NAME)
+        types = self.types
+        while types[self.pos] == DOT and types[self.pos + 1] == NAME:
+            name = sys.intern(name + "." + self.values[self.value_ids[self.pos + 1]])
+            self.pos += 2
+        return name
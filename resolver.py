@@ -0,0 +1,161 @@
+# Static variable resolution for the compiled engines (closure_engine.py and vm.py).
+#
+# Brewin variables are block scoped and a function can't see its caller's variables, so
+# which declaration a name refers to never depends on runtime state: at any point in a
+# block, the visible variables are exactly the ones declared textually before it in the
+# enclosing blocks. This pass walks a function body once and gives every variable a fixed
+# (depth, slot) coordinate, where depth is the block nesting level of its declaration and
+# slot is its index in the function's flat frame (a plain list). The engines then read and
+# write frame[slot] directly instead of scanning scope dicts.
+#
+# Names that can't be resolved (undefined variables, duplicate definitions) are recorded
+# as diagnostics. The engines still raise the NAME_ERROR when (and only when) the offending
+# statement runs, so output before the error is unchanged.
+
+from intbase import InterpreterBase, ErrorType
+
+
+class Resolution:
+    def __init__(self):
+        self.coords = {}  # node -> (depth, slot) for var reads, assignments and vardefs
+        self.param_slots = []  # slot for each formal parameter (None if it's a duplicate)
+        self.frame_size = 0
+        self.errors = []  # (node, ErrorType, message) for names that can't be resolved
+
+    # slot index for a var/assign/vardef node, or None if it doesn't resolve
+    def slot(self, node):
+        coord = self.coords.get(node)
+        if coord is None:
+            return None
+        return coord[1]
+
+
+class Resolver:
+    def __init__(self):
+        self.resolution = None
+        self.scopes = None  # stack of {name: slot}, innermost last
+        self.next_slot = 0
+
+    def resolve_function(self, func_def):
+        self.resolution = Resolution()
+        self.scopes = [{}]
+        self.next_slot = 0
+        for param in func_def.get("args"):
+            name = param.get("name")
+            # duplicate params: the first one wins, later ones are dropped (same as env.create)
+            if name in self.scopes[-1]:
+                self.resolution.param_slots.append(None)
+            else:
+                self.resolution.param_slots.append(self.__declare(name))
+        self.__resolve_block(func_def.get("statements"))
+        return self.resolution
+
+    # ---------- scopes ----------
+
+    def __declare(self, name):
+        slot = self.next_slot
+        self.next_slot += 1
+        self.resolution.frame_size = max(self.resolution.frame_size, self.next_slot)
+        self.scopes[-1][name] = slot
+        return slot
+
+    def __lookup(self, name):
+        depth = len(self.scopes) - 1
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return depth, scope[name]
+            depth -= 1
+        return None
+
+    def __push(self):
+        self.scopes.append({})
+
+    def __pop(self):
+        # slots of a finished block are free for the next sibling block
+        self.next_slot -= len(self.scopes.pop())
+
+    # ---------- statements ----------
+
+    def __resolve_block(self, statements):
+        for statement in statements:
+            self.__resolve_statement(statement)
+
+    def __resolve_statement(self, statement):
+        kind = statement.elem_type
+        if kind == InterpreterBase.RETURN_NODE:
+            if statement.get("expression") is not None:
+                self.__resolve_expr(statement.get("expression"))
+        elif kind == InterpreterBase.FCALL_NODE:
+            self.__resolve_expr(statement)
+        elif kind == "=":
+            self.__resolve_assign(statement)
+        elif kind == InterpreterBase.VAR_DEF_NODE:
+            name = statement.get("name")
+            if name in self.scopes[-1]:
+                self.resolution.errors.append(
+                    (statement, ErrorType.NAME_ERROR, f"Duplicate definition for variable {name}")
+                )
+            else:
+                self.__declare(name)
+                self.resolution.coords[statement] = self.__lookup(name)
+        elif kind == InterpreterBase.IF_NODE:
+            self.__resolve_expr(statement.get("condition"))
+            self.__push()
+            self.__resolve_block(statement.get("statements"))
+            self.__pop()
+            if statement.get("else_statements") is not None:
+                self.__push()
+                self.__resolve_block(statement.get("else_statements"))
+                self.__pop()
+        elif kind == InterpreterBase.FOR_NODE:
+            self.__resolve_assign(statement.get("init"))
+            # condition, body and update all run inside the per-iteration scope
+            self.__push()
+            self.__resolve_expr(statement.get("condition"))
+            self.__resolve_block(statement.get("statements"))
+            self.__resolve_assign(statement.get("update"))
+            self.__pop()
+        # other statements are never executed, nothing to resolve
+
+    def __resolve_assign(self, assign_ast):
+        self.__resolve_expr(assign_ast.get("expression"))
+        name = assign_ast.get("name")
+        coord = self.__lookup(name)
+        if coord is None:
+            self.resolution.errors.append(
+                (assign_ast, ErrorType.NAME_ERROR, f"Undefined variable {name} in assignment")
+            )
+        else:
+            self.resolution.coords[assign_ast] = coord
+
+    # ---------- expressions ----------
+
+    def __resolve_expr(self, expr_ast):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.VAR_NODE:
+            name = expr_ast.get("name")
+            coord = self.__lookup(name)
+            if coord is None:
+                self.resolution.errors.append(
+                    (expr_ast, ErrorType.NAME_ERROR, f"Variable {name} not found")
+                )
+            else:
+                self.resolution.coords[expr_ast] = coord
+        elif kind == InterpreterBase.FCALL_NODE:
+            for arg in expr_ast.get("args"):
+                self.__resolve_expr(arg)
+        else:
+            for operand in ("op1", "op2"):
+                if expr_ast.get(operand) is not None:
+                    self.__resolve_expr(expr_ast.get(operand))
+
+
+# resolves every function of a parsed program and returns all the diagnostics,
+# as (func name, arg count, node, ErrorType, message) tuples
+def check_program(ast):
+    diagnostics = []
+    for func_def in ast.get("functions"):
+        resolution = Resolver().resolve_function(func_def)
+        for node, error_type, message in resolution.errors:
+            diagnostics.append((func_def.get("name"), len(func_def.get("args")), node, error_type, message))
+    return diagnostics
@@ -0,0 +1,228 @@
+# Runs a corpus of Brewin test programs in parallel. A test is a program with its expected
+# output in a comment, the way the README shows:
+#   /*
+#   *IN*
+#   5
+#   *IN*
+#   *OUT*
+#   a: 5
+#   ErrorType.TYPE_ERROR on line 7
+#   *OUT*
+#   */
+# The *IN* block (optional) holds the input lines, fed to inputi()/inputs() in order. The
+# *OUT* block holds the lines the program must print (trailing whitespace aside); when its
+# last line is an ErrorType, the program must fail with that error type (and on that line,
+# when the line is given) after printing the lines before it, checked with
+# get_error_type_and_line().
+#
+# A file that has no *OUT* block fails as "no *OUT* block".
+#
+# The tests run on a pool of worker processes, each one set up once before its first test
+# (interpreter and frozen parser tables imported, a program run), so a test only costs its own
+# run. Every test gets a fresh interpreter and reports its own wall time.
+#   python run_tests.py [PATH ...] [--workers N] [--engine ENGINE] [--timeout S] [--slowest N]
+import argparse
+import functools
+import os
+import re
+import signal
+import sys
+import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+SUFFIXES = (".br", ".brewin")  # what a directory is searched for
+ERROR_LINE = re.compile(r"(ErrorType\.\w+)(?: on line (\d+))?$")
+WARM_UP = 'func main() { var x; x = 1 + 2; print("x: ", x); }'
+
+
+class TestCase:
+    def __init__(self, path, program, inputs, expected_output, expected_error=None, expected_line=None):
+        self.path = path
+        self.program = program
+        self.inputs = inputs
+        self.expected_output = expected_output
+        self.expected_error = expected_error  # "ErrorType.X", or None when the program must finish
+        self.expected_line = expected_line
+
+
+class TestResult:
+    def __init__(self, path, passed, wall_time, problem=None):
+        self.path = path
+        self.passed = passed
+        self.wall_time = wall_time  # seconds the run took in the worker
+        self.problem = problem  # why it failed
+
+
+# (a BaseException, so nothing in the interpreter mistakes it for an error of the program)
+class TestTimeout(BaseException):
+    pass
+
+
+# the lines of the first *MARKER* ... *MARKER* block in program (None if there's none),
+# dedented and without trailing whitespace, which editors drop anyway
+def annotated_block(program, marker):
+    blocks = program.split(f"*{marker}*")
+    if len(blocks) < 3:
+        return None
+    return [line.rstrip() for line in textwrap.dedent(blocks[1]).strip("\n").splitlines()]
+
+
+# the TestCase in a file, or None when it has no *OUT* block
+def load_test(path):
+    with open(path, encoding="utf-8") as f:
+        program = f.read()
+    expected_output = annotated_block(program, "OUT")
+    if expected_output is None:
+        return None
+    test = TestCase(path, program, annotated_block(program, "IN") or [], expected_output)
+    match = ERROR_LINE.match(expected_output[-1]) if expected_output else None
+    if match is not None:
+        test.expected_output = expected_output[:-1]
+        test.expected_error = match.group(1)
+        test.expected_line = int(match.group(2)) if match.group(2) else None
+    return test
+
+
+# the test files under paths (files are taken as they are, directories searched for SUFFIXES)
+def discover(paths):
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        for directory, subdirectories, files in os.walk(path):
+            subdirectories.sort()
+            found.extend(os.path.join(directory, name) for name in sorted(files) if name.endswith(SUFFIXES))
+    return found
+
+
+# why the run doesn't match the test, or None when it does
+def check(test, output, error_type, error_line, failure):
+    if test.expected_error is None:
+        if failure is not None:
+            return f"failed: {failure}"
+    elif error_type is None:
+        return f"expected {test.expected_error}, " + (f"got {failure}" if failure is not None else "but it finished")
+    elif str(error_type) != test.expected_error:
+        return f"expected {test.expected_error}, got {error_type} ({failure})"
+    elif test.expected_line is not None and error_line != test.expected_line:
+        return f"expected {test.expected_error} on line {test.expected_line}, got it on line {error_line}"
+    output = [line.rstrip() for line in output]
+    if output != test.expected_output:
+        return "output differs:\n" + "\n".join(diff_lines(test.expected_output, output))
+    return None
+
+
+def diff_lines(expected, got):
+    lines = []
+    for number in range(max(len(expected), len(got))):
+        want = expected[number] if number < len(expected) else "(nothing)"
+        have = got[number] if number < len(got) else "(nothing)"
+        if want != have:
+            lines.append(f"  line {number + 1}: expected {want!r}, got {have!r}")
+    return lines
+
+
+def on_timeout(signum, frame):
+    raise TestTimeout()
+
+
+# (in each worker, once) imports and runs everything a test needs, so tests don't pay for it
+# (the interpreter is imported where it's used, so that main() can set BREWIN_FROZEN_TABLES
+# first; importing this module doesn't import it)
+def warm_up(engine):
+    from interpreterv2 import Interpreter
+    Interpreter(console_output=False, engine=engine).run(WARM_UP)
+    if hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, on_timeout)
+
+
+def run_test(path, engine="tree", timeout=None):
+    from inputs import IteratorInput
+    from interpreterv2 import Interpreter
+    from sinks import ListSink
+    start = time.perf_counter()
+    try:
+        test = load_test(path)
+    except (OSError, UnicodeDecodeError) as error:
+        return TestResult(path, False, 0.0, f"can't read it: {error}")
+    if test is None:
+        return TestResult(path, False, 0.0, "no *OUT* block")
+    interpreter = Interpreter(console_output=False, inp=IteratorInput(test.inputs, at_eof=EOFError), engine=engine,
+                              output_sink=ListSink())
+    failure = None
+    timer = timeout is not None and hasattr(signal, "setitimer")
+    if timer:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        interpreter.run(test.program)
+    except TestTimeout:
+        return TestResult(path, False, time.perf_counter() - start, f"timed out after {timeout:g}s")
+    except Exception as error:
+        failure = str(error) or type(error).__name__
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    wall_time = time.perf_counter() - start
+    error_type, error_line = interpreter.get_error_type_and_line()
+    problem = check(test, interpreter.get_output(), error_type, error_line, failure)
+    return TestResult(path, problem is None, wall_time, problem)
+
+
+# runs the tests at paths on workers processes (in this one with workers=1), yielding every
+# TestResult in the order of paths as soon as it's there
+def run_tests(paths, workers=None, engine="tree", timeout=None):
+    run = functools.partial(run_test, engine=engine, timeout=timeout)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        warm_up(engine)
+        yield from map(run, paths)
+        return
+    # a few chunks per worker: a chunk is one round trip, and small ones keep the workers busy
+    # until the end
+    chunk_size = max(1, len(paths) // (workers * 8))
+    with ProcessPoolExecutor(workers, initializer=warm_up, initargs=(engine,)) as executor:
+        yield from executor.map(run, paths, chunksize=chunk_size)
+
+
+def main():
+    # (before the interpreter is imported, here and so in the workers: load the frozen lexer and
+    # parser tables instead of building them from the rules; BREWIN_FROZEN_TABLES=0 builds them)
+    os.environ.setdefault("BREWIN_FROZEN_TABLES", "1")
+    from interpreterv2 import Interpreter
+
+    args = argparse.ArgumentParser()
+    args.add_argument("paths", nargs="*", default=["."], help="test files, or directories to search")
+    args.add_argument("--workers", type=int, default=None, help="processes to run tests on (default: one per core)")
+    args.add_argument("--engine", default="tree", choices=Interpreter.ENGINES)
+    args.add_argument("--timeout", type=float, default=None, help="seconds a test may run")
+    args.add_argument("--slowest", type=int, default=5, help="slowest tests to list at the end")
+    args.add_argument("--quiet", action="store_true", help="only print failures and the summary")
+    args = args.parse_args()
+
+    start = time.perf_counter()
+    paths = discover(args.paths)
+    results = []
+    for result in run_tests(paths, args.workers, args.engine, args.timeout):
+        results.append(result)
+        if not result.passed or not args.quiet:
+            print(f"{'PASS' if result.passed else 'FAIL'}  {result.wall_time * 1000:8.1f} ms  {result.path}")
+        if not result.passed:
+            print("      " + result.problem.replace("\n", "\n      "))
+    elapsed = time.perf_counter() - start
+
+    failed = sum(not result.passed for result in results)
+    test_time = sum(result.wall_time for result in results)
+    if args.slowest and results:
+        print("\nslowest:")
+        for result in sorted(results, key=lambda result: -result.wall_time)[:args.slowest]:
+            print(f"  {result.wall_time * 1000:8.1f} ms  {result.path}")
+    print(f"\n{len(results) - failed} passed, {failed} failed in {elapsed:.2f}s "
+          f"({test_time:.2f}s of tests, {test_time / elapsed if elapsed else 0:.1f}x)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
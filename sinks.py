@@ -0,0 +1,181 @@
+# Output sinks: where the lines a Brewin program prints go. Pass one as
+# Interpreter(output_sink=...) instead of the default, which print()s every line and also
+# keeps all of them in output_log.
+#
+# The sinks that write somewhere (stdout, a file) hold lines back and write them batch_lines
+# at a time, joined into one string: one write (and flush) per batch instead of per line. The
+# interpreter flushes its sink at the end of every run and before reading from the keyboard,
+# so prompts still show up before input() waits.
+#
+# The async sinks, for Interpreter.run_async, are in async_io.py.
+import abc
+import collections
+import os
+import sys
+import threading
+
+BATCH_LINES = 1024  # lines held back before a write
+
+
+class OutputSink:
+    awaitable = False  # write() and flush() are coroutines (async_io's sinks, for run_async only)
+
+    def __init__(self):
+        self.count = 0  # lines written to the sink
+
+    def write(self, line):
+        self.count += 1
+
+    # writes out whatever is held back
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    # the lines the sink keeps, or None for sinks that don't keep any
+    def lines(self):
+        return None
+
+
+# drops every line (only counts them)
+class DiscardSink(OutputSink):
+    pass
+
+
+# keeps every line in a list
+class ListSink(OutputSink):
+    def __init__(self):
+        super().__init__()
+        self.captured = []
+
+    def write(self, line):
+        self.count += 1
+        self.captured.append(line)
+
+    def lines(self):
+        return self.captured
+
+
+# keeps the last max_lines lines only
+class RingBufferSink(OutputSink):
+    def __init__(self, max_lines=1000):
+        super().__init__()
+        self.ring = collections.deque(maxlen=max_lines)
+
+    def write(self, line):
+        self.count += 1
+        self.ring.append(line)
+
+    def lines(self):
+        return list(self.ring)
+
+
+# holds lines back and hands them to write_batch() batch_lines at a time, as one string.
+# Subclasses say where the batches go by defining write_batch()
+class BufferedSink(OutputSink, abc.ABC):
+    def __init__(self, batch_lines=BATCH_LINES):
+        super().__init__()
+        self.batch_lines = batch_lines
+        self.pending = []
+
+    def write(self, line):
+        self.count += 1
+        self.pending.append(line)
+        if len(self.pending) >= self.batch_lines:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            text = "\n".join(self.pending) + "\n"
+            self.pending = []
+            self.write_batch(text)
+
+    # writes text, batch_lines lines (or the rest of them, at a flush) joined into one string
+    @abc.abstractmethod
+    def write_batch(self, text):
+        pass
+
+
+# writes to stream, or to whatever sys.stdout is at the time of each write when stream is
+# None (so contextlib.redirect_stdout still works)
+class StdoutSink(BufferedSink):
+    def __init__(self, stream=None, batch_lines=BATCH_LINES):
+        super().__init__(batch_lines)
+        self.stream = stream
+
+    def write_batch(self, text):
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(text)
+        stream.flush()
+
+
+# writes to a file: a path (opened for writing, and closed by close()) or a file object opened
+# in text mode (left open)
+class FileSink(BufferedSink):
+    def __init__(self, file, batch_lines=BATCH_LINES, encoding="utf-8"):
+        super().__init__(batch_lines)
+        if isinstance(file, (str, bytes, os.PathLike)):
+            self.file = open(file, "w", encoding=encoding)
+            self.owned = True
+        else:
+            self.file = file
+            self.owned = False
+
+    def write_batch(self, text):
+        self.file.write(text)
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        if self.owned:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# raised out of HandoffSink.write() in the program's thread when the reader stops reading, to
+# unwind the run (a BaseException, so nothing on the way mistakes it for an error of the
+# program)
+class StopRun(BaseException):
+    pass
+
+
+# hands each line over to a reader in another thread and waits until the reader asks for the
+# next one, so the program runs in lockstep with whoever reads its output and nothing piles
+# up (see Interpreter.iter_run)
+class HandoffSink(OutputSink):
+    def __init__(self):
+        super().__init__()
+        self.line = None
+        self.done = False  # the program finished (or failed): no more lines
+        self.stopped = False  # the reader is gone: the program must stop
+        self.ready = threading.Semaphore(0)  # a line, or done, is waiting for the reader
+        self.resume = threading.Semaphore(0)  # the reader wants the next line
+
+    def write(self, line):
+        self.count += 1
+        self.line = line
+        self.ready.release()
+        self.resume.acquire()
+        if self.stopped:
+            raise StopRun()
+
+    # (program's thread) no more lines
+    def finish(self):
+        self.done = True
+        self.ready.release()
+
+    # (reader) waits for the next line; returns False when the program is done
+    def next_line(self):
+        self.ready.acquire()
+        return not self.done
+
+    # (reader) lets the program go on to its next line, or stops it
+    def resume_program(self, stop=False):
+        self.stopped = stop
+        self.resume.release()
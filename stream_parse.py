@@ -0,0 +1,215 @@
+# Streaming parse of big source files. iter_definitions() reads a program from a file path or
+# a file object and yields its top-level struct and func Elements one at a time, so only the
+# text and tokens of one definition are in memory at once instead of the whole file's.
+#
+# The source is cut into definitions before it's lexed: a definition ends at the "}" that
+# brings the brace depth back to 0, not counting braces inside strings and comments (which
+# start and end where brewlex's rules say they do). Each piece then goes through
+# parse_program on its own. Files opened in binary mode are memory-mapped; any other file
+# object is read in blocks.
+#
+# There's no program without a func in the grammar, so structs are held back and parsed
+# together with the first func. A syntax error is reported for the definition it's in, with
+# line numbers counted from the start of the file.
+import os
+import re
+
+from element import Element
+from intbase import InterpreterBase
+from brewparse import parse_program
+from mapped_file import map_file
+
+BLOCK_SIZE = 1 << 20  # bytes (or characters) read at a time from file objects that can't be mapped
+
+# skips to the next thing the splitter has to look at: a string (they never span lines), a
+# string still open at the end of the buffer, a lone '"', the start of a comment, a brace, or
+# the end of the buffer
+_SPLIT = (r'[^"/{}]*(?:/(?!\*)[^"/{}]*)*'
+          r'(?:(?P<string>"[^"\n]*")|(?P<unclosed>"[^"\n]*\Z)|(?P<quote>")|(?P<comment>/\*)|(?P<lbrace>\{)|(?P<rbrace>\})|\Z)')
+_SPLIT_STR = re.compile(_SPLIT)
+_SPLIT_BYTES = re.compile(_SPLIT.encode())
+
+# blanks and comments before the first token of a piece, and the first word
+_BLANK = re.compile(r"(?:[ \t\n]|/\*.*?\*/)*", re.S)
+_WORD = re.compile(r"[A-Za-z_]\w*")
+
+
+class _Splitter:
+    def __init__(self, pattern, comment_end, pos=0):
+        self.pattern = pattern
+        self.comment_end = comment_end
+        self.depth = 0
+        self.pos = pos  # where scanning picks up again
+        self.comment_from = 0  # where to pick up the search for the */ of an open comment
+        self.no_comment_end = None  # no */ at or after this position (when the buffer is final)
+
+    # end positions of the definitions that end in buffer after pos. final: nothing comes after
+    # buffer; otherwise scanning stops where more input is needed to tell what's there
+    def split(self, buffer, final):
+        match = self.pattern.match
+        ends = []
+        pos = self.pos
+        while True:
+            m = match(buffer, pos)
+            kind = m.lastgroup
+            if kind is None:  # the end of the buffer
+                # (the last character is scanned again, it may be the "/" of a "/*")
+                self.pos = len(buffer) if final else max(pos, len(buffer) - 1)
+                return ends
+            pos = m.end()
+            if kind == "lbrace":
+                self.depth += 1
+            elif kind == "rbrace":
+                if self.depth > 0:
+                    self.depth -= 1
+                if self.depth == 0:  # (a stray "}" ends a piece too, and the parser reports it)
+                    ends.append(pos)
+            elif kind == "string" or kind == "quote":
+                continue  # (a '"' that's never closed is just a DOT token)
+            elif kind == "unclosed":
+                if not final:
+                    self.pos = m.start(kind)
+                    return ends
+                pos = m.start(kind) + 1
+            else:
+                start = m.start(kind)
+                end = self.__comment_end(buffer, max(start + 2, self.comment_from), final)
+                self.comment_from = 0
+                if end >= 0:
+                    pos = end + 2
+                elif not final:
+                    self.pos = start
+                    self.comment_from = max(start + 2, len(buffer) - 1)
+                    return ends
+                else:
+                    pos = start + 1  # unterminated: a DIVIDE, and the rest is scanned as code
+
+    # the buffer is about to lose its first n items
+    def shift(self, n):
+        self.pos -= n
+        if self.comment_from:
+            self.comment_from -= n
+
+    def __comment_end(self, buffer, start, final):
+        if self.no_comment_end is not None and start >= self.no_comment_end:
+            return -1
+        end = buffer.find(self.comment_end, start)
+        if end < 0 and final:
+            self.no_comment_end = start
+        return end
+
+
+def _text(piece):
+    return piece if isinstance(piece, str) else piece.decode("utf-8")
+
+
+# yields the text of every definition in f, and last the text after the final one
+def _pieces(f, block_size):
+    mapped = map_file(f)
+    if mapped is not None:
+        with mapped:
+            start = f.tell()
+            splitter = _Splitter(_SPLIT_BYTES, b"*/", start)
+            for end in splitter.split(mapped, True):
+                yield mapped[start:end].decode("utf-8")
+                start = end
+            yield mapped[start:].decode("utf-8")
+        return
+
+    block = f.read(block_size)
+    if isinstance(block, str):
+        splitter = _Splitter(_SPLIT_STR, "*/")
+        buffer = block
+    else:
+        splitter = _Splitter(_SPLIT_BYTES, b"*/")
+        buffer = bytearray(block)
+    final = not block
+    while True:
+        start = 0
+        for end in splitter.split(buffer, final):
+            yield _text(buffer[start:end])
+            start = end
+        if final:
+            yield _text(buffer[start:])
+            return
+        block = f.read(block_size)
+        final = not block
+        if isinstance(buffer, str):
+            buffer = buffer[start:] + block
+        else:
+            del buffer[:start]
+            buffer += block
+        splitter.shift(start)
+
+
+# yields the struct and func Elements of the program in source (a path, or a file object
+# opened in text or binary mode, read from its current position)
+def iter_definitions(source, parser="yacc", block_size=BLOCK_SIZE):
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from _definitions(f, parser, block_size)
+    else:
+        yield from _definitions(source, parser, block_size)
+
+
+def _definitions(f, parser, block_size):
+    for group, first_line, _ in definition_groups(_pieces(f, block_size)):
+        ast = parse_program("".join(group), parser, first_line)
+        yield from ast.get("structs")
+        yield from ast.get("functions")
+
+
+# the pieces of program (a string): the text of every definition, and last the text after the
+# final one
+def split_program(program):
+    pieces = []
+    start = 0
+    for end in _Splitter(_SPLIT_STR, "*/").split(program, True):
+        pieces.append(program[start:end])
+        start = end
+    pieces.append(program[start:])
+    return pieces
+
+
+# groups pieces into programs that parse on their own: every func, with the structs before the
+# first one. Yields (pieces of the group, line number and offset of its first piece); when
+# there's no func or a struct comes after the funcs, the last group is one that
+# parse_program rejects
+def definition_groups(pieces):
+    line = 1
+    offset = 0
+    held = []  # structs waiting for the first func
+    held_line = 1
+    held_offset = 0
+    seen_func = False
+    for piece in pieces:
+        first = _BLANK.match(piece).end()
+        if first == len(piece):  # nothing but blanks and comments
+            if held:
+                held.append(piece)
+        else:
+            if not held:
+                held_line = line
+                held_offset = offset
+            held.append(piece)
+            word = _WORD.match(piece, first)
+            if seen_func or word is None or word.group() != "struct":
+                yield held, held_line, held_offset
+                held = []
+                seen_func = True
+        line += piece.count("\n")
+        offset += len(piece)
+    if held or not seen_func:
+        yield held, held_line, held_offset
+
+
+# the program Element for the program in source, built one definition at a time
+def parse_file(source, parser="yacc", block_size=BLOCK_SIZE):
+    structs = []
+    functions = []
+    for definition in iter_definitions(source, parser, block_size):
+        if definition.elem_type == InterpreterBase.STRUCT_NODE:
+            structs.append(definition)
+        else:
+            functions.append(definition)
+    return Element(InterpreterBase.PROGRAM_NODE, structs=structs, functions=functions)
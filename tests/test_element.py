@@ -0,0 +1,43 @@
+import copy
+import pickle
+
+import pytest
+
+from brewparse import parse_program
+from check_parser import same_tree
+from element import Element
+
+PROGRAM = """
+struct point { x: int; y: int; }
+func f(a: int, b): int {
+  var p: point;
+  p = new point;
+  p.x = -a * (b + 1);
+  if (!(a > b) || a == nil) { print("a", a); } else { return; }
+  for (a = 0; a < 3; a = a + 1) { try { raise "e"; } catch "e" { print(a); } }
+  return f(a - 1, true);
+}
+func main() { print(f(2, 3)); }
+"""
+
+
+@pytest.mark.parametrize("round_trip", [copy.deepcopy, lambda ast: pickle.loads(pickle.dumps(ast))],
+                         ids=["deepcopy", "pickle"])
+def test_round_trip(round_trip):
+    ast = parse_program(PROGRAM)
+    loaded = round_trip(ast)
+    assert loaded is not ast and same_tree(loaded, ast)
+    assert type(loaded.get("functions")[0]) is type(ast.get("functions")[0])
+    assert str(loaded) == str(ast)
+
+def test_shallow_copy_shares_the_fields():
+    node = Element("+", op1=Element("int", val=1), op2=Element("var", name="x"))
+    copied = copy.copy(node)
+    assert copied is not node and copied.get("op1") is node.get("op1")
+
+
+def test_get_only_returns_fields():
+    node = Element("fcall", name="get", args=[])
+    assert node.get("name") == "get" and node.get("args") == []
+    for key in ("get", "field_names", "elem_type", "__class__", "missing"):
+        assert node.get(key) is None
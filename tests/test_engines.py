@@ -0,0 +1,213 @@
+import sys
+
+import pytest
+
+from intbase import ErrorType
+from interpreterv2 import Interpreter
+
+# every program runs on every engine, with and without the optimizer and memoization, and has
+# to print the same lines and fail with the same error (on the same line) as the tree walker
+PROGRAMS = {
+    "shadowing": """
+func f(x) {
+  var y;
+  y = x + 1;
+  if (x > 0) {
+    var x;
+    x = 100;
+    y = y + x;
+    for (x = 0; x < 3; x = x + 1) {
+      var y;
+      y = x * 2;
+      print("inner ", x, " ", y);
+    }
+    print("block ", x, " ", y);
+  }
+  print("param ", x, " ", y);
+  return y;
+}
+func main() {
+  var x;
+  x = 5;
+  print(f(x));
+  print("main ", x);
+}
+""",
+    "bool argument": """
+func show(b) {
+  print(b);
+  if (b) {
+    print("yes");
+  }
+}
+func main() {
+  show("true");
+  show(true);
+}
+""",
+    "statement call returns": """
+func f(n) {
+  if (n > 0) {
+    return n;
+  }
+  print("f fell off the end");
+}
+func main() {
+  f(0);
+  print("after f(0)");
+  f(3);
+  print("after f(3), never printed");
+}
+""",
+    "return of a call that returned nothing": """
+func g() {
+  print("g");
+}
+func h() {
+  return g();
+}
+func main() {
+  print(h());
+  h();
+  print("still here");
+}
+""",
+    "deep recursion": """
+func depth(n) {
+  if (n == 0) {
+    return 0;
+  }
+  return 1 + depth(n - 1);
+}
+func fib(n) {
+  if (n < 2) {
+    return n;
+  }
+  return fib(n - 1) + fib(n - 2);
+}
+func main() {
+  print(depth(400));
+  print(fib(15));
+}
+""",
+    "tail recursion": """
+func sum(n, total) {
+  if (n == 0) {
+    return total;
+  }
+  return sum(n - 1, total + n);
+}
+func even(n) {
+  if (n == 0) {
+    return true;
+  }
+  return odd(n - 1);
+}
+func odd(n) {
+  if (n == 0) {
+    return false;
+  }
+  return even(n - 1);
+}
+func main() {
+  print(sum(300, 0));
+  print(even(301), " ", odd(301));
+}
+""",
+    "overloads and input": """
+func add(a) {
+  return a + 1;
+}
+func add(a, b) {
+  return a + b;
+}
+func main() {
+  var n;
+  n = inputi("n? ");
+  print(add(n), " ", add(n, inputi()), " ", inputs());
+}
+""",
+    "undefined variable": """
+func main() {
+  var a;
+  a = 1;
+  if (a == 1) {
+    var b;
+    b = 2;
+  }
+  print(a);
+  print(b);
+}
+""",
+    "duplicate variable": """
+func main() {
+  var a;
+  print("before");
+  var a;
+}
+""",
+    "type error": """
+func main() {
+  var i;
+  for (i = 0; i < 3; i = i + 1) {
+    print(i);
+  }
+  print(i + "x");
+}
+""",
+    "unknown function": """
+func main() {
+  print("one");
+  missing(1);
+}
+""",
+    "bad condition": """
+func main() {
+  if (1) {
+    print("no");
+  }
+}
+""",
+}
+INPUT = ["41", "1", "done"]
+OPTIONS = {
+    "plain": {},
+    "optimize": {"optimize": True},
+    "memoize": {"memoize": True},
+    "optimize+memoize": {"optimize": True, "memoize": True},
+}
+
+
+@pytest.fixture(autouse=True)
+def deep_python_stack():
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(10000)  # the tree walker goes a few python frames deep per Brewin call
+    yield
+    sys.setrecursionlimit(limit)
+
+
+def run(program, **options):
+    interpreter = Interpreter(console_output=False, inp=list(INPUT), **options)
+    try:
+        interpreter.run(program)
+    except Exception:
+        pass
+    return interpreter.get_output(), interpreter.get_error_type_and_line()
+
+
+@pytest.mark.parametrize("options", OPTIONS.values(), ids=OPTIONS.keys())
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_engines_match_the_tree_walker(name, engine, options):
+    expected = run(PROGRAMS[name])
+    assert run(PROGRAMS[name], engine=engine, **options) == expected
+
+
+# (the tree walker's own results, so a bug that breaks every engine the same way shows up too)
+def test_tree_walker_results():
+    assert run(PROGRAMS["shadowing"])[0][-3:] == ["param 5 106", "106", "main 5"]
+    assert run(PROGRAMS["bool argument"]) == (["true", "yes", "true"], (ErrorType.TYPE_ERROR, 4))
+    assert run(PROGRAMS["statement call returns"]) == (["f fell off the end", "after f(0)"], (None, None))
+    assert run(PROGRAMS["tail recursion"]) == (["45150", "false true"], (None, None))
+    assert run(PROGRAMS["undefined variable"]) == (["1"], (ErrorType.NAME_ERROR, 10))
+    assert run(PROGRAMS["duplicate variable"]) == (["before"], (ErrorType.NAME_ERROR, 5))
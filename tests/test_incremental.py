@@ -0,0 +1,33 @@
+import pytest
+
+from brewparse import parse_program
+from incremental import IncrementalParser
+from interpreterv2 import Interpreter
+
+# a stray ";" between the two functions: PLY's error recovery drops main and keeps foo
+RECOVERABLE = """func main() {
+  print("main");
+}
+;
+func foo() {
+  print("foo");
+}
+"""
+
+
+def test_recoverable_syntax_error_gives_the_tree_parse_program_gives():
+    parser = IncrementalParser()
+    assert str(parser.parse(RECOVERABLE)) == str(parse_program(RECOVERABLE))
+    assert parser.stats()["definitions"] == 0  # nothing cached from a program with an error
+    fixed = RECOVERABLE.replace("}\n;\n", "}\n")
+    assert str(parser.parse(fixed)) == str(parse_program(fixed))
+    assert parser.stats()["definitions"] == 2
+
+
+@pytest.mark.parametrize("parse_cache", [None, IncrementalParser()])
+def test_interpreter_behaves_the_same_with_the_incremental_parser(parse_cache):
+    interpreter = Interpreter(console_output=False, parse_cache=parse_cache)
+    with pytest.raises(Exception) as raised:
+        interpreter.run(RECOVERABLE)
+    assert "main" in str(raised.value)  # recovery dropped main()
+    assert interpreter.get_error_type_and_line()[0] is not None
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from async_io import AsyncInput
+from inputs import IntReader, IteratorInput, LineReader
+from interpreterv2 import Interpreter
+from sinks import ListSink
+
+MIXED = """
+func main() {
+  var a;
+  var b;
+  a = inputi();
+  print(inputs());
+  b = inputi();
+  print(inputs(), " ", a + b);
+}
+"""
+LINES = ["40", "007", "+2", "+5"]
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text("\n".join(LINES) + "\n")
+    return path
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+@pytest.mark.parametrize("make_input", [
+    lambda path: list(LINES),
+    lambda path: IteratorInput(LINES),
+    lambda path: LineReader(path),
+    lambda path: IntReader(path),
+    lambda path: IntReader(path, block_size=3),
+])
+def test_inputs_and_inputi_read_the_same_lines_from_every_provider(engine, make_input, input_file):
+    interpreter = Interpreter(console_output=False, inp=make_input(input_file), engine=engine, output_sink=ListSink())
+    interpreter.run(MIXED)
+    assert interpreter.get_output() == ["007", "+5 42"]
+
+
+def test_int_reader_gives_inputi_lines_that_are_not_numbers_as_text(input_file):
+    input_file.write_text("1\nx\n")
+    with IntReader(input_file) as reader:
+        assert reader.read_int() == 1
+        assert reader.read_int() == "x"
+        assert reader.read_int() is None
+
+
+def test_run_rejects_async_input_sources():
+    with pytest.raises(TypeError):
+        Interpreter(console_output=False, inp=AsyncInput()).run(MIXED)
+
+
+def test_importing_the_parser_does_not_import_the_input_providers():
+    code = "import sys, brewparse; print('inputs' in sys.modules, 'asyncio' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["False", "False"]
@@ -0,0 +1,57 @@
+import pytest
+
+from interpreterv2 import Interpreter
+
+TAIL_RECURSIVE_SUM = """
+func sum(n, total) {
+  if (n == 0) {
+    return total;
+  }
+  return sum(n - 1, total + n);
+}
+func main() {
+  print(sum(100, 0));
+  print(sum(100, 0));
+}
+"""
+
+
+@pytest.mark.parametrize("engine", ["closures", "vm"])
+def test_tail_calls_skip_the_memo_cache(engine):
+    interpreter = Interpreter(console_output=False, engine=engine, memoize=True)
+    interpreter.run(TAIL_RECURSIVE_SUM)
+    assert interpreter.get_output() == ["5050", "5050"]
+    # the first sum(100, 0) is a miss and stores its result, the second one hits it; the tail
+    # calls in between don't touch the cache
+    assert interpreter.memo_stats()["misses"] == 1
+    assert interpreter.memo_stats()["hits"] == 1
+    assert interpreter.memo_stats()["size"] == 1
+
+
+FIB = """
+func fib(n) {
+  if (n < 2) {
+    return n;
+  }
+  return fib(n - 1) + fib(n - 2);
+}
+func main() {
+  print(fib(20));
+}
+"""
+
+
+@pytest.mark.parametrize("engine", ["tree", "closures", "vm"])
+def test_memoize_can_be_switched_per_run(engine):
+    interpreter = Interpreter(console_output=False, engine=engine)
+    interpreter.run(FIB, memoize=True)
+    assert interpreter.memo_stats()["misses"] == 21  # fib(0) .. fib(20), once each
+    interpreter.run(FIB)
+    assert interpreter.memo_stats() is None
+    assert interpreter.get_output()[-1] == "6765"
+
+    memoizing = Interpreter(console_output=False, engine=engine, memoize=True)
+    memoizing.run(FIB, memoize=False)
+    assert memoizing.memo_stats() is None
+    memoizing.run(FIB)
+    assert memoizing.memo_stats()["misses"] == 21
@@ -0,0 +1,62 @@
+import os
+import shutil
+import time
+
+import brewparse
+from ply import yacc
+
+import parse_cache
+from interpreterv2 import Interpreter
+from parse_cache import ParseCache
+
+PROGRAM = """
+func main() {
+  print("cached ", 1 + 2);
+}
+"""
+
+
+def test_grammar_key_follows_the_grammar_the_parser_was_built_from():
+    grammar = yacc.ParserReflect(vars(brewparse))
+    grammar.get_all()
+    assert brewparse.yacc_parser.signature == grammar.signature()
+    key = parse_cache.grammar_key()
+    brewparse.yacc_parser.signature += " changed"
+    try:
+        assert parse_cache.grammar_key() != key
+    finally:
+        brewparse.yacc_parser.signature = grammar.signature()
+
+
+def test_other_grammars_are_only_dropped_by_prune(tmp_path):
+    other = tmp_path / "0123456789abcdef"
+    other.mkdir()
+    (other / "entry.ast").write_bytes(b"")
+    unrelated = tmp_path / "not-a-grammar"
+    unrelated.mkdir()
+    cache = ParseCache(str(tmp_path))
+    ParseCache(str(tmp_path))
+    assert other.exists()
+
+    cache.prune(max_age=3600)  # used just now
+    assert other.exists()
+    old = time.time() - 7200
+    os.utime(other / "entry.ast", (old, old))
+    os.utime(other, (old, old))
+    cache.prune(max_age=3600)
+    assert not other.exists()
+    assert unrelated.exists() and os.path.isdir(cache.directory)
+
+    other.mkdir()
+    cache.prune()
+    assert not other.exists()
+
+
+def test_a_cache_that_cannot_be_written_never_fails_a_run(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    shutil.rmtree(cache.directory)  # (like a read-only or full disk: mkstemp fails)
+    interpreter = Interpreter(console_output=False, parse_cache=cache)
+    interpreter.run(PROGRAM)
+    interpreter.run(PROGRAM)
+    assert interpreter.get_output() == ["cached 3", "cached 3"]
+    assert cache.stats()["misses"] == 2 and cache.stats()["entries"] == 0
@@ -0,0 +1,27 @@
+import random
+
+import pytest
+
+from brewlex import tokenize
+from brewparse import pratt_parser
+from check_parser import ProgramGenerator, compare, mutate
+
+# the differential check from check_parser.py, on a fixed seed: the Pratt parser must build
+# the same trees (and positions) as yacc for valid programs, and reject what yacc rejects
+SEEDS = range(4)
+PROGRAMS_PER_SEED = 100
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_pratt_matches_yacc(seed):
+    rng = random.Random(seed)
+    generator = ProgramGenerator(rng)
+    rejected = 0
+    for _ in range(PROGRAMS_PER_SEED):
+        program = generator.program()
+        assert compare(program) is None, program
+        mutated = mutate(program, rng)
+        assert compare(mutated) is None, mutated
+        rejected += pratt_parser.parse(tokenize(mutated)) is None
+    # (the mutated programs exercise the error path: most of them must be syntax errors)
+    assert rejected > PROGRAMS_PER_SEED // 4
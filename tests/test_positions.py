@@ -0,0 +1,80 @@
+import gc
+
+import pytest
+
+from brewparse import parse_program
+from check_parser import node_offsets
+from incremental import IncrementalParser
+from intbase import ErrorType
+from interpreterv2 import Interpreter
+from positions import Positions
+
+FOLDED = """
+func main() {
+  var x;
+  x = 1 + 2 * 3;
+  if (true) {
+    print(x);
+  }
+  if (false) {
+    print("never");
+  }
+  print(x + "a");
+}
+"""
+
+
+def run(program, **options):
+    interpreter = Interpreter(console_output=False, **options)
+    try:
+        interpreter.run(program)
+    except Exception:
+        pass
+    return interpreter
+
+
+def test_runs_without_errors_record_no_positions():
+    interpreter = run(FOLDED.replace(' + "a"', ""))
+    assert interpreter.get_output() == ["7", "7"] and interpreter.positions is None
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_lines_after_the_optimizer_rewrote_the_tree(engine):
+    interpreter = run(FOLDED, engine=engine, optimize=True)
+    assert interpreter.optimizer_stats["fold_ifs"] > 0
+    assert interpreter.get_error_type_and_line() == (ErrorType.TYPE_ERROR, 11)
+    call = interpreter.func_name_to_ast[("main", 0)].statements[-1]
+    assert interpreter.positions.column(call) == 3
+
+
+# (the program is parsed again for the line of the error, which mustn't print its syntax
+# errors a second time)
+def test_recovered_syntax_errors_are_printed_once(capsys):
+    interpreter = run("func f() { + }\nfunc main() {\n print(1);\n print(y);\n}\n")
+    assert interpreter.get_error_type_and_line() == (ErrorType.NAME_ERROR, 4)
+    assert capsys.readouterr().out.count("Syntax error") == 1
+
+
+def test_entries_stay_with_their_nodes():
+    program = "func main() {\n  var x;\n  x = 1;\n  print(x + 2, f(x));\n}\n"
+    positions = Positions(program)
+    ast = parse_program(program, positions=positions)
+    call = ast.functions[0].statements[-1]
+    del ast
+    gc.collect()
+    # (the nodes of later parses, made after the others were dropped, can't take over their
+    # entries)
+    later = [parse_program(program) for _ in range(20)]
+    assert all(offset is None for tree in later for offset in node_offsets(tree, positions, []))
+    assert positions.line(call) == 4
+
+
+def test_incremental_parser_positions_follow_the_edits():
+    parser = IncrementalParser()
+    first = "func f() {\n  return 1;\n}\nfunc main() {\n  print(f());\n}\n"
+    second = "func g() {\n  return 2;\n}\n" + first
+    parser.parse(first)
+    positions = Positions(second)
+    ast = parser.parse(second, positions=positions)
+    statements = {func.name: func.statements[0] for func in ast.functions}
+    assert (positions.line(statements["f"]), positions.line(statements["main"])) == (5, 8)
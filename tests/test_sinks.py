@@ -0,0 +1,53 @@
+import asyncio
+import io
+
+import pytest
+
+from async_io import AsyncSink, QueueSink
+from interpreterv2 import Interpreter
+from sinks import BufferedSink, StdoutSink
+
+
+def test_buffered_sink_needs_write_batch():
+    with pytest.raises(TypeError):
+        BufferedSink()
+
+    class Incomplete(BufferedSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_batches():
+    batches = []
+
+    class Collect(BufferedSink):
+        def write_batch(self, text):
+            batches.append(text)
+
+    interpreter = Interpreter(output_sink=Collect(batch_lines=2))
+    interpreter.run("func main() { var i; for (i = 0; i < 5; i = i + 1) { print(i); } }")
+    assert batches == ["0\n1\n", "2\n3\n", "4\n"]
+
+
+def test_stdout_sink():
+    stream = io.StringIO()
+    interpreter = Interpreter(output_sink=StdoutSink(stream))
+    interpreter.run('func main() { print("a"); print("b"); }')
+    assert stream.getvalue() == "a\nb\n"
+
+
+def test_run_rejects_async_sinks():
+    interpreter = Interpreter(output_sink=AsyncSink())
+    with pytest.raises(TypeError):
+        interpreter.run('func main() { print("lost"); }')
+    assert interpreter.output_sink.count == 0
+
+
+def test_run_async_writes_to_the_async_sink_it_was_constructed_with():
+    sink = QueueSink()
+    interpreter = Interpreter(engine="vm", output_sink=sink)
+    asyncio.run(interpreter.run_async('func main() { print("a"); print(1 + 2); }'))
+    assert [sink.queue.get_nowait() for _ in range(sink.count)] == ["a", "3"]
+    assert interpreter.output_sink is sink
@@ -0,0 +1,24 @@
+import copy
+import pickle
+
+import pytest
+
+from type_valuev1 import NIL, TRUE, Type, Value, int_value
+
+VALUES = [NIL, TRUE, int_value(7), int_value(10 ** 20), Value(Type.STRING, "abc"), Value(Type.INT, True)]
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_copies_are_the_value_itself(value):
+    assert copy.copy(value) is value
+    assert copy.deepcopy(value) is value
+    assert copy.deepcopy([value, value]) == [value, value]
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_pickle_round_trip(value):
+    loaded = pickle.loads(pickle.dumps(value))
+    assert (loaded.type(), loaded.value()) == (value.type(), value.value())
+    assert type(loaded.value()) is type(value.value())
+    with pytest.raises(AttributeError):
+        loaded.v = 1
@@ -8,11 +8,33 @@ class Type:
     STRING = "string"
     NIL = "nil"
 
-# Represents a value, which has a type and its value
+# Represents a value, which has a type and its value.
+# Values are immutable (and slotted, so no per-instance __dict__), which lets everyone share
+# them: use the NIL/TRUE/FALSE singletons and int_value()/bool_value() below instead of
+# allocating a new Value for the common cases.
 class Value:
+    __slots__ = ("t", "v")
+
     def __init__(self, type, value=None):
-        self.t = type
-        self.v = value
+        _set_t(self, type)
+        _set_v(self, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Value objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Value objects are immutable")
+
+    # (copy and pickle would set the slots one by one, which __setattr__ blocks; an immutable
+    # Value is its own copy, and unpickles through __init__)
+    def __reduce__(self):
+        return (Value, (self.t, self.v))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def value(self):
         return self.v
@@ -21,17 +43,45 @@ class Value:
         return self.t
 
 
+# slot setters used by __init__ (plain assignment is blocked by __setattr__)
+_set_t = Value.t.__set__
+_set_v = Value.v.__set__
+
+NIL = Value(Type.NIL, None)
+TRUE = Value(Type.BOOL, True)
+FALSE = Value(Type.BOOL, False)
+
+# ints in [SMALL_INT_MIN, SMALL_INT_MAX] are interned
+SMALL_INT_MIN = -128
+SMALL_INT_MAX = 1024
+SMALL_INTS = [Value(Type.INT, n) for n in range(SMALL_INT_MIN, SMALL_INT_MAX + 1)]
+ZERO = SMALL_INTS[-SMALL_INT_MIN]  # every `var` starts out as 0
+
+
+# n must be a real int (not a bool: INT values holding True/False exist, see create_value)
+def int_value(n):
+    if SMALL_INT_MIN <= n <= SMALL_INT_MAX:
+        return SMALL_INTS[n - SMALL_INT_MIN]
+    return Value(Type.INT, n)
+
+
+def bool_value(b):
+    return TRUE if b else FALSE
+
+
 def create_value(val):
     if val == InterpreterBase.TRUE_DEF:
-        return Value(Type.BOOL, True)
+        return TRUE
     elif val == InterpreterBase.FALSE_DEF:
-        return Value(Type.BOOL, False)
+        return FALSE
     elif isinstance(val, str):
         return Value(Type.STRING, val)
+    elif type(val) is int:
+        return int_value(val)
     elif isinstance(val, int):
-        return Value(Type.INT, val)
+        return Value(Type.INT, val)  # a python bool: stays an INT holding True/False
     elif val == None:
-        return Value(Type.NIL, None)
+        return NIL
     else:
         raise ValueError("Unknown value type")
 
@@ -0,0 +1,255 @@
+# Stack VM for the bytecode produced by bytecode.py. A single dispatch loop runs the
+# [opcode, operand] pairs of the whole program; if/for/return are jumps so nothing is
+# threaded through statements, and variables are slots in a flat per-call frame list that
+# the compiler resolved ahead of time (see resolver.py). Behaviour matches the tree walker
+# in interpreterv2.py exactly.
+#
+# Brewin calls never recurse on the python stack: a call saves the caller's state on
+# call_stack (a plain list on the heap) and switches to the callee, a return pops it back.
+# So recursion depth is only limited by memory. `return f(...)` compiles to TAIL_CALL,
+# which reuses the current call instead of stacking a new one.
+#
+# Since the whole run is that one loop, it can also be suspended: steps() is the loop as a
+# generator, and with suspend on it stops after every print (yielding PRINTED) and at every
+# input (yielding WANT_INPUT, and going on with the line sent back in). Interpreter.run_async
+# drives it from a coroutine.
+
+from array import array
+
+from bytecode import (
+    Compiler,
+    CONST, LOAD, STORE, DEFINE, BINARY_OP, NEG, NOT, JUMP, IF_FALSE, LOOP_FALSE,
+    CALL, CALL_STMT, TAIL_CALL, PRINT, INPUT, POP, RETURN, RETURN_NONE, ERROR,
+)
+from type_valuev1 import Type, Value, NIL, TRUE, FALSE, ZERO, int_value, create_value, get_printable
+from intbase import ErrorType
+from inline_cache import BinaryOpCache
+from memo import MISSING, memo_key
+
+# stand-in code run on a memo cache hit: returns consts[0] (or falls off the end), so the
+# cached result goes back through the normal return path
+MEMO_RETURN = array("l", [CONST, 0, RETURN, 0])
+MEMO_FALL_OFF = array("l", [RETURN_NONE, 0])
+
+# what steps() yields when suspended
+PRINTED = "printed"  # a line went to interp.output()
+WANT_INPUT = "want input"  # send() the input line to go on
+
+
+class VM:
+    def __init__(self, interpreter):
+        self.interp = interpreter
+        self.functions = {}
+        self.max_depth = 0  # deepest Brewin call stack seen during the last run
+
+    def run(self, func_table, main_func):
+        self.execute(self.load(func_table, main_func))
+
+    # compiles the program and returns main's code
+    def load(self, func_table, main_func):
+        self.functions = Compiler().compile_program(func_table)
+        # one inline cache per BINARY_OP instruction
+        for code_obj in self.functions.values():
+            code_obj.op_caches = [BinaryOpCache(operator, self.interp.op_to_lambda) for operator in code_obj.op_sites]
+            self.interp.inline_caches.extend(code_obj.op_caches)
+        # calls to these go through the interpreter's MemoCache
+        memoized = self.interp.pure_functions if self.interp.memo is not None else ()
+        for key, code_obj in self.functions.items():
+            code_obj.memoized = key in memoized
+        return self.functions[(main_func.get("name"), 0)]
+
+    def __new_frame(self, code_obj, args):
+        frame = [None] * code_obj.frame_size
+        for slot, arg_value in zip(code_obj.param_slots, args):
+            if slot is not None:
+                frame[slot] = create_value(arg_value.value())  # pass-by-value
+        return frame
+
+    # pops the args of a call off the stack and finds the function being called (None if
+    # there's no such function)
+    def __callee(self, target, stack):
+        arg_count = target[1]
+        if arg_count:
+            args = stack[-arg_count:]
+            del stack[-arg_count:]
+        else:
+            args = ()
+        return self.functions.get(target), args
+
+    # line number of the instruction that ends just before pc
+    def __line(self, code_obj, pc):
+        return self.interp.line_of(code_obj.error_nodes.get(pc - 2))
+
+    # runs main_code (and everything it calls) to completion
+    def execute(self, main_code):
+        for _ in self.steps(main_code):  # (never yields: nothing suspends it)
+            pass
+
+    # generator that runs main_code; see PRINTED and WANT_INPUT for what it yields when
+    # suspend is on
+    def steps(self, main_code, suspend=False):
+        error = self.interp.error
+        memo = self.interp.memo
+        # suspended callers: (code_obj, pc, frame, stack, tail, the call op they're waiting on,
+        # memo key to store the callee's result under or None)
+        call_stack = []
+        self.max_depth = 0
+
+        # state of the running call
+        code_obj = main_code
+        code = code_obj.code
+        consts = code_obj.consts
+        op_caches = code_obj.op_caches
+        frame = [None] * code_obj.frame_size  # main runs with no args
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        tail = False  # entered through a tail call: falling off the end still counts as `return`
+
+        while True:
+            op = code[pc]
+            arg = code[pc + 1]
+            pc += 2
+
+            if op == LOAD:
+                push(frame[arg])
+            elif op == CONST:
+                push(consts[arg])
+            elif op == BINARY_OP:
+                right = pop()
+                left = stack[-1]
+                cache = op_caches[arg]
+                if left.t == cache.left_type and right.t == cache.right_type:
+                    cache.hits += 1
+                    stack[-1] = cache.handler(left, right)
+                else:
+                    stack[-1] = cache.miss(left, right, self.interp.error_at(code_obj.error_nodes[pc - 2]))
+            elif op == STORE:
+                frame[arg] = pop()
+            elif op == LOOP_FALSE:
+                condition_value = pop()
+                if condition_value.type() != Type.BOOL:
+                    error(ErrorType.TYPE_ERROR, f"Loop condition ({condition_value}) isn't a boolean", self.__line(code_obj, pc))
+                if not condition_value.v:
+                    pc = arg
+            elif op == IF_FALSE:
+                condition_value = pop()
+                if condition_value.type() != Type.BOOL:
+                    error(ErrorType.TYPE_ERROR, f"Condition in if statement must evaluate to a boolean. The condition is type: {condition_value.type()}", self.__line(code_obj, pc))
+                if not condition_value.v:
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == CALL or op == CALL_STMT or op == TAIL_CALL:
+                callee, args = self.__callee(consts[arg], stack)
+                if callee is None:
+                    name, arg_count = consts[arg]
+                    error(ErrorType.NAME_ERROR, f"Function {name} w/ arg_count {arg_count} not found", self.__line(code_obj, pc))
+                key = None
+                stub = None
+                # (a tail call has no call of its own to store the result from, so it skips the
+                # cache, like the closure engine's tail calls do; the outer call is cached)
+                if callee.memoized and op != TAIL_CALL:
+                    key = memo_key(callee.name, args)
+                    result = memo.get(key)
+                    if result is not MISSING:
+                        # run a stub that just returns the cached result instead of the callee
+                        key = None
+                        stub = MEMO_FALL_OFF if result is None else MEMO_RETURN
+                if op == TAIL_CALL:
+                    # the caller's `return` becomes the callee's: reuse this call's slot
+                    tail = True
+                    stack.clear()
+                else:
+                    call_stack.append((code_obj, pc, frame, stack, tail, op, key))
+                    if len(call_stack) > self.max_depth:
+                        self.max_depth = len(call_stack)
+                    tail = False
+                    stack = []
+                    push = stack.append
+                    pop = stack.pop
+                code_obj = callee
+                pc = 0
+                if stub is not None:
+                    code = stub
+                    consts = (result,)
+                    continue
+                code = code_obj.code
+                consts = code_obj.consts
+                op_caches = code_obj.op_caches
+                frame = self.__new_frame(code_obj, args)
+            elif op == DEFINE:
+                frame[arg] = ZERO
+            elif op == RETURN or op == RETURN_NONE:
+                if op == RETURN:
+                    result = pop()
+                elif tail:
+                    result = NIL  # `return f();` where f fell off the end still returns (nil)
+                else:
+                    result = None  # fell off the end
+                # hand the result back. A caller waiting on a statement-level call returns
+                # right away if the callee hit `return` (tree walker quirk), so keep unwinding
+                while True:
+                    if not call_stack:
+                        return result
+                    code_obj, pc, frame, stack, tail, call_op, key = call_stack.pop()
+                    if key is not None:
+                        memo.put(key, result)
+                    if call_op == CALL:
+                        stack.append(NIL if result is None else result)
+                        break
+                    if result is None:
+                        break
+                code = code_obj.code
+                consts = code_obj.consts
+                op_caches = code_obj.op_caches
+                push = stack.append
+                pop = stack.pop
+            elif op == NEG:
+                operand = stack[-1]
+                if operand.type() != Type.INT:
+                    error(ErrorType.TYPE_ERROR, "(- or 'neg') requires an INT operand", self.__line(code_obj, pc))
+                stack[-1] = int_value(-operand.v)
+            elif op == NOT:
+                operand = stack[-1]
+                if operand.type() != Type.BOOL:
+                    error(ErrorType.TYPE_ERROR, "(!) requires a BOOL operand", self.__line(code_obj, pc))
+                stack[-1] = FALSE if operand.v else TRUE
+            elif op == PRINT:
+                if arg:
+                    values = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    values = ()
+                push(self.__print(values))
+                if suspend:
+                    yield PRINTED
+            elif op == POP:
+                pop()
+            elif op == INPUT:
+                func_name, has_prompt = consts[arg]
+                if has_prompt:
+                    self.interp.output(get_printable(pop()))
+                inp = (yield WANT_INPUT) if suspend else self.interp.get_input(func_name == "inputi")
+                push(self.__input(func_name, inp))
+            elif op == ERROR:
+                error(*consts[arg], self.__line(code_obj, pc))
+            else:
+                raise RuntimeError(f"bad opcode {op} at {pc - 2} in {code_obj.name}")
+
+    def __print(self, values):
+        output = ""
+        for result in values:
+            if result.type() == Type.BOOL:
+                output += "true" if result.value() else "false"
+            elif result.type() != Type.NIL:  # skip nil values in print
+                output += get_printable(result)
+        self.interp.output(output)
+        return NIL
+
+    def __input(self, func_name, inp):
+        if func_name == "inputi":
+            return int_value(int(inp))
+        if func_name == "inputs":
+            return Value(Type.STRING, str(inp))